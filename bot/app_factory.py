@@ -1,22 +1,62 @@
-import logging
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
 from aiogram.enums import ParseMode
 
-from .handlers.start import router as start_router
-from .handlers.profile import router as profile_router
-from .handlers.task.catalog import router as tasks_router
-from .handlers.task.submission import router as submission_router
-from .handlers.admin.panel import router as admin_router
+from .routers import root_router
+from .services.broadcast import resume_broadcasts, stop_broadcasts
+from .services.rating import (
+    rebuild_ranking,
+    start_ranking_refresh,
+    stop_ranking_refresh,
+)
+from .services.admin_stats import rebuild_counters
+from .services.deadlines import start_deadline_sweeper, stop_deadline_sweeper
+from .services.outbox import start_outbox, stop_outbox
+from .services.reminders import start_reminders, stop_reminders
+from .middlewares.db import CommitBeforeSendMiddleware, DbSessionMiddleware
+from .middlewares.metrics import setup_metrics
+from .middlewares.sql_profiler import setup_sql_profiler
+from .storage.fsm import build_fsm_storage
+from .storage.migrations import migrate
 
 
-def build_dispatcher(bot_token: str) -> tuple[Bot, Dispatcher]:
-    logging.basicConfig(level=logging.INFO)
-    bot = Bot(token=bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher()
-    dp.include_router(start_router)
-    dp.include_router(profile_router)
-    dp.include_router(tasks_router)
-    dp.include_router(submission_router)
-    dp.include_router(admin_router)
+def build_dispatcher(
+    bot_token: str, *, session: BaseSession | None = None
+) -> tuple[Bot, Dispatcher]:
+    """
+    Bot и Dispatcher для любого способа запуска (polling, webhook, нагрузочный
+    прогон): один порядок middleware и один набор роутеров и фоновых задач.
+    session — своя сетевая сессия Bot (заглушка в tools/loadtest.py).
+    """
+    bot = Bot(
+        token=bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    # FSM в общей БД/Redis: сценарии переживают рестарт и видны всем воркерам
+    dp = Dispatcher(storage=build_fsm_storage())
+    # латентность/ошибки по хендлерам; снаружи сессии — commit тоже в счёт
+    setup_metrics(dp)
+    # число SQL на хендлер, бюджет и N+1 — warning в лог
+    setup_sql_profiler(dp)
+    # одна сессия/транзакция на апдейт; commit — до первого запроса к Bot API
+    dp.update.outer_middleware(DbSessionMiddleware())
+    bot.session.middleware(CommitBeforeSendMiddleware())
+
+    dp.include_router(root_router)
+    # схема БД до первого апдейта; затем — незавершённые рассылки
+    dp.startup.register(migrate)
+    dp.startup.register(rebuild_ranking)
+    dp.startup.register(start_ranking_refresh)
+    dp.shutdown.register(stop_ranking_refresh)
+    dp.startup.register(rebuild_counters)
+    dp.startup.register(resume_broadcasts)
+    dp.shutdown.register(stop_broadcasts)
+    dp.startup.register(start_reminders)
+    dp.shutdown.register(stop_reminders)
+    dp.startup.register(start_deadline_sweeper)
+    dp.shutdown.register(stop_deadline_sweeper)
+    dp.startup.register(start_outbox)
+    dp.shutdown.register(stop_outbox)
     return bot, dp
@@ -1,6 +1,9 @@
+import logging
 from aiogram import Bot
 from aiogram.types import BotCommand
 
+log = logging.getLogger(__name__)
+
 
 async def setup_bot_commands(bot: Bot) -> None:
     """
@@ -16,4 +19,4 @@ async def setup_bot_commands(bot: Bot) -> None:
     ]
 
     await bot.set_my_commands(commands)
-    print("[setup_bot_commands] Bot commands set")
+    log.info("[setup_bot_commands] bot commands set")
@@ -1,21 +1,22 @@
 from dataclasses import dataclass
+from functools import lru_cache
 import os
-import redis
 from pathlib import Path
 from dotenv import load_dotenv
 
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+
 
 @dataclass
 class Setting:
-    redis_cli = redis.StrictRedis(
-        host="localhost", port=6379, db=0, decode_responses=True
-    )
     bot_token: str
     admin_ids: list[str]
     use_webhook: bool = False
 
 
+@lru_cache(maxsize=1)
 def get_settings() -> Setting:
+    """.env читается один раз на процесс."""
     root = Path(__file__).resolve().parents[1]
     load_dotenv(root / ".env")
     token = os.getenv("BOT_TOKEN")
@@ -26,3 +27,26 @@ def get_settings() -> Setting:
     admin_ids = [int(x) for x in raw_admins.split(",") if x.strip().isdigit()]
     use_webhook = os.getenv("USE_WEBHOOK", "false").lower() == "true"
     return Setting(bot_token=token, admin_ids=admin_ids, use_webhook=use_webhook)
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """
+    Async-клиент Redis (redis.asyncio) с общим на процесс пулом соединений;
+    создаётся при первом обращении, а не при импорте конфига.
+    Адрес — REDIS_URL (по умолчанию localhost:6379/0).
+    Пакет redis необязателен: без него — None, и кэши живут в памяти процесса.
+    """
+    try:
+        from redis.asyncio import Redis
+    except ImportError:
+        return None
+
+    return Redis.from_url(
+        os.getenv("REDIS_URL", DEFAULT_REDIS_URL),
+        decode_responses=True,
+        max_connections=int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+        # недоступный сервер не должен подвешивать хендлер
+        socket_connect_timeout=1,
+        socket_timeout=1,
+    )
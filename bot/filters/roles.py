@@ -2,15 +2,20 @@ from aiogram.filters import BaseFilter
 from aiogram.types import Message
 
 from ..config import get_settings
-from ..storage.db import SessionLocal
-from ..storage.models import User as UserModel
+from ..services.user_cache import get_cached_user
 
 
 class IsAdmin(BaseFilter):
     def __init__(self):
-        setting = get_settings()
-        # читаем ID из .env → Settings
-        self.super_admin_ids = set(setting.admin_ids or [])
+        # ID супер-админов читаем при первой проверке, а не при импорте хендлеров
+        self._super_admin_ids: set[int] | None = None
+
+    @property
+    def super_admin_ids(self) -> set[int]:
+        if self._super_admin_ids is None:
+            # читаем ID из .env → Settings
+            self._super_admin_ids = set(get_settings().admin_ids or [])
+        return self._super_admin_ids
 
     async def __call__(self, message: Message) -> bool:
         tg_id = message.from_user.id
@@ -18,6 +23,6 @@ class IsAdmin(BaseFilter):
         if tg_id in self.super_admin_ids:
             return True
 
-        with SessionLocal() as s:
-            user = s.query(UserModel).filter_by(tg_id=tg_id).first()
-            return bool(user and user.is_admin)
+        # флаг is_admin — из кэша пользователей, без похода в БД на каждый callback
+        user = await get_cached_user(tg_id)
+        return bool(user and user.is_admin)
@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 from aiogram import Router, F
@@ -13,7 +12,7 @@ from aiogram.enums import ParseMode
 from aiogram import Bot
 
 from ...states.broadcast import Broadcast
-from ...services.users import get_all_user_tg_ids
+from ...services.broadcast import create_broadcast, start_broadcast
 from ...keyboards.common import admin_tasks_root_kb
 
 logger = logging.getLogger(__name__)
@@ -88,7 +87,7 @@ async def broadcast_cancel(cb: CallbackQuery, state: FSMContext):
     await cb.answer()
 
 
-# 5) Админ нажал "✅ Отправить" — реально шлём всем
+# 5) Админ нажал "✅ Отправить" — ставим рассылку в фон и сразу отвечаем
 @router.callback_query(F.data == "admin:broadcast:send")
 async def broadcast_send(cb: CallbackQuery, state: FSMContext, bot: Bot):
     data = await state.get_data()
@@ -98,26 +97,14 @@ async def broadcast_send(cb: CallbackQuery, state: FSMContext, bot: Bot):
         await cb.answer("Нет текста для рассылки 🤔", show_alert=True)
         return
 
-    user_ids = get_all_user_tg_ids()
-    total = len(user_ids)
-    sent = 0
-
-    await cb.answer("Запустил рассылку…", show_alert=True)
-
-    for uid in user_ids:
-        try:
-            await bot.send_message(uid, text, parse_mode=ParseMode.HTML)
-            sent += 1
-            # маленькая задержка, чтобы не словить flood-limit
-            await asyncio.sleep(0.05)
-        except Exception as e:
-            logger.warning("[broadcast] failed to send to %s: %s", uid, e)
-
     await state.clear()
-    await cb.message.edit_text(
-        f"📢 Рассылка завершена.\n\n"
-        f"Всего пользователей: {total}\n"
-        f"Успешно отправлено: {sent}",
-        reply_markup=admin_tasks_root_kb(),
-        parse_mode=ParseMode.HTML,
+    await cb.message.edit_text("📢 Рассылка запущена…")
+    # прогресс пишем в это же сообщение — его обновляет фоновая задача
+    job_id = await create_broadcast(
+        text,
+        created_by=cb.from_user.id,
+        progress_chat_id=cb.message.chat.id,
+        progress_message_id=cb.message.message_id,
     )
+    start_broadcast(bot, job_id)
+    await cb.answer("Запустил рассылку…", show_alert=True)
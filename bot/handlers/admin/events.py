@@ -17,7 +17,7 @@ router = Router(name="admin_events")
 
 @router.callback_query(F.data == "admin:events")
 async def admin_events_root(cb: CallbackQuery):
-    events = list_upcoming_events(limit=10)
+    events = await list_upcoming_events(limit=10)
     if not events:
         text = "📅 <b>События</b>\n\nПока событий нет.\nНажми «➕ Добавить событие»."
     else:
@@ -125,7 +125,7 @@ async def admin_event_time(msg: Message, state: FSMContext):
         return
 
     # создаём событие
-    create_event(
+    await create_event(
         title=title,
         description=description,
         event_dt=dt,
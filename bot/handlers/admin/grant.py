@@ -34,7 +34,7 @@ async def add_admin_by_reply(msg: Message):
     target_tg_id = target.id
 
     # 3. Пробуем выдать админку
-    ok = set_admin_status(target_tg_id, True)
+    ok = await set_admin_status(target_tg_id, True)
     if not ok:
         await msg.answer(
             "❌ Пользователь не найден в базе.\n"
@@ -1,15 +1,16 @@
 from aiogram import Router, F, types
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from datetime import datetime, timedelta
+from sqlalchemy import select
 
 from ...filters.roles import IsAdmin
-from ...storage.db import SessionLocal
+from ...storage.db import AsyncSessionLocal
 from ...storage.models import User as UserModel
 from ...keyboards.common import (
     admin_panel_kb,
-    admin_pending_kb,
+    admin_pending_nav_kb,
     admin_assignment_kb,
     admin_mentors_root_kb,
     mentor_role_kb,
@@ -21,11 +22,11 @@ from ...services.users import (
     set_admin_status,
     get_recent_users,
 )
+from ...services.user_cache import user_cache
 from ...services.mentorship import get_mentor_list
 from ...states.mentorship import AdminMentorAdd, AdminMentorRemove
-from ...services.levels import level_by_coins
-from ...services.badges import newly_unlocked_badge
 from ...services.tasks import (
+    bulk_review,
     list_pending_submissions,
     get_assignment_full,
     approve_assignment,
@@ -33,6 +34,7 @@ from ...services.tasks import (
 )
 from ...services.calendar import create_event
 from ...config import get_settings
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = Router(name="admin_panel")
 
@@ -49,14 +51,34 @@ async def admin_entry(msg: Message):
 
 # Список «на проверке»
 @router.callback_query(F.data.startswith("admin:pending:"), IsAdmin())
-async def admin_pending(cb: CallbackQuery):
-    page = int(cb.data.split(":")[-1])
-    rows = list_pending_submissions(page=page, per_page=10)
+async def admin_pending(
+    cb: CallbackQuery,
+    session: AsyncSession | None = None,
+    state: FSMContext | None = None,
+):
+    # admin:pending:<cursor>; "1" — первая страница
+    cursor = cb.data.split(":", 2)[-1]
+    await _show_pending(cb.message, cursor, session, state)
+    await cb.answer()
+
+
+async def _show_pending(
+    message: Message,
+    cursor: str,
+    session: AsyncSession | None,
+    state: FSMContext | None,
+):
+    rows, next_cursor = await list_pending_submissions(
+        cursor, per_page=10, session=session
+    )
+    if state is not None:
+        # «одобрить страницу» решает ровно то, что админ видел
+        await state.update_data(bulk_page=[row[0] for row in rows])
     if not rows:
-        await cb.message.edit_text(
-            "🕒 На проверке пусто.", reply_markup=admin_pending_kb(page)
+        await message.edit_text(
+            "🕒 На проверке пусто.", reply_markup=admin_pending_nav_kb(cursor)
         )
-        return await cb.answer()
+        return
 
     lines = []
     for aid, title, tg_id, username, submitted_at in rows:
@@ -71,10 +93,47 @@ async def admin_pending(cb: CallbackQuery):
         + "\n".join(lines)
         + "\n\nОткрой карточку: напиши в чат <code>admin:view:&lt;id&gt;</code>"
     )
-    await cb.message.edit_text(
-        text, reply_markup=admin_pending_kb(page), disable_web_page_preview=True
+    await message.edit_text(
+        text,
+        reply_markup=admin_pending_nav_kb(
+            cursor, next_cursor, bulk=state is not None
+        ),
+        disable_web_page_preview=True,
     )
-    await cb.answer()
+
+
+# Решение по всей странице очереди
+@router.callback_query(F.data.in_({"admin:bulk:approve", "admin:bulk:reject"}), IsAdmin())
+async def admin_bulk_review(
+    cb: CallbackQuery, state: FSMContext, session: AsyncSession | None = None
+):
+    approve = cb.data.endswith(":approve")
+    ids = (await state.get_data()).get("bulk_page") or []
+    if not ids:
+        await cb.answer("Обнови список — страница устарела.", show_alert=True)
+        return
+
+    result = await bulk_review(approve, assignment_ids=ids, session=session)
+    verb = "Одобрено" if approve else "Отклонено"
+    await cb.answer(f"{verb}: {len(result.items)} из {len(ids)}.", show_alert=True)
+    await _show_pending(cb.message, "1", session, state)
+
+
+# Все сдачи одного задания: /approve_all <task_id>, /reject_all <task_id>
+@router.message(IsAdmin(), Command("approve_all", "reject_all"))
+async def admin_review_task(
+    msg: Message, command: CommandObject, session: AsyncSession | None = None
+):
+    approve = command.command == "approve_all"
+    try:
+        task_id = int(command.args or "")
+    except ValueError:
+        await msg.answer(f"Формат: /{command.command} &lt;task_id&gt;")
+        return
+
+    result = await bulk_review(approve, task_id=task_id, session=session)
+    verb = "Одобрено" if approve else "Отклонено"
+    await msg.answer(f"{verb} сдач по заданию #{task_id}: {len(result.items)}.")
 
 
 @router.message(IsAdmin(), Command("add_admin"))
@@ -85,13 +144,14 @@ async def add_admin(msg: Message):
     target = msg.reply_to_message.from_user
     tg_id = target.id
 
-    with SessionLocal() as s:
-        user = s.query(UserModel).filter_by(tg_id=tg_id).first()
+    async with AsyncSessionLocal() as s:
+        user = await s.scalar(select(UserModel).where(UserModel.tg_id == tg_id))
         if not user:
             user = UserModel(tg_id=tg_id, username=target.username)
             s.add(user)
         user.is_admin = True
-        s.commit()
+        await s.commit()
+        user_cache.put(user)
 
     await msg.answer(
         f"✅ Пользователь @{target.username or tg_id} теперь администратор."
@@ -115,18 +175,19 @@ async def del_admin(msg: Message):
     if tg_id in super_ids:
         return await msg.answer("Нельзя снять супер-админа, он прописан в .env")
 
-    with SessionLocal() as s:
-        user = s.query(UserModel).filter_by(tg_id=tg_id).first()
+    async with AsyncSessionLocal() as s:
+        user = await s.scalar(select(UserModel).where(UserModel.tg_id == tg_id))
         if not user or not user.is_admin:
             return await msg.answer("Этот пользователь и так не админ.")
         user.is_admin = False
-        s.commit()
+        await s.commit()
+        user_cache.put(user)
 
     await msg.answer(f"🚫 Пользователь @{target.username or tg_id} больше не админ.")
 
 
 @router.callback_query(F.data.startswith("admin:grant:"))
-async def admin_grant(cb: CallbackQuery):
+async def admin_grant(cb: CallbackQuery, session: AsyncSession | None = None):
     settings = get_settings()
 
     # Проверяем, что вызывающий — супер-админ
@@ -137,7 +198,7 @@ async def admin_grant(cb: CallbackQuery):
     target_id = int(cb.data.split(":")[2])
 
     # Обновляем базу
-    set_admin_status(target_id, True)
+    await set_admin_status(target_id, True, session=session)
 
     await cb.answer("Пользователь теперь админ!", show_alert=True)
     await cb.message.edit_text("Админка выдана.")
@@ -145,12 +206,12 @@ async def admin_grant(cb: CallbackQuery):
 
 # Просмотр карточки по текстовой команде: admin:view:<id>
 @router.message(F.text.startswith("admin:view:"), IsAdmin())
-async def admin_view_by_text(msg: Message):
+async def admin_view_by_text(msg: Message, session: AsyncSession | None = None):
     try:
         aid = int(msg.text.split(":")[-1])
     except Exception:
         return await msg.answer("Формат: admin:view:<assignment_id>")
-    await show_assignment_card(msg, aid)
+    await show_assignment_card(msg, aid, session=session)
 
 
 @router.message(Command("create_event"))
@@ -159,7 +220,7 @@ async def create_event_cmd(msg: types.Message):
     title = "Пример события"
     description = "Описание события"
     event_date = datetime.utcnow() + timedelta(days=2)  # через 2 дня
-    create_event(
+    await create_event(
         user_id=msg.from_user.id,
         title=title,
         description=description,
@@ -170,14 +231,14 @@ async def create_event_cmd(msg: types.Message):
 
 # Просмотр карточки (если позже сделаешь inline-кнопку admin:view:<id>)
 @router.callback_query(F.data.startswith("admin:view:"), IsAdmin())
-async def admin_view_cb(cb: CallbackQuery):
+async def admin_view_cb(cb: CallbackQuery, session: AsyncSession | None = None):
     aid = int(cb.data.split(":")[-1])
-    await show_assignment_card(cb.message, aid)
+    await show_assignment_card(cb.message, aid, session=session)
     await cb.answer()
 
 
-async def show_assignment_card(target: Message, assignment_id: int):
-    a = get_assignment_full(assignment_id)
+async def show_assignment_card(target: Message, assignment_id: int, session: AsyncSession | None = None):
+    a = await get_assignment_full(assignment_id, session=session)
     if not a:
         return await target.answer("Запись не найдена.")
     t, u = a.task, a.user
@@ -199,74 +260,25 @@ async def show_assignment_card(target: Message, assignment_id: int):
     )
 
 
-# Approve
+# Approve — монеты и уведомление автору делает сервис (outbox)
 @router.callback_query(F.data.startswith("admin:approve:"), IsAdmin())
-async def admin_approve(cb: CallbackQuery):
+async def admin_approve(cb: CallbackQuery, session: AsyncSession | None = None):
     aid = int(cb.data.split(":")[-1])
-
-    # получим данные ДО апрува (для сравнения уровней)
-    a_before = get_assignment_full(aid)
-    if not a_before:
-        await cb.answer("Не найдена заявка.", show_alert=True)
-        return
-    user_before = a_before.user
-    coins_before = user_before.coins or 0
-    lvl_before = level_by_coins(coins_before).level
-
-    if not approve_assignment(aid):  # здесь начисляются coins пользователю
+    if not await approve_assignment(aid, session=session):
         await cb.answer("Не удалось подтвердить.", show_alert=True)
         return
-
     await cb.answer("Подтверждено, монеты начислены.", show_alert=True)
 
-    # после начисления — перечитываем
-    a_after = get_assignment_full(aid)
-    user_after = a_after.user
-    coins_after = user_after.coins or 0
-    lvl_after = level_by_coins(coins_after).level
-
-    # уведомим пользователя
-    try:
-        # базовое уведомление
-        await cb.bot.send_message(
-            user_after.tg_id,
-            f"✅ Ваше задание <b>{a_after.task.title}</b> проверено. Начислено <b>+{a_after.task.reward_coins}</b> coins!",
-        )
-        # если ап — отдельное сообщение
-        if lvl_after > lvl_before:
-            await cb.bot.send_message(
-                user_after.tg_id,
-                f"🎉 <b>Level up!</b>\nТеперь у вас <b>Level {lvl_after}</b>.",
-            )
-
-            badges = newly_unlocked_badge(lvl_before, lvl_after)
-            if badges:
-                await cb.bot.send_message(
-                    user_after.tg_id,
-                    f"{badges.icon} <b>Badges unlocked:<b> {badges.title}",
-                )
-    except Exception:
-        pass
-
 
 # Reject
 @router.callback_query(F.data.startswith("admin:reject:"), IsAdmin())
-async def admin_reject(cb: CallbackQuery):
+async def admin_reject(cb: CallbackQuery, session: AsyncSession | None = None):
     aid = int(cb.data.split(":")[-1])
-    if not reject_assignment(aid):
+    if not await reject_assignment(aid, session=session):
         await cb.answer("Не удалось отклонить.", show_alert=True)
         return
     await cb.answer("Отклонено.", show_alert=True)
 
-    a = get_assignment_full(aid)
-    try:
-        await cb.bot.send_message(
-            a.user.tg_id,
-            f"❌ Ваше задание <b>{a.task.title}</b> отклонено.\nПопробуйте ещё раз — уточните детали и пришлите новый вариант.",
-        )
-    except Exception:
-        pass
-
 
 # Mentors
 
@@ -299,13 +311,13 @@ async def mentor_add_start(cb: CallbackQuery, state: FSMContext):
 
 # ➕ Добавить ментора — шаг 2: принять идентификатор и спросить роль
 @router.message(IsAdmin(), AdminMentorAdd.waiting_identifier)
-async def mentor_add_got_identifier(msg: Message, state: FSMContext):
+async def mentor_add_got_identifier(msg: Message, state: FSMContext, session: AsyncSession | None = None):
     ident = msg.text.strip()
-    u = find_user(ident)
+    u = await find_user(ident)
     if not u:
         # если никогда не виделись, можно создать «пустого» пользователя по id (для username создать нельзя)
         if ident.isdigit():
-            u = get_or_create_user(int(ident))
+            u = await get_or_create_user(int(ident), session=session)
         else:
             await msg.answer(
                 "Не нашёл пользователя. Пришли @username или цифровой tg_id."
@@ -320,10 +332,10 @@ async def mentor_add_got_identifier(msg: Message, state: FSMContext):
 
 # обработчик кнопок выбора роли
 @router.callback_query(IsAdmin(), F.data.startswith("admin:mentors:setrole:"))
-async def mentor_set_role(cb: CallbackQuery, state: FSMContext):
+async def mentor_set_role(cb: CallbackQuery, state: FSMContext, session: AsyncSession | None = None):
     _, _, _, tg_id_str, role = cb.data.split(":")
     tg_id = int(tg_id_str)
-    u = set_user_role(tg_id, role)
+    u = await set_user_role(tg_id, role, session=session)
     if not u:
         await cb.answer("Пользователь не найден")
         return
@@ -345,13 +357,13 @@ async def mentor_remove_start(cb: CallbackQuery, state: FSMContext):
 
 # 🗑 Удалить ментора — шаг 2
 @router.message(IsAdmin(), AdminMentorRemove.waiting_identifier)
-async def mentor_remove_got_identifier(msg: Message, state: FSMContext):
+async def mentor_remove_got_identifier(msg: Message, state: FSMContext, session: AsyncSession | None = None):
     ident = msg.text.strip()
-    u = find_user(ident)
+    u = await find_user(ident)
     if not u:
         await msg.answer("Не нашёл пользователя.")
         return
-    set_user_role(u.tg_id, None)
+    await set_user_role(u.tg_id, None, session=session)
     await state.clear()
     await msg.answer(
         f"✅ Роль ментора снята: @{u.username or '—'} (id={u.tg_id})",
@@ -362,7 +374,7 @@ async def mentor_remove_got_identifier(msg: Message, state: FSMContext):
 # 📋 Список менторов
 @router.callback_query(IsAdmin(), F.data == "admin:mentors:list")
 async def mentor_list_view(cb: CallbackQuery):
-    mentors = get_mentor_list()
+    mentors = await get_mentor_list()
     if not mentors:
         await cb.message.edit_text(
             "Пока нет менторов.", reply_markup=admin_mentors_root_kb()
@@ -380,7 +392,7 @@ async def mentor_list_view(cb: CallbackQuery):
 
 
 @router.message(Command("make_admin"))
-async def make_admin_handler(msg: Message):
+async def make_admin_handler(msg: Message, session: AsyncSession | None = None):
     """
     /make_admin <telegram_id>
     Команда только для СУПЕР-админов из ADMIN_IDS (в .env).
@@ -406,7 +418,7 @@ async def make_admin_handler(msg: Message):
         await msg.answer("❌ Telegram ID должен быть числом.")
         return
 
-    ok = set_admin_status(target_tg_id, True)
+    ok = await set_admin_status(target_tg_id, True, session=session)
     if not ok:
         await msg.answer(
             f"❌ Пользователь с tg_id={target_tg_id} не найден в базе.\n"
@@ -430,7 +442,7 @@ async def last_users_handler(msg: Message):
         await msg.answer("❌ У тебя нет прав смотреть список пользователей.")
         return
 
-    users = get_recent_users(limit=20)
+    users = await get_recent_users(limit=20)
     if not users:
         await msg.answer("Пользователей в базе пока нет.")
         return
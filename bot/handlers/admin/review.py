@@ -4,6 +4,7 @@ from aiogram.types import CallbackQuery
 from ...filters.roles import IsAdmin
 from ...keyboards.common import admin_review_root_kb
 from ...services.tasks import moderate_assignment
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = Router(name="admin_review")
 
@@ -11,7 +12,7 @@ router = Router(name="admin_review")
 
 
 @router.callback_query(IsAdmin(), F.data.regexp(r"^admin:review:\d+:(approve|reject)$"))
-async def review_decide(cb: CallbackQuery):
+async def review_decide(cb: CallbackQuery, session: AsyncSession | None = None):
     """
     Ожидаем строго: admin:review:<assignment_id>:(approve|reject)
     Пример: admin:review:42:approve
@@ -25,7 +26,7 @@ async def review_decide(cb: CallbackQuery):
     if action not in {"approve", "reject"}:
         return await cb.answer("Неизвестное действие", show_alert=True)
 
-    updated = moderate_assignment(assignment_id, approve=(action == "approve"))
+    updated = await moderate_assignment(assignment_id, approve=(action == "approve"), session=session)
     if not updated:
         return await cb.answer("Элемент не найден или уже обработан", show_alert=True)
 
@@ -1,7 +1,13 @@
+import html
+from datetime import datetime
+
 from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram.filters import Command, CommandObject
+from aiogram.types import CallbackQuery, Message
 
+from ...filters.roles import IsAdmin
 from ...services.admin_stats import collect_admin_stats, get_top_users
+from ...services.metrics import metrics
 from ...keyboards.common import admin_panel_kb
 
 router = Router(name="admin_stats")
@@ -9,8 +15,8 @@ router = Router(name="admin_stats")
 
 @router.callback_query(F.data == "admin:stats")
 async def admin_stats_handler(cb: CallbackQuery):
-    data = collect_admin_stats()
-    top_users = get_top_users(5)
+    data = await collect_admin_stats()
+    top_users = await get_top_users(5)
 
     lines = []
 
@@ -27,7 +33,8 @@ async def admin_stats_handler(cb: CallbackQuery):
     lines.append(f"• Активные: <b>{data['assignments_active']}</b>")
     lines.append(f"• На модерации: <b>{data['assignments_submitted']}</b>")
     lines.append(f"• Одобрено: <b>{data['assignments_approved']}</b>")
-    lines.append(f"• Отклонено: <b>{data['assignments_rejected']}</b>\n")
+    lines.append(f"• Отклонено: <b>{data['assignments_rejected']}</b>")
+    lines.append(f"• Просрочено: <b>{data['assignments_expired']}</b>\n")
 
     if top_users:
         lines.append("🏆 <b>Топ по coins</b>")
@@ -40,3 +47,33 @@ async def admin_stats_handler(cb: CallbackQuery):
 
     await cb.message.edit_text(text, reply_markup=admin_panel_kb())
     await cb.answer()
+
+
+# /handler_stats [N] — самые дорогие хендлеры с запуска; /handler_stats reset
+@router.message(IsAdmin(), Command("handler_stats"))
+async def handler_stats(msg: Message, command: CommandObject):
+    arg = (command.args or "").strip()
+    if arg == "reset":
+        metrics.clear()
+        await msg.answer("Метрики хендлеров обнулены.")
+        return
+
+    rows = metrics.top(int(arg) if arg.isdigit() else 15)
+    if not rows:
+        await msg.answer("Метрик пока нет.")
+        return
+
+    since = datetime.fromtimestamp(metrics.started_at).strftime("%d.%m %H:%M")
+    lines = [
+        f"{'handler':<34}{'n':>7}{'p50':>7}{'p95':>7}{'p99':>7}{'sql':>5}{'err':>5}{'now':>4}"
+    ]
+    for r in rows:
+        lines.append(
+            f"{r['handler'][:34]:<34}{r['count']:>7}"
+            f"{r['p50'] * 1000:>7.0f}{r['p95'] * 1000:>7.0f}{r['p99'] * 1000:>7.0f}"
+            f"{r['queries']:>5.1f}{r['errors']:>5}{r['in_flight']:>4}"
+        )
+    await msg.answer(
+        f"⏱ <b>Хендлеры с {since}</b> (мс; sql — запросов на вызов)\n"
+        f"<pre>{html.escape(chr(10).join(lines))}</pre>"
+    )
@@ -1,3 +1,4 @@
+import logging
 from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
@@ -22,6 +23,9 @@ from ...services.tasks import (
     get_assignment_full,
 )
 from ...states.tasks import TaskCreateStates
+from sqlalchemy.ext.asyncio import AsyncSession
+
+log = logging.getLogger(__name__)
 
 
 router = Router(name="admin_tasks")
@@ -30,7 +34,7 @@ router = Router(name="admin_tasks")
 # Debug
 @router.callback_query(F.data.startswith("admin:assign"))
 async def debug_admin_assign(cb: CallbackQuery):
-    print("[DEBUG ADMIN ASSIGN]", cb.data)
+    log.debug("[admin_assign] %s", cb.data)
 
 
 # Вход в раздел
@@ -45,7 +49,7 @@ async def admin_tasks_root(cb: CallbackQuery):
 # Список
 @router.callback_query(IsAdmin(), F.data == "admin:tasks:list")
 async def admin_tasks_list(cb: CallbackQuery):
-    items = admin_list_all_tasks()
+    items = await admin_list_all_tasks()
     if not items:
         await cb.message.edit_text(
             "Заданий пока нет.", reply_markup=admin_tasks_root_kb()
@@ -61,11 +65,11 @@ async def admin_tasks_list(cb: CallbackQuery):
 @router.callback_query(IsAdmin(), F.data.startswith("admin:tasks:toggle:"))
 async def admin_tasks_toggle(cb: CallbackQuery):
     tid = int(cb.data.split(":")[-1])
-    ok = admin_toggle_task_publised(tid)
+    ok = await admin_toggle_task_publised(tid)
     if not ok:
         return await cb.answer("Задание не найдено", show_alert=True)
     # перерисуем список
-    items = admin_list_all_tasks()
+    items = await admin_list_all_tasks()
     await cb.message.edit_text(
         "📋 Список заданий:", reply_markup=admin_tasks_list_kb(items)
     )
@@ -76,10 +80,10 @@ async def admin_tasks_toggle(cb: CallbackQuery):
 @router.callback_query(IsAdmin(), F.data.startswith("admin:tasks:delete:"))
 async def admin_tasks_delete(cb: CallbackQuery):
     tid = int(cb.data.split(":")[-1])
-    ok = admin_delete_task(tid)
+    ok = await admin_delete_task(tid)
     if not ok:
         return await cb.answer("Задание не найдено", show_alert=True)
-    items = admin_list_all_tasks()
+    items = await admin_list_all_tasks()
     if not items:
         await cb.message.edit_text(
             "Задание удалено. Список пуст.", reply_markup=admin_tasks_root_kb()
@@ -96,7 +100,7 @@ async def admin_assignments_pending(cb: CallbackQuery):
     """
     Экран списка всех заданий в статусе 'submitted'.
     """
-    items = list_pending_assignments()
+    items = await list_pending_assignments()
 
     if not items:
         await cb.answer("Нет заданий на модерации 👍", show_alert=True)
@@ -121,7 +125,7 @@ async def admin_assignments_pending(cb: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("admin:assign:open:"))
-async def admin_assign_open(cb: CallbackQuery):
+async def admin_assign_open(cb: CallbackQuery, session: AsyncSession | None = None):
     """
     Открыть одну конкретную сдачу для проверки.
     """
@@ -131,7 +135,7 @@ async def admin_assign_open(cb: CallbackQuery):
         await cb.answer("Неверный формат callback-data", show_alert=True)
         return
 
-    ass = get_assignment_for_moderation(assignment_id)
+    ass = await get_assignment_for_moderation(assignment_id, session=session)
     if not ass:
         await cb.answer(
             "Не нашёл это задание. Возможно, уже обработано.", show_alert=True
@@ -159,7 +163,9 @@ async def admin_assign_open(cb: CallbackQuery):
         text_lines.append(ass["submission_text"])
         text_lines.append("")
 
-    if ass["submission_file_id"]:
+    if ass["submission_files"] > 1:
+        text_lines.append(f"🖼 Прикреплён альбом: {ass['submission_files']} файлов.")
+    elif ass["submission_file_id"]:
         text_lines.append("🖼 Есть прикреплённое фото.")
         # если захочешь — можешь отдельным сообщением присылать photo по file_id
         text_lines.append("")
@@ -194,8 +200,8 @@ async def admin_assign_open(cb: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("admin:assign:open:"))
-async def admin_open_assignment(cb: CallbackQuery):
-    print("[DEBUG ADMIN OPEN RAW]", cb.data)
+async def admin_open_assignment(cb: CallbackQuery, session: AsyncSession | None = None):
+    log.debug("[admin_open_assignment] %s", cb.data)
     parts = cb.data.split(":")
     try:
         assignment_id = int(parts[-1])
@@ -203,7 +209,7 @@ async def admin_open_assignment(cb: CallbackQuery):
         await cb.answer("Некорректный ID заявки.", show_alert=True)
         return
 
-    info = get_assignment_full(assignment_id)
+    info = await get_assignment_full(assignment_id, session=session)
     if not info:
         await cb.answer("Заявка не найдена.", show_alert=True)
         return
@@ -238,14 +244,14 @@ async def admin_open_assignment(cb: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("admin:assign:approve:"))
-async def admin_assign_approve(cb: CallbackQuery):
+async def admin_assign_approve(cb: CallbackQuery, session: AsyncSession | None = None):
     try:
         assignment_id = int(cb.data.split(":")[3])
     except (IndexError, ValueError):
         await cb.answer("Неверный формат callback-data", show_alert=True)
         return
 
-    ok = approve_assignment(assignment_id)
+    ok = await approve_assignment(assignment_id, session=session)
     if not ok:
         await cb.answer(
             "Не удалось одобрить (возможно, уже обработано).", show_alert=True
@@ -255,7 +261,7 @@ async def admin_assign_approve(cb: CallbackQuery):
     await cb.answer("✅ Одобрено, монеты начислены!", show_alert=True)
 
     # Перерисуем список оставшихся
-    items = list_pending_assignments()
+    items = await list_pending_assignments()
     if not items:
         await cb.message.edit_text(
             "🎉 Все задания проверены!", reply_markup=admin_tasks_root_kb()
@@ -266,14 +272,14 @@ async def admin_assign_approve(cb: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("admin:assign:reject:"))
-async def admin_assign_reject(cb: CallbackQuery):
+async def admin_assign_reject(cb: CallbackQuery, session: AsyncSession | None = None):
     try:
         assignment_id = int(cb.data.split(":")[3])
     except (IndexError, ValueError):
         await cb.answer("Неверный формат callback-data", show_alert=True)
         return
 
-    ok = reject_assignment(assignment_id)
+    ok = await reject_assignment(assignment_id, session=session)
     if not ok:
         await cb.answer(
             "Не удалось отклонить (возможно, уже обработано).", show_alert=True
@@ -282,7 +288,7 @@ async def admin_assign_reject(cb: CallbackQuery):
 
     await cb.answer("❌ Отклонено.", show_alert=True)
 
-    items = list_pending_assignments()
+    items = await list_pending_assignments()
     if not items:
         await cb.message.edit_text(
             "🎉 Все задания проверены!", reply_markup=admin_tasks_root_kb()
@@ -294,9 +300,9 @@ async def admin_assign_reject(cb: CallbackQuery):
 # Засеять демо
 @router.callback_query(IsAdmin(), F.data == "admin:tasks:seed")
 async def admin_tasks_seed(cb: CallbackQuery):
-    seed_tasks_if_empty()
+    await seed_tasks_if_empty()
     await cb.answer("Демо-набор проверен/засеян")
-    items = admin_list_all_tasks()
+    items = await admin_list_all_tasks()
     if not items:
         await cb.message.edit_text(
             "Не удалось создать демо-набор.", reply_markup=admin_tasks_root_kb()
@@ -375,7 +381,7 @@ async def admin_tasks_add_deadline(msg: Message, state: FSMContext):
 
     # ВАЖНО: здесь НИЧЕГО не спрашиваем про сложность —
     # она определяется автоматически по reward внутри admin_create_task
-    task_id = admin_create_task(
+    task_id = await admin_create_task(
         title=title,
         description=description,
         reward=reward,
@@ -26,7 +26,7 @@ def _format_event_line(ev) -> str:
 
 @router.callback_query(F.data == "menu:open:calendar")
 async def open_calendar(cb: CallbackQuery):
-    events = list_upcoming_events(limit=10)
+    events = await list_upcoming_events(limit=10)
 
     if not events:
         await cb.message.edit_text(
@@ -45,7 +45,7 @@ async def open_calendar(cb: CallbackQuery):
 
 @router.message(F.text == "/calendar")
 async def calendar_command(msg: Message):
-    events = list_upcoming_events(limit=10)
+    events = await list_upcoming_events(limit=10)
 
     if not events:
         await msg.answer(
@@ -64,7 +64,7 @@ async def calendar_command(msg: Message):
 @router.message(Command("calendar"))
 async def show_upcoming_events(msg: Message):
     user_id = msg.from_user.id
-    events = get_upcoming_events(user_id)
+    events = await get_upcoming_events(user_id)
 
     if not events:
         await msg.answer("У вас нет предстоящих событий.")
@@ -82,7 +82,7 @@ async def show_upcoming_events(msg: Message):
 @router.callback_query(F.data == "mentor:choose")  # calendar:all // mentor:choose"
 async def show_all_events(cb: CallbackQuery):
     user_id = cb.from_user.id
-    events = get_all_events(user_id)
+    events = await get_all_events(user_id)
 
     if not events:
         await cb.message.edit_text("У вас нет событий.")
@@ -124,7 +124,7 @@ def _render_events(events) -> str:
 
 @router.callback_query(F.data == "menu:open:calendar")
 async def open_calendar_root(cb: CallbackQuery):
-    events = list_upcoming_events(limit=5)
+    events = await list_upcoming_events(limit=5)
     text = _render_events(events)
 
     await cb.message.edit_text(
@@ -137,7 +137,7 @@ async def open_calendar_root(cb: CallbackQuery):
 
 @router.callback_query(F.data == "calendar:all")
 async def open_caledar_all(cb: CallbackQuery):
-    events = list_all_events(limit=50)
+    events = await list_all_events(limit=50)
 
     if not events:
         text = "Пока нет запланированных событий 🙈"
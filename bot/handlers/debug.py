@@ -5,13 +5,14 @@ from aiogram.types import Message
 
 from ..services.users import get_user  # или get_or_create_user, как у тебя
 from ..config import get_settings
+from ..services.user_cache import user_cache
 
 router = Router(name="debug")
 
 
 @router.message(Command("whoime"))
 async def whoime(msg: Message):
-    user = get_user(msg.from_user.id)
+    user = await get_user(msg.from_user.id)
     setting = get_settings()
 
     db_admin = bool(user and getattr(user, "is_admin", False))
@@ -36,4 +37,10 @@ async def whoime(msg: Message):
         f"🪙 Coins: <b>{coins}</b>\n"
         f"🛡 Админ: <b>{admin_text}</b>"
     )
+    if is_admin:
+        st = user_cache.stats()
+        text += (
+            f"\n\n🗂 Кэш пользователей: {st['size']} шт., "
+            f"hit {st['hits']} / miss {st['misses']} ({st['hit_rate']:.0%})"
+        )
     await msg.answer(text)
@@ -40,7 +40,7 @@ async def help_command(msg: Message):
 
 @router.message(Command("whoime"))
 async def whoime(msg: Message):
-    user = get_user(msg.from_user.id)
+    user = await get_user(msg.from_user.id)
     settings = get_settings()
 
     text = (
@@ -1,3 +1,4 @@
+import logging
 from aiogram import Router, F
 from aiogram.types import (
     CallbackQuery,
@@ -25,6 +26,8 @@ from ..keyboards.common import (
     main_menu_kb,
 )
 
+log = logging.getLogger(__name__)
+
 router = Router(name="mentorship")
 
 
@@ -43,7 +46,7 @@ async def mentorship_root(cb: CallbackQuery):
 # Просмотр списка наставников
 @router.message(Command("mentors"))
 async def show_mentors(msg: Message):
-    mentors = get_mentor_list()
+    mentors = await get_mentor_list()
     if not mentors:
         await msg.answer("Нет доступных наставников.")
         return
@@ -65,7 +68,7 @@ async def show_mentors(msg: Message):
 # Выбор наставника
 @router.callback_query(F.data == "mentor:choose")
 async def choose_mentor(cb: CallbackQuery):
-    mentors = get_mentor_list()
+    mentors = await get_mentor_list()
     if not mentors:
         await cb.message.edit_text(
             "Пока нет доступных наставников.", reply_markup=mentorship_root_kb()
@@ -80,7 +83,7 @@ async def choose_mentor(cb: CallbackQuery):
 @router.callback_query(F.data.startswith("mentor:pick:"))
 async def pick_mentor(cb: CallbackQuery):
     mentor_id = int(cb.data.split(":")[2])
-    mentor = get_user(mentor_id)
+    mentor = await get_user(mentor_id)
     if not mentor:
         await cb.answer("Наставник не найден")
         return
@@ -128,13 +131,13 @@ async def confirm_application(cb: CallbackQuery):
     except Exception:
         await cb.answer("Некорректная тема")
         return
-    app = create_mentor_application(cb.from_user.id, mentor_id, topic_enum)
+    app = await create_mentor_application(cb.from_user.id, mentor_id, topic_enum)
     if app.status == "pending":
         await cb.message.edit_text(
             "Заявка отправлена ✅\nСтатус: pending", reply_markup=mentorship_root_kb()
         )
         # уведомим ментора (если есть его tg id)
-        mentor = get_user(mentor_id)
+        mentor = await get_user(mentor_id)
         if mentor and mentor.tg_id:
             try:
                 await cb.bot.send_message(
@@ -155,7 +158,7 @@ async def confirm_application(cb: CallbackQuery):
 # Мои заявки
 @router.callback_query(F.data == "mentor:myapps")
 async def my_apps(cb: CallbackQuery):
-    apps = get_user_applications(cb.from_user.id)
+    apps = await get_user_applications(cb.from_user.id)
     if not apps:
         await cb.message.edit_text(
             "У вас пока нет заявок.", reply_markup=mentorship_root_kb()
@@ -165,7 +168,7 @@ async def my_apps(cb: CallbackQuery):
     for a in apps:
         topic = a.topic
         status = a.status
-        mn = get_user(a.mentor_id)
+        mn = await get_user(a.mentor_id)
         mname = f"@{mn.username}" if mn and mn.username else f"ID {a.mentor_id}"
         lines.append(f"• {topic} → {mname} — <b>{status}</b>")
     await cb.message.edit_text(
@@ -179,7 +182,7 @@ async def my_apps(cb: CallbackQuery):
 # Инбокс ментора (pending заявки)
 @router.callback_query(F.data == "mentor:inbox")
 async def mentor_inbox(cb: CallbackQuery):
-    inbox = get_incoming_for_mentor(cb.from_user.id, status="pending")
+    inbox = await get_incoming_for_mentor(cb.from_user.id, status="pending")
     if not inbox:
         await cb.message.edit_text(
             "Входящих заявок нет.", reply_markup=mentorship_root_kb()
@@ -187,7 +190,7 @@ async def mentor_inbox(cb: CallbackQuery):
         return await cb.answer()
     # Покажем по одной (простая версия): последнюю
     app = inbox[0]
-    usr = get_user(app.user_id)
+    usr = await get_user(app.user_id)
     uname = f"@{usr.username}" if usr and usr.username else f"ID {app.user_id}"
     text = (
         f"📥 Заявка #{app.id}\n"
@@ -208,14 +211,14 @@ async def app_decision(cb: CallbackQuery):
     app_id = int(app_id)
     if action not in {"approve", "reject"}:
         return await cb.answer("Неизвестное действие")
-    updated = set_application_status(
+    updated = await set_application_status(
         app_id, cb.from_user.id, "approved" if action == "approve" else "rejected"
     )
     if not updated:
         await cb.answer("Заявка не найдена или уже обработана")
         return
     # уведомим пользователя
-    usr = get_user(updated.user_id)
+    usr = await get_user(updated.user_id)
     if usr and usr.tg_id:
         try:
             await cb.bot.send_message(
@@ -239,13 +242,13 @@ async def mentor_callback(cb: CallbackQuery):
     user_id = cb.from_user.id
 
     # Проверка, что наставник существует
-    mentor = get_user(mentor_id)
+    mentor = await get_user(mentor_id)
     if not mentor:
         await cb.answer("Наставник не найден.")
         return
 
     # Отправка заявки
-    create_mentor_application(user_id=user_id, mentor_id=mentor_id, topic=topic)
+    await create_mentor_application(user_id=user_id, mentor_id=mentor_id, topic=topic)
     await cb.answer("Ваша заявка на менторство отправлена!")
 
 
@@ -254,5 +257,4 @@ async def back_to_main_menu(cb: CallbackQuery):
     text = "Вы вернулись в главное меню."
     await cb.message.edit_text(text, reply_markup=main_menu_kb())  # Главное меню
     await cb.answer()
-
-    print(f"Received callback with data: {cb.data}")  # Для отладки
+    log.debug("[back_to_main_menu] %s", cb.data)
@@ -2,8 +2,11 @@ from aiogram import Router, F
 from aiogram.types import CallbackQuery, Message
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import Command
-from ..services.users import get_user_by_username
-from ..services.tasks import get_user
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..services.badges import badges_for_coins
+from ..services.rating import get_user_position
+from ..services.user_cache import get_cached_user
 from ..keyboards.common import (
     profile_kb,
     profile_history_filters_kb,
@@ -53,26 +56,40 @@ def _profile_card(
     )
 
 
-@router.message(Command("profile"))
-async def open_profile(msg: Message):
-    user_id = msg.from_user.id
-
-    # Получаем профиль пользователя
-    profile_data = get_user_by_username(user_id)  # Извлекаем данные из базы данных
-    badges = get_user(user_id)  # Получаем бейджи пользователя
-
-    # Формируем текст профиля
-    profile_text = _profile_card(
-        username=profile_data.username,
-        role=profile_data.role,
-        coins=profile_data.coins,
-        position=profile_data.position,
+async def _profile_text(tg_id: int, session: AsyncSession | None = None) -> str | None:
+    user = await get_cached_user(tg_id, session=session)
+    if user is None:
+        return None
+    position, _ = await get_user_position(tg_id)
+    badges = [f"{b.icon} {b.title}" for b in badges_for_coins(user.coins)]
+    return _profile_card(
+        username=user.username,
+        role=user.role,
+        coins=user.coins,
+        position=position,
         badges=badges,
-        created_at=profile_data.created_at,
+        created_at=user.created_at,
     )
 
-    # Отправляем сообщение с профилем
-    await msg.answer(profile_text, reply_markup=profile_kb())
+
+NOT_REGISTERED = "Профиль не найден. Нажми /start, чтобы зарегистрироваться."
+
+
+@router.message(Command("profile"))
+async def open_profile(msg: Message, session: AsyncSession | None = None):
+    text = await _profile_text(msg.from_user.id, session=session)
+    if text is None:
+        return await msg.answer(NOT_REGISTERED)
+    await msg.answer(text, reply_markup=profile_kb())
+
+
+@router.callback_query(F.data == "menu:open:profile")
+async def open_profile_cb(cb: CallbackQuery, session: AsyncSession | None = None):
+    text = await _profile_text(cb.from_user.id, session=session)
+    if text is None:
+        return await cb.answer(NOT_REGISTERED, show_alert=True)
+    await _safe_edit(cb.message, text, profile_kb())
+    await cb.answer()
 
 
 def _role_title(role: str) -> str:
@@ -85,8 +102,8 @@ def _role_title(role: str) -> str:
 
 
 @router.callback_query(F.data == "profile:history")
-async def profile_history_root(cb: CallbackQuery):
-    counts = count_assignments_by_status(cb.from_user.id)
+async def profile_history_root(cb: CallbackQuery, session: AsyncSession | None = None):
+    counts = await count_assignments_by_status(cb.from_user.id, session=session)
     text = (
         "📜 <b>История активности</b>\n"
         "Выберите категорию:\n"
@@ -100,14 +117,20 @@ async def profile_history_root(cb: CallbackQuery):
 
 # список по группе с пагинацией
 @router.callback_query(F.data.startswith("profile:history:list:"))
-async def profile_history_list(cb: CallbackQuery):
+async def profile_history_list(cb: CallbackQuery, session: AsyncSession | None = None):
+    # profile:history:list:<group>:<cursor>[:<diff>]; cursor "1" — первая страница
     parts = cb.data.split(":")
     group = parts[3]
-    page = max(1, int(parts[4]))
+    cursor = parts[4] if len(parts) > 4 else "1"
     diff = parts[5] if len(parts) > 5 else "all"
 
-    rows = list_assignments(
-        cb.from_user.id, group=group, page=page, per_page=10, diff=diff
+    rows, next_cursor = await list_assignments(
+        cb.from_user.id,
+        group=group,
+        cursor=cursor,
+        per_page=10,
+        diff=diff,
+        session=session,
     )
 
     group_title = {
@@ -118,7 +141,7 @@ async def profile_history_list(cb: CallbackQuery):
 
     if not rows:
         text = f"📜 <b>{group_title}</b> · сложность: {diff}\nПока пусто."
-        kb = profile_history_list_kb(group, page, diff)
+        kb = profile_history_list_kb(group, cursor, diff)
         await _safe_edit(cb.message, text, kb)
         return await cb.answer("Обновлено")
 
@@ -126,7 +149,7 @@ async def profile_history_list(cb: CallbackQuery):
         m = reward_to_difficulty(reward)
         return {"easy": "🟢", "medium": "🟡", "hard": "🔴"}.get(m, "•")
 
-    lines = [f"📜 <b>{group_title}</b> · сложность: {diff} (стр. {page})", ""]
+    lines = [f"📜 <b>{group_title}</b> · сложность: {diff}", ""]
     for aid, title, status, reward, due_at, submitted_at in rows:
         when = (
             due_at.strftime("%Y-%m-%d %H:%M")
@@ -134,6 +157,7 @@ async def profile_history_list(cb: CallbackQuery):
             else (submitted_at.strftime("%Y-%m-%d %H:%M") if submitted_at else "—")
         )
         mark = {
+            "active": "🚧",
             "in_progress": "🚧",
             "submitted": "🕒",
             "approved": "✅",
@@ -145,7 +169,7 @@ async def profile_history_list(cb: CallbackQuery):
     lines.append("Открой карточку: отправь <code>my:assign:view:&lt;id&gt;</code>")
 
     text = "\n".join(lines)
-    kb = profile_history_list_kb(group, page, diff)
+    kb = profile_history_list_kb(group, cursor, diff, next_cursor)
     await _safe_edit(cb.message, text, kb)
     await cb.answer("Обновлено")
 
@@ -179,24 +203,24 @@ async def _safe_edit(message, text: str, reply_markup=None):
 
 # карточка по текстовой команде
 @router.callback_query(F.data.startswith("my:assign:view:"))
-async def profile_assign_view_cb(cb: CallbackQuery):
+async def profile_assign_view_cb(cb: CallbackQuery, session: AsyncSession | None = None):
     # на случай, если сделаешь кнопку — оставлен роутер для cb
     aid = int(cb.data.split(":")[-1])
-    await _send_assignment_card(cb, aid, group="active", page=1)  # дефолты
+    await _send_assignment_card(cb, aid, group="active", page=1, session=session)  # дефолты
 
 
 @router.message(F.text.startswith("my:assign:view:"))
-async def profile_assign_view_cmd(msg):
+async def profile_assign_view_cmd(msg, session: AsyncSession | None = None):
     try:
         aid = int(msg.text.split(":")[-1])
     except Exception:
         return await msg.answer("Формат: my:assign:view:<id>")
     # без контекста группы/страницы покажем базово
-    await _send_assignment_card(msg, aid, group="active", page=1)
+    await _send_assignment_card(msg, aid, group="active", page=1, session=session)
 
 
-async def _send_assignment_card(target, assignment_id: int, group: str, page: int):
-    a = get_assignment_card(assignment_id)
+async def _send_assignment_card(target, assignment_id: int, group: str, page: int, session: AsyncSession | None = None):
+    a = await get_assignment_card(assignment_id, session=session)
     if not a:
         if hasattr(target, "answer"):
             return await target.answer("Заявка не найдена.")
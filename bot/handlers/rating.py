@@ -19,8 +19,8 @@ async def rating_open(cb: CallbackQuery):
 
 
 async def send_rating(target: Message):
-    top = get_leaderboard(10)
-    you_pos, you_coins = get_user_position(target.from_user.id)
+    top = await get_leaderboard(10)
+    you_pos, you_coins = await get_user_position(target.from_user.id)
 
     lines = ["🏆 <b>Топ-10</b>"]
     if not top:
@@ -51,7 +51,7 @@ async def on_role_choose(cb: CallbackQuery):
     }
     title = titles.get(role, role)
 
-    set_role(cb.from_user.id, role)
+    await set_role(cb.from_user.id, role)
 
     await cb.message.edit_text(
         f"✅ Роль установлена: <b>{title}</b>\nОткрываю главное меню…",
@@ -13,12 +13,22 @@ from ...keyboards.common import (
     task_view_kb,
     task_details_kb,
 )
+from ...services.catalog_cache import CatalogPage, catalog_cache
 from ...utils.telegram import safe_edit_text
 from ...storage.models import Task
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 router = Router(name="tasks_catalog")
 
+CATALOG_PAGE_SIZE = 10
+_CATALOG_TITLES = {
+    "easy": "🟢 Лёгкие задания",
+    "medium": "🟡 Средние задания",
+    "hard": "🔴 Сложные задания",
+    "all": "📚 Каталог заданий",
+}
+
 
 def render_tasks_list(tasks: list[Task], title: str = "📚 Каталог заданий") -> str:
     """
@@ -99,18 +109,44 @@ def render_task_card(t: Task) -> str:
     return "\n".join(lines)
 
 
-@router.callback_query(F.data == "menu:open:tasks")
-async def open_tasks_root(cb: CallbackQuery):
-    tasks = list_public_tasks(difficulty="all")
-    text = render_tasks_list(tasks, title="📚 Каталог заданий")
-    kb = tasks_catalog_kb(tasks)
+async def catalog_page(
+    diff: str, page: int, session: AsyncSession | None = None
+) -> CatalogPage:
+    """
+    Экран каталога из кэша: БД и рендер — только при первом запросе
+    после изменения заданий (см. catalog_cache.invalidate в services.tasks).
+    """
 
-    await safe_edit_text(cb.message, text, reply_markup=kb, parse_mode=ParseMode.HTML)
+    async def build() -> CatalogPage:
+        tasks = await list_public_tasks(
+            difficulty=diff,
+            session=session,
+            limit=CATALOG_PAGE_SIZE + 1,
+            offset=(page - 1) * CATALOG_PAGE_SIZE,
+        )
+        has_next = len(tasks) > CATALOG_PAGE_SIZE
+        tasks = tasks[:CATALOG_PAGE_SIZE]
+        return CatalogPage(
+            text=render_tasks_list(
+                tasks, title=_CATALOG_TITLES.get(diff, _CATALOG_TITLES["all"])
+            ),
+            markup=tasks_catalog_kb(tasks, diff=diff, page=page, has_next=has_next),
+        )
+
+    return await catalog_cache.get(diff, page, build)
+
+
+@router.callback_query(F.data == "menu:open:tasks")
+async def open_tasks_root(cb: CallbackQuery, session: AsyncSession | None = None):
+    page = await catalog_page("all", 1, session=session)
+    await safe_edit_text(
+        cb.message, page.text, reply_markup=page.markup, parse_mode=ParseMode.HTML
+    )
     await cb.answer()
 
 
 @router.callback_query(F.data.startswith("tasks:view:"))
-async def open_task_details(cb: CallbackQuery):
+async def open_task_details(cb: CallbackQuery, session: AsyncSession | None = None):
     # callback вида: tasks:open:2
     try:
         task_id = int(cb.data.split(":")[2])
@@ -118,13 +154,13 @@ async def open_task_details(cb: CallbackQuery):
         await cb.answer("Неверный формат callback.", show_alert=True)
         return
 
-    t = get_task(task_id)
+    t = await get_task(task_id, session=session)
     if not t:
         await cb.answer("Задание не найдено.", show_alert=True)
         return
 
     # вот тут решаем, что показывать — «Взять» или «Сдать»
-    already = has_active_assignment(cb.from_user.id, task_id)
+    already = await has_active_assignment(cb.from_user.id, task_id, session=session)
 
     desc = (t.description or "").strip() if t.description else "—"
     difficulty = getattr(t, "difficulty", None) or "—"
@@ -147,34 +183,37 @@ async def open_task_details(cb: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("tasks:filter:"))
-async def filter_tasks(cb: CallbackQuery):
+async def filter_tasks(cb: CallbackQuery, session: AsyncSession | None = None):
     _, _, diff = cb.data.split(":", 2)  # easy / medium / hard / all
+    if diff not in _CATALOG_TITLES:
+        diff = "all"
 
-    difficulty = diff if diff != "all" else None
-    tasks = list_public_tasks(difficulty=difficulty)
+    page = await catalog_page(diff, 1, session=session)
+    await safe_edit_text(cb.message, page.text, reply_markup=page.markup)
+    await cb.answer()
 
-    title_map = {
-        "easy": "🟢 Лёгкие задания",
-        "medium": "🟡 Средние задания",
-        "hard": "🔴 Сложные задания",
-        "all": "📚 Все задания",
-    }
-    title = title_map.get(diff, "📚 Каталог заданий")
 
-    text = render_tasks_list(tasks, title=title)
+@router.callback_query(F.data.startswith("tasks:page:"))
+async def catalog_page_cb(cb: CallbackQuery, session: AsyncSession | None = None):
+    # tasks:page:<diff>:<page>
+    try:
+        _, _, diff, raw_page = cb.data.split(":")
+        page_no = max(1, int(raw_page))
+    except ValueError:
+        await cb.answer("Неверный формат callback.", show_alert=True)
+        return
+    if diff not in _CATALOG_TITLES:
+        diff = "all"
 
-    await safe_edit_text(
-        cb.message,
-        text,
-        reply_markup=tasks_catalog_kb(tasks),
-    )
+    page = await catalog_page(diff, page_no, session=session)
+    await safe_edit_text(cb.message, page.text, reply_markup=page.markup)
     await cb.answer()
 
 
 @router.callback_query(F.data.startswith("task:view:"))
-async def view_task(cb: CallbackQuery):
+async def view_task(cb: CallbackQuery, session: AsyncSession | None = None):
     task_id = int(cb.data.split(":")[2])
-    t = get_task(task_id)
+    t = await get_task(task_id, session=session)
     if not t:
         await cb.answer("Задание не найдено")
         return
@@ -203,24 +242,24 @@ def _difficulty_title(code: str) -> str:
 
 
 @router.callback_query(F.data == "tasks:filter:easy")
-async def tasks_easy(cb: CallbackQuery):
-    tasks = list_public_tasks(difficulty="easy")
+async def tasks_easy(cb: CallbackQuery, session: AsyncSession | None = None):
+    tasks = await list_public_tasks(difficulty="easy", session=session)
     text = render_tasks_list(tasks, title="🟢 Лёгкие задания")
     await cb.message.edit_text(text, reply_markup=tasks_filters_kb())
     await cb.answer()
 
 
 @router.callback_query(F.data == "tasks:filter:medium")
-async def tasks_medium(cb: CallbackQuery):
-    tasks = list_public_tasks(difficulty="medium")
+async def tasks_medium(cb: CallbackQuery, session: AsyncSession | None = None):
+    tasks = await list_public_tasks(difficulty="medium", session=session)
     text = render_tasks_list(tasks, title="🟡 Средние задания")
     await cb.message.edit_text(text, reply_markup=tasks_filters_kb())
     await cb.answer()
 
 
 @router.callback_query(F.data == "tasks:filter:hard")
-async def tasks_hard(cb: CallbackQuery):
-    tasks = list_public_tasks(difficulty="hard")
+async def tasks_hard(cb: CallbackQuery, session: AsyncSession | None = None):
+    tasks = await list_public_tasks(difficulty="hard", session=session)
     text = render_tasks_list(tasks, title="🔴 Сложные задания")
     await cb.message.edit_text(text, reply_markup=tasks_filters_kb())
     await cb.answer()
@@ -264,7 +303,7 @@ async def tasks_hard(cb: CallbackQuery):
 
 
 @router.callback_query(F.data.startswith("tasks:take:"))
-async def take_task_cb(cb: CallbackQuery):
+async def take_task_cb(cb: CallbackQuery, session: AsyncSession | None = None):
     """
     Пользователь нажал 'Взять задание' в карточке.
     """
@@ -277,17 +316,17 @@ async def take_task_cb(cb: CallbackQuery):
     user_id = cb.from_user.id
 
     # Проверяем, нет ли уже активного назначения по ЭТОМУ заданию
-    if has_active_assignment(user_id, task_id):
+    if await has_active_assignment(user_id, task_id, session=session):
         await cb.answer("У тебя уже есть это задание в работе.", show_alert=True)
         return
 
     # Пробуем выдать задание
-    ok = take_task(user_id, task_id)
+    ok = await take_task(user_id, task_id, session=session)
     if not ok:
         await cb.answer("Не удалось выдать задание. Попробуй позже.", show_alert=True)
         return
 
-    t = get_task(task_id)
+    t = await get_task(task_id, session=session)
     if not t:
         await cb.answer("Задание не найдено.", show_alert=True)
         return
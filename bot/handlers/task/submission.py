@@ -4,6 +4,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.filters import Command
 
 
+from ...middlewares.album import AlbumMiddleware
 from ...states.task_submit import TaskSubmit
 from ...services.tasks import (
     get_active_assignment,
@@ -11,12 +12,22 @@ from ...services.tasks import (
     has_active_assignment,
 )
 from ...keyboards.common import main_menu_kb, task_view_kb
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = Router(name="tasks_submit")
+# альбом-доказательство — один вызов submit_photo со всеми файлами
+router.message.middleware(AlbumMiddleware())
+
+
+def _proof_file_id(message: Message) -> str | None:
+    if message.photo:
+        return sorted(message.photo, key=lambda p: p.file_size or 0)[-1].file_id
+    media = message.video or message.document
+    return media.file_id if media else None
 
 
 @router.callback_query(F.data.startswith("tasks:submit:"))
-async def submit_start(cb: CallbackQuery, state: FSMContext):
+async def submit_start(cb: CallbackQuery, state: FSMContext, session: AsyncSession | None = None):
     """
     Нажали кнопку «📤 Сдать задание» под карточкой.
     Переводим пользователя в состояние ожидания доказательства.
@@ -27,7 +38,7 @@ async def submit_start(cb: CallbackQuery, state: FSMContext):
         await cb.answer("⚠ Неверный формат callback.", show_alert=True)
         return
 
-    assignment = get_active_assignment(cb.from_user.id, task_id)
+    assignment = await get_active_assignment(cb.from_user.id, task_id, session=session)
     if not assignment:
         await cb.answer("Сначала возьмите задание.", show_alert=True)
         return
@@ -48,18 +59,19 @@ async def submit_start(cb: CallbackQuery, state: FSMContext):
 
 
 @router.message(TaskSubmit.waiting_proof, F.text)
-async def submit_text(message: Message, state: FSMContext):
+async def submit_text(message: Message, state: FSMContext, session: AsyncSession | None = None):
     """
     Пользователь в состоянии waiting_proof присылает текст (ссылку, описание).
     """
     data = await state.get_data()
     task_id = data.get("task_id")
 
-    ok = submit_task(
+    ok = await submit_task(
         user_tg_id=message.from_user.id,
         task_id=task_id,
         text=message.text,
         file_id=None,
+        session=session,
     )
     if not ok:
         await message.answer("⚠ Не получилось сохранить сдачу. Попробуй ещё раз позже.")
@@ -68,28 +80,38 @@ async def submit_text(message: Message, state: FSMContext):
     await state.clear()
 
     # важное место: считаем, что задание всё ещё "активное/отправлено"
-    already = has_active_assignment(message.from_user.id, task_id)
+    already = await has_active_assignment(message.from_user.id, task_id, session=session)
     await message.answer(
         "✅ Доказательство принято! Статус: <b>submitted</b>\nОжидайте проверки модератором.",
         reply_markup=task_view_kb(task_id, already_taken=already),
     )
 
 
-@router.message(TaskSubmit.waiting_proof, F.photo)
-async def submit_photo(message: Message, state: FSMContext):
+@router.message(TaskSubmit.waiting_proof, F.photo | F.media_group_id)
+async def submit_photo(
+    message: Message,
+    state: FSMContext,
+    session: AsyncSession | None = None,
+    album: list[Message] | None = None,
+):
     """
-    Пользователь в состоянии waiting_proof присылает фото.
+    Пользователь в состоянии waiting_proof присылает фото или альбом
+    (AlbumMiddleware собирает его части в album).
     """
     data = await state.get_data()
     task_id = data.get("task_id")
 
-    largest = sorted(message.photo, key=lambda p: p.file_size or 0)[-1]
+    messages = album or [message]
+    file_ids = [f for f in map(_proof_file_id, messages) if f]
+    caption = next((m.caption for m in messages if m.caption), None)
 
-    ok = submit_task(
+    ok = await submit_task(
         user_tg_id=message.from_user.id,
         task_id=task_id,
-        text=None,
-        file_id=largest.file_id,
+        text=caption,
+        file_id=None,
+        file_ids=file_ids,
+        session=session,
     )
     if not ok:
         await message.answer("⚠ Не получилось сохранить фото. Попробуй ещё раз позже.")
@@ -97,9 +119,10 @@ async def submit_photo(message: Message, state: FSMContext):
 
     await state.clear()
 
-    already = has_active_assignment(message.from_user.id, task_id)
+    already = await has_active_assignment(message.from_user.id, task_id, session=session)
+    got = "Фото получено!" if len(file_ids) == 1 else f"Получено файлов: {len(file_ids)}!"
     await message.answer(
-        "✅ Фото получено! Статус: <b>submitted</b>\nОжидайте проверки модератором.",
+        f"✅ {got} Статус: <b>submitted</b>\nОжидайте проверки модератором.",
         reply_markup=task_view_kb(task_id, already_taken=already),
     )
 
@@ -138,6 +138,33 @@ def admin_pending_kb(assignments: Sequence[TaskAssignment]) -> InlineKeyboardMar
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
+def admin_pending_nav_kb(
+    cursor: str = "1", next_cursor: str | None = None, *, bulk: bool = False
+) -> InlineKeyboardMarkup:
+    """
+    Листание очереди «на проверке» курсором: admin:pending:<cursor>.
+    bulk — кнопки решения сразу по всей показанной странице.
+    """
+    kb = InlineKeyboardBuilder()
+    rows = []
+    if bulk:
+        kb.button(text="✅ Одобрить страницу", callback_data="admin:bulk:approve")
+        kb.button(text="❌ Отклонить страницу", callback_data="admin:bulk:reject")
+        rows.append(2)
+    nav = 0
+    if cursor != "1":
+        kb.button(text="⏮ В начало", callback_data="admin:pending:1")
+        nav += 1
+    if next_cursor:
+        kb.button(text="➡️ Дальше", callback_data=f"admin:pending:{next_cursor}")
+        nav += 1
+    if nav:
+        rows.append(nav)
+    kb.button(text="⬅️ Назад", callback_data="admin:root")
+    kb.adjust(*rows, 1)
+    return kb.as_markup()
+
+
 def admin_grant_kb(user_id: int):
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -392,8 +419,15 @@ def profile_history_filters_kb(counts: dict[str, int]) -> InlineKeyboardMarkup:
 
 
 def profile_history_list_kb(
-    group: str, page: int, diff: str = "all"
+    group: str,
+    cursor: str = "1",
+    diff: str = "all",
+    next_cursor: str | None = None,
 ) -> InlineKeyboardMarkup:
+    """
+    cursor — курсор текущей страницы ("1" — первая), next_cursor — следующей.
+    Смена сложности всегда начинает список сначала.
+    """
     diff = (diff or "all").lower()
 
     def chip(label: str, key: str):
@@ -405,31 +439,35 @@ def profile_history_list_kb(
     # строка фильтров сложности
     kb.button(
         text=chip("Все", "all"),
-        callback_data=f"profile:history:list:{group}:{page}:all",
+        callback_data=f"profile:history:list:{group}:1:all",
     )
     kb.button(
         text=chip("🟢", "easy"),
-        callback_data=f"profile:history:list:{group}:{page}:easy",
+        callback_data=f"profile:history:list:{group}:1:easy",
     )
     kb.button(
         text=chip("🟡", "medium"),
-        callback_data=f"profile:history:list:{group}:{page}:medium",
+        callback_data=f"profile:history:list:{group}:1:medium",
     )
     kb.button(
         text=chip("🔴", "hard"),
-        callback_data=f"profile:history:list:{group}:{page}:hard",
+        callback_data=f"profile:history:list:{group}:1:hard",
     )
-    kb.adjust(4)
 
-    # навигация
-    kb.button(
-        text="⬅️",
-        callback_data=f"profile:history:list:{group}:{max(1, page - 1)}:{diff}",
-    )
-    kb.button(text="➡️", callback_data=f"profile:history:list:{group}:{page + 1}:{diff}")
+    # навигация: keyset-курсор умеет только «дальше» и «в начало»
+    nav = 0
+    if cursor != "1":
+        kb.button(text="⏮", callback_data=f"profile:history:list:{group}:1:{diff}")
+        nav += 1
+    if next_cursor:
+        kb.button(
+            text="➡️",
+            callback_data=f"profile:history:list:{group}:{next_cursor}:{diff}",
+        )
+        nav += 1
     kb.button(text="📜 Разделы", callback_data="profile:history")
     kb.button(text="⬅️ Профиль", callback_data="menu:open:profile")
-    kb.adjust(2, 2)
+    kb.adjust(4, *((nav,) if nav else ()), 2)
     return kb.as_markup()
 
 
@@ -612,10 +650,12 @@ def tasks_list_kb(tasks: list) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def tasks_catalog_kb(tasks: list) -> InlineKeyboardMarkup:
+def tasks_catalog_kb(
+    tasks: list, *, diff: str = "all", page: int = 1, has_next: bool = False
+) -> InlineKeyboardMarkup:
     """
     Клавиатура со СПИСКОМ заданий для пользователя.
-    Здесь только переход к просмотру задачи.
+    Здесь только переход к просмотру задачи и листание страниц.
     """
     rows: list[list[InlineKeyboardButton]] = []
 
@@ -630,6 +670,22 @@ def tasks_catalog_kb(tasks: list) -> InlineKeyboardMarkup:
             ]
         )
 
+    nav: list[InlineKeyboardButton] = []
+    if page > 1:
+        nav.append(
+            InlineKeyboardButton(
+                text="◀️", callback_data=f"tasks:page:{diff}:{page - 1}"
+            )
+        )
+    if has_next:
+        nav.append(
+            InlineKeyboardButton(
+                text="▶️", callback_data=f"tasks:page:{diff}:{page + 1}"
+            )
+        )
+    if nav:
+        rows.append(nav)
+
     rows.append(
         [
             InlineKeyboardButton(
@@ -1,38 +1,27 @@
 import asyncio
 import logging
 
-from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-
-from .routers import root_router
+from .app_factory import build_dispatcher
 from .config import get_settings
 from .command import setup_bot_commands
+from .utils.logs import setup_logging
 
-logging.basicConfig(level=logging.DEBUG)
+log = logging.getLogger(__name__)
 
 
 async def main():
+    # очередь + поток-писатель: log.* не блокирует loop; уровни — из env
+    setup_logging()
     settings = get_settings()
-    storage = MemoryStorage()
-
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
-    )
-
-    dp = Dispatcher()
-
-    dp.include_router(root_router)
+    bot, dp = build_dispatcher(settings.bot_token)
 
     me = await bot.get_me()
-    print(f"[main] Running as @{me.username} (id={me.id})")
+    log.info("[main] running as @%s (id=%s)", me.username, me.id)
 
     await setup_bot_commands(bot)
 
     if settings.use_webhook:
-        print("Webhook mode включен — пропуск опроса.")
+        log.info("[main] webhook mode, polling skipped")
         return
     else:
         await bot.delete_webhook(drop_pending_updates=True)
@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, TelegramObject
+
+# сколько ждём остальные части альбома после первой (сек)
+ALBUM_LATENCY = 0.5
+
+
+class AlbumMiddleware(BaseMiddleware):
+    """
+    Альбом приходит N отдельными апдейтами с общим media_group_id.
+    Первый из них ждёт ALBUM_LATENCY, остальные только докладывают себя
+    в буфер и выходят; хендлер вызывается один раз с data["album"] —
+    сообщениями по порядку message_id. Одна запись в БД и один ответ
+    вместо N. Сообщения без media_group_id проходят как есть.
+    """
+
+    def __init__(self, latency: float = ALBUM_LATENCY):
+        self.latency = latency
+        self._albums: dict[tuple[int, str], list[Message]] = {}
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        group = getattr(event, "media_group_id", None)
+        if not group:
+            return await handler(event, data)
+
+        key = (event.chat.id, group)
+        album = self._albums.get(key)
+        if album is not None:
+            album.append(event)
+            return None
+
+        self._albums[key] = album = [event]
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._albums.pop(key, None)
+        data["album"] = sorted(album, key=lambda m: m.message_id)
+        return await handler(event, data)
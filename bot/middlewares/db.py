@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.methods import TelegramMethod
+from aiogram.types import TelegramObject
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..storage.db import UOW_KEY, AsyncSessionLocal, run_after_commit
+
+log = logging.getLogger(__name__)
+
+# сессия апдейта и задача, которая его обрабатывает (для CommitBeforeSendMiddleware)
+_current: ContextVar[tuple[asyncio.Task, AsyncSession] | None] = ContextVar(
+    "update_session", default=None
+)
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    Одна сессия и одна транзакция на апдейт: хендлер получает её как
+    `session` и передаёт в сервисы, commit — в конце или раньше, перед
+    первым запросом к Bot API (CommitBeforeSendMiddleware).
+    Соединение берётся из пула только при первом запросе, так что
+    апдейты без БД ничего не платят.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        async with AsyncSessionLocal() as session:
+            session.info[UOW_KEY] = True
+            data["session"] = session
+            token = _current.set((asyncio.current_task(), session))
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await session.rollback()
+                raise
+            finally:
+                _current.reset(token)
+            await session.commit()
+            # after-commit колбэки запускает сам commit; здесь — страховка
+            run_after_commit(session)
+            return result
+
+
+class CommitBeforeSendMiddleware(BaseRequestMiddleware):
+    """
+    Фиксирует транзакцию апдейта перед запросом к Bot API: блокировка
+    записи SQLite не держится на время сетевого round-trip, а пользователь
+    не видит «подтверждено» раньше, чем оно записано — ошибка commit
+    прерывает хендлер до ответа. Дальнейшие запросы хендлера идут в новой
+    транзакции той же сессии. Фоновые задачи, запущенные из хендлера,
+    наследуют контекст, но чужую сессию не трогают — сверяем задачу.
+    Подключение: bot.session.middleware(CommitBeforeSendMiddleware()).
+    """
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot: Bot,
+        method: TelegramMethod,
+    ):
+        current = _current.get()
+        if current is not None:
+            task, session = current
+            if task is asyncio.current_task() and session.in_transaction():
+                await session.commit()
+        return await make_request(bot, method)
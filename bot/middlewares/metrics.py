@@ -0,0 +1,63 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.types import TelegramObject, Update
+
+from ..services.metrics import Metrics, metrics
+
+
+def handler_label(event: TelegramObject, data: dict[str, Any]) -> tuple[str, str]:
+    """(тип события, "роутер:хендлер") — по данным inner-middleware."""
+    router, h = data.get("event_router"), data.get("handler")
+    name = getattr(getattr(h, "callback", None), "__name__", "?")
+    return (
+        data.get("event_update", event).event_type,
+        f"{getattr(router, 'name', '?')}:{name}",
+    )
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Латентность, ошибки и in-flight в services.metrics.
+
+    Как outer-middleware dp.update меряет апдейт целиком (handler="update",
+    вместе с DbSessionMiddleware и commit). Как inner-middleware на
+    наблюдателях dp — конкретный хендлер: aiogram применяет inner-middleware
+    корневого роутера ко всем вложенным, а в data уже лежат
+    event_router и handler. Подключение — setup_metrics(dp).
+    """
+
+    def __init__(self, registry: Metrics = metrics):
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        if isinstance(event, Update):
+            st = self.registry.stats(event.event_type, "update")
+        else:
+            st = self.registry.stats(*handler_label(event, data))
+
+        st.in_flight += 1
+        t0 = time.perf_counter()
+        error = False
+        try:
+            return await handler(event, data)
+        except Exception:
+            error = True
+            raise
+        finally:
+            st.in_flight -= 1
+            self.registry.observe(st, time.perf_counter() - t0, error)
+
+
+def setup_metrics(dp: Dispatcher, registry: Metrics = metrics) -> None:
+    middleware = MetricsMiddleware(registry)
+    dp.update.outer_middleware(middleware)
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(middleware)
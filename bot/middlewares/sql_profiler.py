@@ -0,0 +1,50 @@
+import os
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject
+
+from ..services.metrics import Metrics, metrics
+from ..storage.profiler import profile
+from .metrics import handler_label
+
+# запросов на хендлер по умолчанию; свой — флагом query_budget у хендлера
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", 15))
+
+
+class SqlProfilerMiddleware(BaseMiddleware):
+    """
+    Считает SQL хендлера (storage/profiler.py): превышение бюджета и
+    повторяющиеся запросы — warning в лог, число и время запросов —
+    в services.metrics. Бюджет горячего хендлера задаётся флагом:
+
+        @router.callback_query(F.data == "x", flags={"query_budget": 3})
+    """
+
+    def __init__(self, budget: int = QUERY_BUDGET, registry: Metrics = metrics):
+        self.budget = budget
+        self.registry = registry
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        event_type, label = handler_label(event, data)
+        budget = get_flag(data, "query_budget", default=self.budget)
+        st = self.registry.stats(event_type, label)
+        with profile(label, budget) as sql:
+            try:
+                return await handler(event, data)
+            finally:
+                st.queries += sql.count
+                st.sql_seconds += sql.seconds
+
+
+def setup_sql_profiler(dp: Dispatcher, budget: int = QUERY_BUDGET) -> None:
+    middleware = SqlProfilerMiddleware(budget)
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(middleware)
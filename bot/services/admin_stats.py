@@ -1,46 +1,98 @@
-from ..storage.db import SessionLocal
-from ..storage.models import User, Task, TaskAssignment
+import logging
 
+from sqlalchemy import Integer, cast, delete, insert, select, func, true
 
-def collect_admin_stats() -> dict:
-    with SessionLocal() as s:
-        total_users = s.query(User).count()
-        admins_count = s.query(User).filter(User.is_admin == True).count()
+from ..storage.db import AsyncSessionLocal
+from ..storage.models import StatCounter, User, Task, TaskAssignment
+from .tasks import ACTIVE_STATUSES
 
-        tasks_total = s.query(Task).count()
+log = logging.getLogger(__name__)
 
-        try:
-            tasks_pub = s.query(Task).filter(Task.is_published == True).count()
-        except Exception:
-            tasks_pub = 0
+# статусы, которые пишут разные версии сервисов, сводим к группам экрана статистики
+_STATUS_GROUPS = {
+    "assignments_active": ACTIVE_STATUSES,
+    "assignments_submitted": ("submitted",),
+    "assignments_approved": ("approved", "done"),
+    "assignments_rejected": ("rejected",),
+    "assignments_expired": ("expired",),
+}
 
-        assignments_total = s.query(TaskAssignment).count()
-        assignments_active = (
-            s.query(TaskAssignment).filter(TaskAssignment.status == "active").count()
-        )
-        assignments_submitted = (
-            s.query(TaskAssignment).filter(TaskAssignment.status == "submitted").count()
-        )
-        assignments_approved = (
-            s.query(TaskAssignment).filter(TaskAssignment.status == "approved").count()
+
+async def aggregate_counters(s) -> dict[str, int]:
+    """
+    Полный пересчёт за один запрос: по одному проходу на users/tasks
+    и GROUP BY status по заданиям.
+    """
+    users = select(
+        func.count(User.id).label("users"),
+        func.coalesce(func.sum(cast(User.is_admin, Integer)), 0).label("admins"),
+    ).subquery()
+    tasks = select(
+        func.count(Task.id).label("tasks"),
+        func.coalesce(func.sum(cast(Task.is_published, Integer)), 0).label(
+            "tasks_published"
+        ),
+    ).subquery()
+    row = (
+        await s.execute(select(users, tasks).select_from(users.join(tasks, true())))
+    ).one()
+    counters = dict(row._mapping)
+
+    by_status = await s.execute(
+        select(TaskAssignment.status, func.count()).group_by(TaskAssignment.status)
+    )
+    for status, cnt in by_status:
+        counters[f"assignments:{status}"] = cnt
+    return counters
+
+
+async def rebuild_counters() -> dict[str, int]:
+    """Пересобрать stats_counters с нуля — на старте и если таблица пуста."""
+    async with AsyncSessionLocal() as s:
+        counters = await aggregate_counters(s)
+        # строки для всех известных статусов, чтобы инкременты из ORM было куда писать
+        for statuses in _STATUS_GROUPS.values():
+            for st in statuses:
+                counters.setdefault(f"assignments:{st}", 0)
+        await s.execute(delete(StatCounter))
+        await s.execute(
+            insert(StatCounter),
+            [{"name": k, "value": v} for k, v in counters.items()],
         )
-        assignments_rejected = (
-            s.query(TaskAssignment).filter(TaskAssignment.status == "rejected").count()
+        await s.commit()
+    log.info("[admin_stats] counters rebuilt: %s", counters)
+    return counters
+
+
+async def collect_admin_stats() -> dict:
+    """
+    Читает готовые счётчики (одна маленькая таблица) — цена не зависит
+    от размера users/task_assignments.
+    """
+    async with AsyncSessionLocal() as s:
+        counters = dict(
+            (await s.execute(select(StatCounter.name, StatCounter.value))).all()
         )
+    if not counters:
+        counters = await rebuild_counters()
+
+    assignments = {
+        key: sum(counters.get(f"assignments:{st}", 0) for st in statuses)
+        for key, statuses in _STATUS_GROUPS.items()
+    }
+    return {
+        "total_users": counters.get("users", 0),
+        "admins_count": counters.get("admins", 0),
+        "tasks_total": counters.get("tasks", 0),
+        "tasks_published": counters.get("tasks_published", 0),
+        "assignments_total": sum(
+            v for k, v in counters.items() if k.startswith("assignments:")
+        ),
+        **assignments,
+    }
+
 
-        return {
-            "total_users": total_users,
-            "admins_count": admins_count,
-            "tasks_total": tasks_total,
-            "tasks_published": tasks_pub,
-            "assignments_total": assignments_total,
-            "assignments_active": assignments_active,
-            "assignments_submitted": assignments_submitted,
-            "assignments_approved": assignments_approved,
-            "assignments_rejected": assignments_rejected,
-        }
-
-
-def get_top_users(limit: int = 5) -> list[User]:
-    with SessionLocal() as s:
-        return s.query(User).order_by(User.coins.desc()).limit(limit).all()
+async def get_top_users(limit: int = 5) -> list[User]:
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(select(User).order_by(User.coins.desc()).limit(limit))
+        return list(rows)
@@ -0,0 +1,568 @@
+# bot/services/broadcast.py
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from sqlalchemy import and_, bindparam, func, or_, select, update
+
+from ..storage.db import AsyncSessionLocal, dialect_insert
+from ..storage.models import BroadcastDelivery, BroadcastJob
+from .users import count_users, iter_user_tg_id_batches
+
+log = logging.getLogger(__name__)
+
+# Глобальный лимит Telegram ~30 сообщений/с — держимся чуть ниже
+SEND_RATE = 25
+# сколько отправок может одновременно висеть в ожидании ответа Telegram
+MAX_CONCURRENCY = 20
+# сколько получателей читаем из БД за раз
+RECIPIENTS_BATCH = 1000
+# сколько раз повторяем отправку одному чату после RetryAfter
+MAX_RETRIES = 3
+# итоги отправок пишем в БД пачкой — по числу или по времени, что раньше;
+# получатель занимается строкой "sending" ещё до отправки, так что
+# рестарт между отправкой и сбросом не задваивает сообщение
+FLUSH_EVERY = 100
+FLUSH_INTERVAL = 1.0
+PROGRESS_EVERY = 5.0
+# рассылку ведёт один воркер: он продлевает аренду каждые LEASE_RENEW с,
+# а не продлённая LEASE аренда считается брошенной и достаётся другому
+LEASE = timedelta(seconds=60)
+LEASE_RENEW = 20.0
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# держим ссылки на фоновые задачи, иначе их может собрать GC
+_running: dict[int, asyncio.Task] = {}
+_watch_task: asyncio.Task | None = None
+# общий лимит отправок процесса и loop, к которому привязан его Lock
+_send_bucket: "TokenBucket | None" = None
+_send_bucket_loop: asyncio.AbstractEventLoop | None = None
+
+
+class TokenBucket:
+    """
+    Token bucket: rate токенов в секунду, в запасе не больше capacity.
+    acquire() ждёт ровно столько, сколько нужно до следующего токена.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def get_send_bucket() -> TokenBucket:
+    """
+    Один TokenBucket(SEND_RATE) на процесс: лимит Telegram общий для бота,
+    поэтому рассылки, напоминания, дедлайны и outbox берут токены отсюда,
+    а не из своих корзин. Новый loop (тесты, повторный asyncio.run) —
+    новая корзина: asyncio.Lock привязан к loop.
+    """
+    global _send_bucket, _send_bucket_loop
+    loop = asyncio.get_running_loop()
+    if _send_bucket is None or _send_bucket_loop is not loop:
+        _send_bucket, _send_bucket_loop = TokenBucket(SEND_RATE), loop
+    return _send_bucket
+
+
+async def send_many(
+    bot: Bot,
+    messages: list[tuple[int, str]],
+    *,
+    concurrency: int = MAX_CONCURRENCY,
+) -> int:
+    """
+    Пачка служебных сообщений (напоминания, дедлайны) в общем лимите
+    get_send_bucket(): без записи статусов, одна повторная попытка после
+    RetryAfter. Возвращает число доставленных.
+    """
+    bucket = get_send_bucket()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def send(chat_id: int, text: str) -> bool:
+        async with sem:
+            for attempt in range(2):
+                await bucket.acquire()
+                try:
+                    await bot.send_message(chat_id, text)
+                    return True
+                except TelegramRetryAfter as e:
+                    if attempt:
+                        break
+                    await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    log.warning("[send_many] chat %s: %s", chat_id, e)
+                    return False
+            return False
+
+    results = await asyncio.gather(*(send(c, t) for c, t in messages))
+    return sum(results)
+
+
+# фильтры-даты (users.created_at) в JSON-колонке job хранятся ISO-строками
+_DATE_FILTERS = ("created_from", "created_to")
+
+
+def _dump_filters(filters: dict | None) -> dict | None:
+    if not filters:
+        return filters
+    return {
+        k: v.isoformat() if k in _DATE_FILTERS and isinstance(v, datetime) else v
+        for k, v in filters.items()
+    }
+
+
+def _load_filters(filters: dict | None) -> dict:
+    return {
+        k: datetime.fromisoformat(v) if k in _DATE_FILTERS and isinstance(v, str) else v
+        for k, v in (filters or {}).items()
+    }
+
+
+async def create_broadcast(
+    text: str,
+    *,
+    filters: dict | None = None,
+    created_by: int | None = None,
+    progress_chat_id: int | None = None,
+    progress_message_id: int | None = None,
+) -> int:
+    async with AsyncSessionLocal() as s:
+        job = BroadcastJob(
+            text=text,
+            status="pending",
+            filters=_dump_filters(filters),
+            created_by=created_by,
+            progress_chat_id=progress_chat_id,
+            progress_message_id=progress_message_id,
+        )
+        s.add(job)
+        await s.commit()
+        return job.id
+
+
+def start_broadcast(bot: Bot, job_id: int) -> asyncio.Task:
+    """Запускает рассылку фоновой задачей и сразу возвращает управление."""
+    task = _running.get(job_id)
+    if task and not task.done():
+        return task
+    task = asyncio.create_task(BroadcastRunner(bot, job_id).run())
+    _running[job_id] = task
+    task.add_done_callback(lambda _t: _running.pop(job_id, None))
+    return task
+
+
+def _claimable(now: datetime):
+    """Рассылка свободна: ещё не начата или её аренда истекла (воркер упал)."""
+    return or_(
+        BroadcastJob.status == "pending",
+        and_(
+            BroadcastJob.status == "running",
+            or_(
+                BroadcastJob.lease_expires_at.is_(None),
+                BroadcastJob.lease_expires_at < now,
+            ),
+        ),
+    )
+
+
+async def _resume_claimable(bot: Bot) -> int:
+    async with AsyncSessionLocal() as s:
+        ids = list(
+            await s.scalars(
+                select(BroadcastJob.id).where(_claimable(datetime.utcnow()))
+            )
+        )
+    started = 0
+    for job_id in ids:
+        if job_id in _running:
+            continue
+        log.info("[broadcast] resuming job %s", job_id)
+        start_broadcast(bot, job_id)
+        started += 1
+    return started
+
+
+async def _watch(bot: Bot) -> None:
+    # рассылки упавших воркеров освобождаются по истечении аренды
+    while True:
+        await asyncio.sleep(LEASE.total_seconds())
+        try:
+            await _resume_claimable(bot)
+        except Exception:
+            log.exception("[broadcast] resume check failed")
+
+
+async def resume_broadcasts(bot: Bot) -> int:
+    """
+    Вызывается на старте: продолжает рассылки, прерванные рестартом, и
+    дальше подбирает брошенные другими воркерами. Рассылку, которую держит
+    живой воркер, не трогаем; уже доставленным получателям повторно не
+    шлём — статусы лежат в broadcast_deliveries.
+    """
+    global _watch_task
+    started = await _resume_claimable(bot)
+    if _watch_task is None or _watch_task.done():
+        _watch_task = asyncio.create_task(_watch(bot))
+    return started
+
+
+async def stop_broadcasts() -> None:
+    """Регистрируется на shutdown: аренда отпускается, рассылку продолжит другой воркер."""
+    global _watch_task
+    tasks = [t for t in (_watch_task, *_running.values()) if t is not None]
+    _watch_task = None
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class BroadcastRunner:
+    def __init__(self, bot: Bot, job_id: int):
+        self.bot = bot
+        self.job_id = job_id
+        self.bucket = get_send_bucket()
+        self.sem = asyncio.Semaphore(MAX_CONCURRENCY)
+        self.text = ""
+        self.filters: dict = {}
+        self.total = 0
+        self.sent = 0
+        self.failed = 0
+        self.progress_chat_id: int | None = None
+        self.progress_message_id: int | None = None
+        # (tg_id, status, attempts, error) — ещё не записанные в БД результаты
+        self._buffer: list[tuple[int, str, int, str | None]] = []
+        self._last_progress = 0.0
+        self._last_flush = time.monotonic()
+        self._pending: set[asyncio.Task] = set()
+        self._finished = asyncio.Event()
+        self.done = False
+        self.lost = False
+
+    async def run(self) -> None:
+        if not await self._claim():
+            log.info("[broadcast] job %s is held by another worker", self.job_id)
+            return
+        renew = asyncio.create_task(self._keep_lease())
+        try:
+            await self._run()
+        finally:
+            self._finished.set()
+            renew.cancel()
+            if not self.done:
+                await self._stop()
+            if not self.lost:
+                await self._release()
+
+    async def _stop(self) -> None:
+        """
+        Остановка посреди рассылки (shutdown, потеря аренды): незавершённые
+        отправки отменяем — их строки остаются "sending" и повторно не
+        шлются, — готовые итоги сбрасываем в БД.
+        """
+        for t in self._pending:
+            t.cancel()
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        try:
+            await self._flush()
+        except Exception as e:
+            log.warning("[broadcast] job %s: final flush failed: %s", self.job_id, e)
+
+    async def _run(self) -> None:
+        # COUNT по тем же фильтрам — дёшево, а список получателей не грузим целиком
+        self.total = await count_users(**self.filters)
+        async with AsyncSessionLocal() as s:
+            await s.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == self.job_id)
+                .values(total=self.total)
+            )
+            await s.commit()
+
+        pending = self._pending
+        async for batch in iter_user_tg_id_batches(RECIPIENTS_BATCH, **self.filters):
+            done_ids = await self._delivered(batch)
+            for uid in batch:
+                if uid in done_ids:
+                    continue
+                await self.sem.acquire()
+                if self.lost:
+                    self.sem.release()
+                    break
+                # занимаем по одному из цикла: SQLite всё равно пишет по очереди
+                if not await self._mark_sending(uid):
+                    self.sem.release()
+                    continue
+                t = asyncio.create_task(self._deliver(uid))
+                pending.add(t)
+                t.add_done_callback(pending.discard)
+                if len(self._buffer) >= FLUSH_EVERY or (
+                    self._buffer and time.monotonic() - self._last_flush >= FLUSH_INTERVAL
+                ):
+                    await self._flush()
+                await self._report()
+            if self.lost:
+                break
+        if pending:
+            await asyncio.gather(*pending)
+        if self.lost:
+            # рассылку продолжает другой воркер: дописываем только своё
+            await self._flush()
+            return
+
+        await self._flush(finished=True)
+        self.done = True
+        await self._report(final=True)
+        log.info(
+            "[broadcast] job %s done: sent=%s failed=%s total=%s",
+            self.job_id,
+            self.sent,
+            self.failed,
+            self.total,
+        )
+
+    async def _claim(self) -> bool:
+        """Занять рассылку условным UPDATE: из двух воркеров её получит один."""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as s:
+            job = (
+                await s.execute(
+                    update(BroadcastJob)
+                    .where(BroadcastJob.id == self.job_id, _claimable(now))
+                    .values(status="running", owner=WORKER_ID, lease_expires_at=now + LEASE)
+                    .returning(
+                        BroadcastJob.text,
+                        BroadcastJob.filters,
+                        BroadcastJob.sent,
+                        BroadcastJob.failed,
+                        BroadcastJob.progress_chat_id,
+                        BroadcastJob.progress_message_id,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            ).first()
+            await s.commit()
+        if job is None:
+            return False
+        self.text = job.text
+        self.filters = _load_filters(job.filters)
+        self.sent, self.failed = await self._counts()
+        self.progress_chat_id = job.progress_chat_id
+        self.progress_message_id = job.progress_message_id
+        return True
+
+    def _owned(self):
+        return and_(BroadcastJob.id == self.job_id, BroadcastJob.owner == WORKER_ID)
+
+    async def _renew(self) -> bool:
+        async with AsyncSessionLocal() as s:
+            res = await s.execute(
+                update(BroadcastJob)
+                .where(self._owned())
+                .values(lease_expires_at=datetime.utcnow() + LEASE)
+                .execution_options(synchronize_session=False)
+            )
+            await s.commit()
+        return res.rowcount == 1
+
+    async def _keep_lease(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._finished.wait(), LEASE_RENEW)
+                return
+            except TimeoutError:
+                pass
+            try:
+                if not await self._renew():
+                    log.warning("[broadcast] job %s: lease lost, stopping", self.job_id)
+                    self.lost = True
+                    return
+            except Exception as e:
+                log.warning("[broadcast] job %s: lease renewal failed: %s", self.job_id, e)
+
+    async def _release(self) -> None:
+        """Отпустить аренду (в том числе при остановке воркера посреди рассылки)."""
+        try:
+            async with AsyncSessionLocal() as s:
+                await s.execute(
+                    update(BroadcastJob)
+                    .where(self._owned())
+                    .values(owner=None, lease_expires_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+                await s.commit()
+        except Exception as e:
+            log.warning("[broadcast] job %s: lease release failed: %s", self.job_id, e)
+
+    async def _counts(self) -> tuple[int, int]:
+        """sent/failed по строкам доставки: счётчики в job могли не успеть сброситься."""
+        async with AsyncSessionLocal() as s:
+            rows = await s.execute(
+                select(BroadcastDelivery.status, func.count())
+                .where(BroadcastDelivery.job_id == self.job_id)
+                .group_by(BroadcastDelivery.status)
+            )
+            counts = dict(rows.all())
+        return counts.get("sent", 0), counts.get("failed", 0)
+
+    async def _mark_sending(self, tg_id: int) -> bool:
+        """Занять получателя до отправки; False — его уже занял этот или другой запуск."""
+        async with AsyncSessionLocal() as s:
+            claimed = await s.scalar(
+                dialect_insert(s.bind)(BroadcastDelivery)
+                .values(job_id=self.job_id, tg_id=tg_id, status="sending", attempts=0)
+                .on_conflict_do_nothing()
+                .returning(BroadcastDelivery.id)
+            )
+            await s.commit()
+        return claimed is not None
+
+    async def _delivered(self, tg_ids: list[int]) -> set[int]:
+        """Кому из пачки уже отправляли в этой рассылке (после рестарта)."""
+        async with AsyncSessionLocal() as s:
+            rows = await s.scalars(
+                select(BroadcastDelivery.tg_id).where(
+                    BroadcastDelivery.job_id == self.job_id,
+                    BroadcastDelivery.tg_id.in_(tg_ids),
+                )
+            )
+            return set(rows)
+
+    async def _deliver(self, tg_id: int) -> None:
+        try:
+            status, attempts, error = await self._send_with_retry(tg_id)
+            if status == "sent":
+                self.sent += 1
+            else:
+                self.failed += 1
+                log.warning("[broadcast] failed to send to %s: %s", tg_id, error)
+            self._buffer.append((tg_id, status, attempts, error))
+        finally:
+            self.sem.release()
+
+    async def _send_with_retry(self, tg_id: int) -> tuple[str, int, str | None]:
+        attempts = 0
+        while True:
+            attempts += 1
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(tg_id, self.text, parse_mode=ParseMode.HTML)
+                return "sent", attempts, None
+            except TelegramRetryAfter as e:
+                # ждёт только этот чат, остальные отправки идут дальше
+                if attempts > MAX_RETRIES:
+                    return "failed", attempts, str(e)
+                await asyncio.sleep(e.retry_after)
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                # бот заблокирован / чат не найден — повторять бессмысленно
+                return "failed", attempts, str(e)
+            except Exception as e:
+                return "failed", attempts, str(e)
+
+    async def _flush(self, finished: bool = False) -> None:
+        rows, self._buffer = self._buffer, []
+        self._last_flush = time.monotonic()
+        values = {"sent": self.sent, "failed": self.failed}
+        if finished:
+            values.update(
+                status="done",
+                finished_at=datetime.utcnow(),
+                owner=None,
+                lease_expires_at=None,
+            )
+        async with AsyncSessionLocal() as s:
+            if rows:
+                # строки заняты в _mark_sending — здесь только итог
+                delivery = BroadcastDelivery.__table__
+                await s.execute(
+                    update(delivery)
+                    .where(
+                        delivery.c.job_id == self.job_id,
+                        delivery.c.tg_id == bindparam("b_tg_id"),
+                    )
+                    .values(
+                        status=bindparam("b_status"),
+                        attempts=bindparam("b_attempts"),
+                        error=bindparam("b_error"),
+                    ),
+                    [
+                        {
+                            "b_tg_id": tg_id,
+                            "b_status": status,
+                            "b_attempts": attempts,
+                            "b_error": error,
+                        }
+                        for tg_id, status, attempts, error in rows
+                    ],
+                )
+            await s.execute(
+                update(BroadcastJob)
+                .where(self._owned())
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await s.commit()
+
+    async def _report(self, final: bool = False) -> None:
+        if not self.progress_chat_id or not self.progress_message_id:
+            return
+        now = time.monotonic()
+        if not final and now - self._last_progress < PROGRESS_EVERY:
+            return
+        self._last_progress = now
+
+        if final:
+            from ..keyboards.common import admin_tasks_root_kb
+
+            text = (
+                f"📢 Рассылка завершена.\n\n"
+                f"Всего пользователей: {self.total}\n"
+                f"Успешно отправлено: {self.sent}\n"
+                f"Ошибок: {self.failed}"
+            )
+            markup = admin_tasks_root_kb()
+        else:
+            text = (
+                f"📢 Рассылка идёт…\n\n"
+                f"Отправлено: {self.sent + self.failed} из {self.total}\n"
+                f"Ошибок: {self.failed}"
+            )
+            markup = None
+        try:
+            await self.bot.edit_message_text(
+                text=text,
+                chat_id=self.progress_chat_id,
+                message_id=self.progress_message_id,
+                reply_markup=markup,
+            )
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e):
+                log.warning("[broadcast] progress update failed: %s", e)
+        except Exception as e:
+            log.warning("[broadcast] progress update failed: %s", e)
@@ -1,59 +1,167 @@
-from aiogram import Router
-from aiogram.types import Message
-from aiogram.fsm.context import FSMContext
+"""
+Кэш file_id фото-доказательств между шагами FSM.
+
+Основной бэкенд — Redis через redis.asyncio (config.get_redis(): общий пул,
+event loop не блокируется). У каждой записи TTL (PHOTO_TTL, по умолчанию
+сутки), так что брошенные сдачи не копятся. Операции над несколькими
+ключами идут одним round-trip'ом: SET'ы — пайплайном, чтение — MGET,
+pop — GET+DEL в одной транзакции.
+
+Если пакета redis нет или сервер не отвечает, записи кладутся в LRU
+в памяти процесса; после ошибки Redis не трогаем REDIS_RETRY секунд,
+чтобы каждый апдейт не ждал таймаут соединения.
+"""
+
+import logging
+import os
+import time
 import uuid
-
-from ..config import Setting
-
-router = Router(name="task_submission")
-
-redis_client = Setting.redis_cli
-
-
-def save_photo_to_redis(photo_file_id: str) -> str:
-    uni_key = str(uuid.uuid4())
-
-    redis_client.set(uni_key, photo_file_id)
-
-    return uni_key
-
-
-def get_photo_from_redis(key: str):
-    redis_client.get(key)
-
-
-def delete_photo_from_redis(key: str):
-    redis_client.delete(key)
-
-
-@router.message(lambda message: message.photo)
-async def handle_photo(message: Message, state: FSMContext):
-    largest = sorted(message.photo, key=lambda p: p.file_size or 0)[-1]
-    file_id = largest.file_id
-
-    redis_key = save_photo_to_redis(file_id)
-
-    await state.update_data(redis_key=redis_key)
-    await message.answer("Фото получено! Ожидайте проверки модератором.")
-
-
-@router.message(lambda message: message.text == "Проверить фото")
-async def check_photo(message: Message, state: FSMContext):
-    data = await state.get_data()
-    redis_key = data.get("redis_key")
-
-    if not redis_key:
-        await message.answer("Нет фото для проверки.")
-        return
-
-    # получили фото по ключу из redis'a
-    file_id = get_photo_from_redis(redis_key)
-
-    if not file_id:
-        await message.answer("Фото не найдено.")
-        return
-    # Отправили на модерацию
-    await message.answer("Фото для проверки: ", photo=file_id)
-
-    delete_photo_from_redis(redis_key)
-    await message.answer("Фото проверено и удалено.")
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from ..config import get_redis
+
+log = logging.getLogger(__name__)
+
+PHOTO_TTL = int(os.getenv("PHOTO_TTL", 24 * 3600))
+LOCAL_CACHE_SIZE = 10_000
+REDIS_RETRY = 30.0
+KEY_PREFIX = "photo:"
+
+_UNSET = object()
+
+
+class LocalPhotoCache:
+    """key -> file_id с TTL и LRU-вытеснением; запасной вариант без Redis."""
+
+    def __init__(self, maxsize: int = LOCAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def set_many(self, items: dict[str, str], ttl: float) -> None:
+        expires = time.monotonic() + ttl
+        for key, value in items.items():
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+
+class PhotoCache:
+    def __init__(
+        self, redis=_UNSET, ttl: int = PHOTO_TTL, maxsize: int = LOCAL_CACHE_SIZE
+    ):
+        # клиент берём лениво: импорт модуля не тянет redis
+        self._redis = redis
+        self.ttl = ttl
+        self.local = LocalPhotoCache(maxsize)
+        self._down_until = 0.0
+
+    @property
+    def redis(self):
+        if self._redis is _UNSET:
+            self._redis = get_redis()
+        if self._redis is None or time.monotonic() < self._down_until:
+            return None
+        return self._redis
+
+    def _redis_failed(self, op: str, e: Exception) -> None:
+        log.warning("[photo_cache] redis %s failed, using local LRU: %s", op, e)
+        self._down_until = time.monotonic() + REDIS_RETRY
+
+    async def put_many(self, file_ids: list[str]) -> list[str]:
+        """Сохранить file_id'ы -> ключи в том же порядке."""
+        items = {f"{KEY_PREFIX}{uuid.uuid4().hex}": fid for fid in file_ids}
+        if not items:
+            return []
+        redis = self.redis
+        if redis is not None:
+            try:
+                async with redis.pipeline(transaction=False) as pipe:
+                    for key, fid in items.items():
+                        pipe.set(key, fid, ex=self.ttl)
+                    await pipe.execute()
+                return list(items)
+            except Exception as e:
+                self._redis_failed("set", e)
+        self.local.set_many(items, self.ttl)
+        return list(items)
+
+    async def get_many(self, keys: list[str]) -> list[str | None]:
+        values: list[str | None] = [None] * len(keys)
+        redis = self.redis
+        if redis is not None and keys:
+            try:
+                values = await redis.mget(keys)
+            except Exception as e:
+                self._redis_failed("get", e)
+        # то, что положили, пока Redis лежал, — в локальном LRU
+        return [v if v is not None else self.local.get(k) for k, v in zip(keys, values, strict=True)]
+
+    async def pop_many(self, keys: list[str]) -> list[str | None]:
+        """Прочитать и удалить за один round-trip."""
+        values: list[str | None] = [None] * len(keys)
+        redis = self.redis
+        if redis is not None and keys:
+            try:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.mget(keys)
+                    pipe.delete(*keys)
+                    values, _ = await pipe.execute()
+            except Exception as e:
+                self._redis_failed("pop", e)
+        result = [
+            v if v is not None else self.local.get(k) for k, v in zip(keys, values, strict=True)
+        ]
+        self.local.delete_many(keys)
+        return result
+
+    async def delete_many(self, keys: list[str]) -> None:
+        redis = self.redis
+        if redis is not None and keys:
+            try:
+                await redis.delete(*keys)
+            except Exception as e:
+                self._redis_failed("delete", e)
+        self.local.delete_many(keys)
+
+    async def put(self, file_id: str) -> str:
+        return (await self.put_many([file_id]))[0]
+
+    async def get(self, key: str) -> str | None:
+        return (await self.get_many([key]))[0]
+
+    async def pop(self, key: str) -> str | None:
+        return (await self.pop_many([key]))[0]
+
+
+photo_cache = PhotoCache()
+
+
+async def save_photo(photo_file_id: str) -> str:
+    return await photo_cache.put(photo_file_id)
+
+
+async def get_photo(key: str) -> str | None:
+    return await photo_cache.get(key)
+
+
+async def delete_photo(key: str) -> None:
+    await photo_cache.delete_many([key])
@@ -1,53 +1,43 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import List
-from ..storage.db import SessionLocal
+from sqlalchemy import select
+from ..storage.db import SessionLocal, AsyncSessionLocal
 from ..storage.models import Event
+from .reminders import reminder_scheduler
 
 
-def create_event(user_id: int, title: str, description: str, event_date: datetime):
-    with SessionLocal() as session:
+async def create_event(
+    user_id: int, title: str, description: str, event_date: datetime
+):
+    async with AsyncSessionLocal() as session:
         event = Event(
             user_id=user_id, title=title, description=description, event_date=event_date
         )
         session.add(event)
-        session.commit()
+        await session.commit()
+    reminder_scheduler.add_event(event.id, event.event_date)
 
 
-def get_upcoming_events(user_id: int, limit: int = 5):
-    with SessionLocal() as session:
+async def get_upcoming_events(user_id: int, limit: int = 5):
+    async with AsyncSessionLocal() as session:
         now = datetime.utcnow()
-        events = (
-            session.query(Event)
-            .filter(Event.user_id == user_id, Event.event_date > now)
+        events = await session.scalars(
+            select(Event)
+            .where(Event.user_id == user_id, Event.event_date > now)
             .order_by(Event.event_date.asc())
             .limit(limit)
-            .all()
         )
-        return events
+        return list(events)
 
 
-def get_all_events(user_id: int):
-    with SessionLocal() as session:
-        events = (
-            session.query(Event)
-            .filter(Event.user_id == user_id)
+async def get_all_events(user_id: int):
+    async with AsyncSessionLocal() as session:
+        events = await session.scalars(
+            select(Event)
+            .where(Event.user_id == user_id)
             .order_by(Event.event_date.asc())
-            .all()
         )
-        return events
-
-
-def send_event_reminders():
-    with SessionLocal() as session:
-        now = datetime.utcnow()
-        upcoming_events = session.query(Event).filter(Event.event_date > now).all()
-        reminders = []
-        for event in upcoming_events:
-            if event.event_date - now <= timedelta(days=1):  # 1 день до события
-                reminders.append(event)
-            elif event.event_date - now <= timedelta(hours=1):  # 1 час до события
-                reminders.append(event)
-        return reminders
+        return list(events)
 
 
 def list_upcomming_events(limit: int = 5) -> List[Event]:
@@ -64,15 +54,14 @@ def list_upcomming_events(limit: int = 5) -> List[Event]:
     return rows
 
 
-def list_all_events(limit: int = 50) -> list[Event]:
+async def list_all_events(limit: int = 50) -> list[Event]:
     now = datetime.utcnow()
 
-    with SessionLocal() as s:
-        rows = (
-            s.query(Event)
-            .filter(Event.created_at >= now)
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(
+            select(Event)
+            .where(Event.created_at >= now)
             .order_by(Event.created_at.asc())
             .limit(limit)
-            .all()
         )
-    return rows
+        return list(rows)
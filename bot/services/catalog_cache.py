@@ -0,0 +1,83 @@
+# bot/services/catalog_cache.py
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from aiogram.types import InlineKeyboardMarkup
+
+# страница каталога меняется только из админки; TTL — страховка для
+# соседних воркеров, до которых не долетает invalidate()
+CATALOG_TTL = 60.0
+
+
+@dataclass(frozen=True, slots=True)
+class CatalogPage:
+    """Готовый экран каталога: текст и клавиатура для edit_text."""
+
+    text: str
+    markup: InlineKeyboardMarkup
+
+
+class CatalogCache:
+    """
+    (difficulty, page) -> CatalogPage. Одновременные промахи по одному
+    ключу ждут одну сборку, а не идут в БД каждый сам.
+    """
+
+    def __init__(self, ttl: float = CATALOG_TTL):
+        self.ttl = ttl
+        self._pages: dict[tuple[str, int], tuple[float, CatalogPage]] = {}
+        self._building: dict[tuple[str, int], asyncio.Future] = {}
+        # сборка, начатая до invalidate(), не должна попасть в кэш
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        difficulty: str,
+        page: int,
+        build: Callable[[], Awaitable[CatalogPage]],
+    ) -> CatalogPage:
+        key = (difficulty, page)
+        entry = self._pages.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        pending = self._building.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self._generation
+        fut = asyncio.get_running_loop().create_future()
+        self._building[key] = fut
+        try:
+            result = await build()
+        except Exception as e:
+            fut.set_exception(e)
+            # исключение уже проброшено ниже; ожидающие получат своё
+            fut.exception()
+            raise
+        else:
+            fut.set_result(result)
+            if generation == self._generation:
+                self._pages[key] = (time.monotonic() + self.ttl, result)
+            return result
+        finally:
+            if self._building.get(key) is fut:
+                del self._building[key]
+
+    def invalidate(self) -> None:
+        self._pages.clear()
+        self._building.clear()
+        self._generation += 1
+
+    def stats(self) -> dict:
+        return {"size": len(self._pages), "hits": self.hits, "misses": self.misses}
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,131 @@
+# bot/services/coins.py
+"""
+Начисления coins через журнал coin_transactions.
+
+users.coins — материализованная сумма журнала: запись в журнал и
+UPDATE users SET coins = coins + :amount идут в одной транзакции, так что
+баланс читается одной строкой, а потерять параллельное начисление нельзя.
+Рейтинг и кэш пользователей credit/credit_many обновляют сами — после
+commit этой транзакции.
+"""
+
+import logging
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..storage.db import after_commit, session_scope
+from ..storage.models import CoinTransaction, User
+from .rating import rebuild_ranking, track_user
+from .user_cache import remember, user_cache
+
+log = logging.getLogger(__name__)
+
+
+def _balances_changed(s: AsyncSession, users: list[User]) -> None:
+    """Новые coins — в рейтинг и кэш пользователей, когда s зафиксирована."""
+    if not users:
+        return
+    for u in users:
+        remember(s, u)
+
+    def apply():
+        for u in users:
+            track_user(u)
+
+    after_commit(s, apply)
+
+
+async def credit(
+    s: AsyncSession,
+    user_id: int,
+    amount: int,
+    reason: str,
+    *,
+    assignment_id: int | None = None,
+) -> User | None:
+    """
+    Записать начисление и прибавить его к балансу внутри транзакции s.
+    Возвращает пользователя со свежим coins (для рейтинга и кэша после commit).
+    Фиксирует транзакцию вызывающий.
+    """
+    await s.execute(
+        insert(CoinTransaction).values(
+            user_id=user_id,
+            amount=amount,
+            reason=reason,
+            assignment_id=assignment_id,
+        )
+    )
+    user = await s.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(coins=User.coins + amount)
+        .returning(User)
+    )
+    _balances_changed(s, [user] if user else [])
+    return user
+
+
+async def credit_many(
+    s: AsyncSession, credits: list[tuple[int, int, int | None]], reason: str
+) -> list[User]:
+    """
+    Пачка начислений (user_id, amount, assignment_id): одна вставка в журнал
+    и один UPDATE users с суммой на пользователя. Возвращает затронутых
+    пользователей со свежим coins. Фиксирует транзакцию вызывающий.
+    """
+    credits = [c for c in credits if c[1]]
+    if not credits:
+        return []
+    totals: dict[int, int] = {}
+    for user_id, amount, _ in credits:
+        totals[user_id] = totals.get(user_id, 0) + amount
+    await s.execute(
+        insert(CoinTransaction),
+        [
+            {
+                "user_id": user_id,
+                "amount": amount,
+                "reason": reason,
+                "assignment_id": assignment_id,
+            }
+            for user_id, amount, assignment_id in credits
+        ],
+    )
+    res = await s.scalars(
+        update(User)
+        .where(User.id.in_(totals))
+        .values(coins=User.coins + case(totals, value=User.id, else_=0))
+        .returning(User)
+    )
+    users = list(res)
+    _balances_changed(s, users)
+    return users
+
+
+async def rebuild_balances() -> int:
+    """
+    Пересчитать users.coins по журналу и пересобрать рейтинг — после ручных
+    правок БД или восстановления из бэкапа. Один UPDATE по индексу
+    ix_coin_transactions_user_id.
+    """
+    total = (
+        select(func.coalesce(func.sum(CoinTransaction.amount), 0))
+        .where(CoinTransaction.user_id == User.id)
+        .scalar_subquery()
+    )
+    async with session_scope() as s:
+        res = await s.execute(
+            update(User)
+            .where(User.coins.is_distinct_from(total))
+            .values(coins=total)
+            .execution_options(synchronize_session=False)
+        )
+        await s.commit()
+    fixed = res.rowcount
+    if fixed:
+        log.warning("[coins] %s balances differed from the ledger", fixed)
+    user_cache.clear()
+    await rebuild_ranking()
+    return fixed
@@ -0,0 +1,170 @@
+# bot/services/deadlines.py
+"""
+Фоновая уборка просроченных заданий.
+
+Раз в SWEEP_INTERVAL активные назначения с due_at < now переводятся
+в "expired" пачками по SWEEP_BATCH — один UPDATE на пачку, выбор строк
+идёт по индексу (status, due_at). Так «Мои задания → Активные» содержат
+только живые задания и не растут бесконечно.
+
+Если DEADLINE_WARN_HOURS > 0, за столько часов до дедлайна владельцу
+приходит одно предупреждение (отметка — deadline_notified_at).
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from sqlalchemy import select, update
+
+from ..storage.db import AsyncSessionLocal
+from ..storage.models import Task, TaskAssignment, User, apply_counter_deltas
+from .broadcast import send_many
+from .tasks import ACTIVE_STATUSES
+
+log = logging.getLogger(__name__)
+
+EXPIRED = "expired"
+SWEEP_INTERVAL = 60.0
+SWEEP_BATCH = 500
+DEFAULT_WARN_HOURS = 3
+
+_task: asyncio.Task | None = None
+
+
+def _warn_window() -> timedelta | None:
+    hours = float(os.getenv("DEADLINE_WARN_HOURS", DEFAULT_WARN_HOURS))
+    return timedelta(hours=hours) if hours > 0 else None
+
+
+async def expire_overdue(
+    now: datetime | None = None, batch_size: int = SWEEP_BATCH
+) -> int:
+    """
+    Перевести просроченные активные назначения в expired.
+    Каждая пачка — своя короткая транзакция: блокировку записи не держим
+    дольше одного UPDATE. Счётчики статистики правим тут же — UPDATE
+    идёт мимо ORM.
+    """
+    now = now or datetime.utcnow()
+    total = 0
+    for status in ACTIVE_STATUSES:
+        while True:
+            batch = (
+                select(TaskAssignment.id)
+                .where(TaskAssignment.status == status, TaskAssignment.due_at < now)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            async with AsyncSessionLocal() as s:
+                res = await s.execute(
+                    update(TaskAssignment)
+                    .where(TaskAssignment.id.in_(batch))
+                    .values(status=EXPIRED)
+                    .execution_options(synchronize_session=False)
+                )
+                n = res.rowcount
+                if n:
+                    deltas = {f"assignments:{status}": -n, f"assignments:{EXPIRED}": n}
+                    await s.run_sync(
+                        lambda ss, d=deltas: apply_counter_deltas(ss.connection(), d)
+                    )
+                await s.commit()
+            total += n
+            if n < batch_size:
+                break
+    if total:
+        log.info("[deadlines] expired %s assignments", total)
+    return total
+
+
+async def warn_upcoming(
+    bot: Bot, now: datetime | None = None, batch_size: int = SWEEP_BATCH
+) -> int:
+    """Одно предупреждение на назначение, у которого дедлайн ближе окна."""
+    window = _warn_window()
+    if window is None:
+        return 0
+    now = now or datetime.utcnow()
+    sent = 0
+    while True:
+        batch = (
+            select(TaskAssignment.id)
+            .where(
+                TaskAssignment.status.in_(ACTIVE_STATUSES),
+                TaskAssignment.due_at >= now,
+                TaskAssignment.due_at < now + window,
+                TaskAssignment.deadline_notified_at.is_(None),
+            )
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        # сначала помечаем, потом шлём: повторный проход/второй воркер не задвоит
+        async with AsyncSessionLocal() as s:
+            ids = list(
+                await s.scalars(
+                    update(TaskAssignment)
+                    .where(
+                        TaskAssignment.id.in_(batch),
+                        TaskAssignment.deadline_notified_at.is_(None),
+                    )
+                    .values(deadline_notified_at=now)
+                    .returning(TaskAssignment.id)
+                    .execution_options(synchronize_session=False)
+                )
+            )
+            if not ids:
+                await s.commit()
+                return sent
+            rows = (
+                await s.execute(
+                    select(User.tg_id, Task.title, TaskAssignment.due_at)
+                    .join(Task, Task.id == TaskAssignment.task_id)
+                    .join(User, User.id == TaskAssignment.user_id)
+                    .where(TaskAssignment.id.in_(ids))
+                )
+            ).all()
+            await s.commit()
+        sent += await send_many(
+            bot,
+            [
+                (
+                    tg_id,
+                    f"⏳ Скоро дедлайн по заданию «{title}»: "
+                    f"{due_at.strftime('%Y-%m-%d %H:%M')} (UTC).",
+                )
+                for tg_id, title, due_at in rows
+            ],
+        )
+        if len(ids) < batch_size:
+            return sent
+
+
+async def _run(bot: Bot) -> None:
+    while True:
+        try:
+            await expire_overdue()
+            await warn_upcoming(bot)
+        except Exception:
+            log.exception("[deadlines] sweep failed")
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+
+async def start_deadline_sweeper(bot: Bot) -> None:
+    """Регистрируется на startup диспетчера."""
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_run(bot))
+
+
+async def stop_deadline_sweeper() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
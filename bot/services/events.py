@@ -1,11 +1,14 @@
 # bot/services/events.py
 from datetime import datetime
 
-from ..storage.db import SessionLocal
+from sqlalchemy import select
+
+from ..storage.db import AsyncSessionLocal
 from ..storage.models import Event, User
+from .reminders import reminder_scheduler
 
 
-def create_event(
+async def create_event(
     *,
     title: str,
     description: str | None,
@@ -20,9 +23,9 @@ def create_event(
     :param event_dt: datetime события
     :param creator_tg_id: Telegram ID пользователя, создавшего событие
     """
-    with SessionLocal() as s:
+    async with AsyncSessionLocal() as s:
         # Ищем пользователя по tg_id
-        user = s.query(User).filter(User.tg_id == creator_tg_id).first()
+        user = await s.scalar(select(User).where(User.tg_id == creator_tg_id))
         user_id = user.id if user else None  # если юзера нет в БД, просто пишем NULL
 
         ev = Event(
@@ -32,27 +35,31 @@ def create_event(
             user_id=user_id,  # а НЕ creator_tg_id
         )
         s.add(ev)
-        s.commit()
-        s.refresh(ev)
-        return ev
+        await s.commit()
+        await s.refresh(ev)
+    reminder_scheduler.add_event(ev.id, ev.event_date)
+    return ev
 
 
-def list_events(limit: int = 10) -> list[Event]:
+async def list_events(limit: int = 10) -> list[Event]:
     """Получить ближайшие события (по дате)."""
-    with SessionLocal() as s:
-        return s.query(Event).order_by(Event.event_date.asc()).limit(limit).all()
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(
+            select(Event).order_by(Event.event_date.asc()).limit(limit)
+        )
+        return list(rows)
 
 
-def list_upcoming_events(limit: int = 10) -> list[Event]:
+async def list_upcoming_events(limit: int = 10) -> list[Event]:
     now = datetime.utcnow()
 
-    with SessionLocal() as s:
-        return (
-            s.query(Event)
-            .filter(Event.event_date >= now)
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(
+            select(Event)
+            .where(Event.event_date >= now)
             .order_by(Event.event_date.asc())
             .limit(limit)
-            .all()
         )
+        return list(rows)
 
     # return list_events(limit=limit)
@@ -1,5 +1,6 @@
 from typing import Optional
-from ..storage.db import SessionLocal
+from sqlalchemy import select
+from ..storage.db import SessionLocal, AsyncSessionLocal
 from ..storage.models import MentorApplication, MentorTopic, User
 from datetime import datetime
 
@@ -22,14 +23,14 @@ def create_mentor_application(user_id: int, mentor_id: int, topic: str):
         s.commit()
 
 
-def get_mentor_list() -> list[User]:
-    with SessionLocal() as s:
-        return (
-            s.query(User)
-            .filter(User.role.in_(list(MENTOR_RULES)))
+async def get_mentor_list() -> list[User]:
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(
+            select(User)
+            .where(User.role.in_(list(MENTOR_RULES)))
             .order_by(User.coins.desc().nullslast())
-            .all()
         )
+        return list(rows)
 
 
 def create_mentor_application(
@@ -61,28 +62,26 @@ def create_mentor_application(
 
 
 # read
-def get_user_applications(user_id: int):
-    with SessionLocal() as s:
-        return (
-            s.query(MentorApplication)
-            .filter(MentorApplication.user_id == user_id)
+async def get_user_applications(user_id: int):
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(
+            select(MentorApplication)
+            .where(MentorApplication.user_id == user_id)
             .order_by(MentorApplication.created_at.desc())
-            .all()
         )
+        return list(rows)
 
 
 # record
-def create_mentor_application(user_id: int, mentor_id: int, topic: MentorTopic):
-    with SessionLocal() as s:
-        exists = (
-            s.query(MentorApplication)
-            .filter(
+async def create_mentor_application(user_id: int, mentor_id: int, topic: MentorTopic):
+    async with AsyncSessionLocal() as s:
+        exists = await s.scalar(
+            select(MentorApplication).where(
                 MentorApplication.user_id == user_id,
                 MentorApplication.mentor_id == mentor_id,
                 MentorApplication.topic == topic.value,
                 MentorApplication.status == "pending",
             )
-            .first()
         )
         if exists:
             return exists
@@ -93,33 +92,32 @@ def create_mentor_application(user_id: int, mentor_id: int, topic: MentorTopic):
             status="pending",
         )
         s.add(app)
-        s.commit()
-        s.refresh(app)
+        await s.commit()
+        await s.refresh(app)
         return app
 
 
-def get_incoming_for_mentor(
+async def get_incoming_for_mentor(
     mentor_id: int, status: str = "pending"
 ) -> list[MentorApplication]:
-    with SessionLocal() as s:
-        q = s.query(MentorApplication).filter(MentorApplication.mentor_id == mentor_id)
+    async with AsyncSessionLocal() as s:
+        stmt = select(MentorApplication).where(MentorApplication.mentor_id == mentor_id)
         if status:
-            q = q.filter(MentorApplication.status == status)
-        return q.order_by(MentorApplication.created_at.desc()).all()
+            stmt = stmt.where(MentorApplication.status == status)
+        rows = await s.scalars(stmt.order_by(MentorApplication.created_at.desc()))
+        return list(rows)
 
 
-def set_application_status(
+async def set_application_status(
     app_id: int, mentor_id: int, status: str, comment: Optional[str] = None
 ) -> Optional[MentorApplication]:
     """Ментор апдейтит статус своей заявки."""
     assert status in {"approved", "rejected"}
-    with SessionLocal() as s:
-        app = (
-            s.query(MentorApplication)
-            .filter(
+    async with AsyncSessionLocal() as s:
+        app = await s.scalar(
+            select(MentorApplication).where(
                 MentorApplication.id == app_id, MentorApplication.mentor_id == mentor_id
             )
-            .first()
         )
         if not app or app.status != "pending":
             return None
@@ -127,8 +125,8 @@ def set_application_status(
         app.decided_at = datetime.utcnow()
         if comment:
             app.comment = comment
-        s.commit()
-        s.refresh(app)
+        await s.commit()
+        await s.refresh(app)
         return app
 
 
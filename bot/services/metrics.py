@@ -0,0 +1,136 @@
+# bot/services/metrics.py
+"""
+Метрики хендлеров в памяти процесса: гистограмма латентности, ошибки и
+сколько вызовов идёт прямо сейчас — по ключу (событие, роутер:хендлер).
+
+Пишет MetricsMiddleware (middlewares/metrics.py), число и время SQL —
+SqlProfilerMiddleware; на запись — пара сложений и bisect по корзинам,
+без блокировок (всё в одном event loop).
+Читают /metrics вебхук-приложения (Prometheus text format) и админская
+команда /handler_stats.
+"""
+
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+# границы корзин, сек (как у prometheus_client по умолчанию)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(slots=True)
+class HandlerStats:
+    # последняя корзина — +Inf
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    errors: int = 0
+    in_flight: int = 0
+    # заполняет SqlProfilerMiddleware
+    queries: int = 0
+    sql_seconds: float = 0.0
+
+    def quantile(self, q: float) -> float:
+        """Оценка по корзинам с линейной интерполяцией, как histogram_quantile."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.buckets):
+            if seen + n >= rank and n:
+                lo = BUCKETS[i - 1] if i else 0.0
+                if i == len(BUCKETS):
+                    return lo  # хвост за последней границей
+                return lo + (BUCKETS[i] - lo) * (rank - seen) / n
+            seen += n
+        return BUCKETS[-1]
+
+
+class Metrics:
+    def __init__(self):
+        self._stats: dict[tuple[str, str], HandlerStats] = {}
+        self.started_at = time.time()
+
+    def stats(self, event: str, handler: str) -> HandlerStats:
+        key = (event, handler)
+        st = self._stats.get(key)
+        if st is None:
+            st = self._stats[key] = HandlerStats()
+        return st
+
+    @staticmethod
+    def observe(st: HandlerStats, seconds: float, error: bool = False) -> None:
+        st.buckets[bisect_left(BUCKETS, seconds)] += 1
+        st.count += 1
+        st.total += seconds
+        if error:
+            st.errors += 1
+
+    def items(self) -> list[tuple[tuple[str, str], HandlerStats]]:
+        return sorted(self._stats.items())
+
+    def clear(self) -> None:
+        self._stats.clear()
+        self.started_at = time.time()
+
+    def render_prometheus(self) -> str:
+        """Text exposition format 0.0.4."""
+        out = [
+            "# HELP bot_handler_duration_seconds Handler latency.",
+            "# TYPE bot_handler_duration_seconds histogram",
+        ]
+        items = self.items()
+        for (event, handler), st in items:
+            labels = f'event="{_escape(event)}",handler="{_escape(handler)}"'
+            cumulative = 0
+            for bound, n in zip((*BUCKETS, "+Inf"), st.buckets, strict=True):
+                cumulative += n
+                out.append(
+                    f'bot_handler_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            out.append(f"bot_handler_duration_seconds_sum{{{labels}}} {st.total}")
+            out.append(f"bot_handler_duration_seconds_count{{{labels}}} {st.count}")
+        for name, kind, help_, attr in (
+            ("bot_handler_errors_total", "counter", "Handler exceptions.", "errors"),
+            ("bot_handler_in_flight", "gauge", "Handlers running now.", "in_flight"),
+            ("bot_handler_sql_queries_total", "counter", "SQL statements.", "queries"),
+            (
+                "bot_handler_sql_seconds_total",
+                "counter",
+                "Time in SQL statements.",
+                "sql_seconds",
+            ),
+        ):
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+            for (event, handler), st in items:
+                labels = f'event="{_escape(event)}",handler="{_escape(handler)}"'
+                out.append(f"{name}{{{labels}}} {getattr(st, attr)}")
+        return "\n".join(out) + "\n"
+
+    def top(self, limit: int = 15) -> list[dict]:
+        """Самые дорогие хендлеры по суммарному времени — для админской команды."""
+        rows = [
+            {
+                "event": event,
+                "handler": handler,
+                "count": st.count,
+                "errors": st.errors,
+                "in_flight": st.in_flight,
+                "p50": st.quantile(0.5),
+                "p95": st.quantile(0.95),
+                "p99": st.quantile(0.99),
+                "queries": st.queries / st.count if st.count else 0.0,
+                "total": st.total,
+            }
+            for (event, handler), st in self._stats.items()
+            if st.count or st.in_flight
+        ]
+        rows.sort(key=lambda r: r["total"], reverse=True)
+        return rows[:limit]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
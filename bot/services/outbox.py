@@ -0,0 +1,192 @@
+# bot/services/outbox.py
+"""
+Transactional outbox для уведомлений пользователям.
+
+Сервис, меняющий данные, кладёт сообщения через enqueue() в своей же
+транзакции: откатилась транзакция — нет и сообщения, упал процесс после
+commit — сообщение лежит в таблице и уйдёт после рестарта. Хендлер не ждёт
+Telegram: после commit диспетчер только будится.
+
+OutboxDispatcher берёт пачку готовых строк, «арендуя» их (available_at
+отодвигается на LEASE): второй воркер их не возьмёт, а строки упавшего
+процесса освободятся сами. Отправка — в общем для всех отправителей лимите
+(get_send_bucket) и с ограниченной параллельностью. RetryAfter откладывает строку, не тратя попытку; сетевые
+ошибки — экспоненциальный бэкофф до MAX_ATTEMPTS; заблокировавший бота
+пользователь — сразу failed. Доставка «хотя бы один раз»: упасть между
+send_message и удалением строки значит отправить повторно.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..storage.db import AsyncSessionLocal
+from ..storage.models import OutboxMessage
+from .broadcast import MAX_CONCURRENCY, get_send_bucket
+
+log = logging.getLogger(__name__)
+
+BATCH = 100
+LEASE = timedelta(minutes=5)
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 5.0  # сек; 5, 10, 20, 40
+# страховка на случай пропущенного wake() и для отложенных повторов
+POLL_INTERVAL = 30.0
+
+
+async def enqueue(s: AsyncSession, messages: list[tuple[int, str]]) -> None:
+    """
+    Положить сообщения (chat_id, text) в outbox внутри транзакции s.
+    После commit вызывающий будит диспетчер: after_commit(s, outbox.wake).
+    """
+    if messages:
+        await s.execute(
+            insert(OutboxMessage),
+            [{"chat_id": chat_id, "text": text} for chat_id, text in messages],
+        )
+
+
+class OutboxDispatcher:
+    def __init__(self, batch: int = BATCH, concurrency: int = MAX_CONCURRENCY):
+        self.batch = batch
+        self.concurrency = concurrency
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    async def _claim(self, now: datetime) -> list:
+        due = (
+            select(OutboxMessage.id)
+            .where(OutboxMessage.status == "pending", OutboxMessage.available_at <= now)
+            .order_by(OutboxMessage.id)
+            .limit(self.batch)
+            .scalar_subquery()
+        )
+        async with AsyncSessionLocal() as s:
+            rows = (
+                await s.execute(
+                    update(OutboxMessage)
+                    # повторная проверка срока: строку мог занять соседний воркер
+                    .where(OutboxMessage.id.in_(due), OutboxMessage.available_at <= now)
+                    .values(available_at=now + LEASE)
+                    .returning(
+                        OutboxMessage.id,
+                        OutboxMessage.chat_id,
+                        OutboxMessage.text,
+                        OutboxMessage.attempts,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+            ).all()
+            await s.commit()
+        return rows
+
+    async def _send(self, bot: Bot, sem: asyncio.Semaphore, row) -> dict | None:
+        """None — доставлено, иначе значения для UPDATE строки."""
+        async with sem:
+            await get_send_bucket().acquire()
+            try:
+                await bot.send_message(row.chat_id, row.text)
+                return None
+            except TelegramRetryAfter as e:
+                delay, attempts, error = e.retry_after, row.attempts, "retry_after"
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                log.info("[outbox] #%s to %s dropped: %s", row.id, row.chat_id, e)
+                return {"id": row.id, "status": "failed", "last_error": str(e)[:255]}
+            except Exception as e:
+                attempts = row.attempts + 1
+                if attempts >= MAX_ATTEMPTS:
+                    log.warning("[outbox] #%s gave up: %s", row.id, e)
+                    return {
+                        "id": row.id,
+                        "status": "failed",
+                        "attempts": attempts,
+                        "last_error": str(e)[:255],
+                    }
+                delay, error = BACKOFF_BASE * 2 ** (attempts - 1), str(e)[:255]
+        return {
+            "id": row.id,
+            "attempts": attempts,
+            "available_at": datetime.utcnow() + timedelta(seconds=delay),
+            "last_error": error,
+        }
+
+    async def drain_once(self, bot: Bot, now: datetime | None = None) -> int:
+        """Одна пачка: занять, отправить, записать итог. -> сколько строк взято."""
+        rows = await self._claim(now or datetime.utcnow())
+        if not rows:
+            return 0
+        sem = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._send(bot, sem, r) for r in rows))
+        sent = [r.id for r, res in zip(rows, results, strict=True) if res is None]
+        retry = [res for res in results if res is not None]
+        async with AsyncSessionLocal() as s:
+            if sent:
+                await s.execute(
+                    delete(OutboxMessage)
+                    .where(OutboxMessage.id.in_(sent))
+                    .execution_options(synchronize_session=False)
+                )
+            for res in retry:
+                # набор колонок у строк разный — по UPDATE на строку, их немного
+                await s.execute(
+                    update(OutboxMessage)
+                    .where(OutboxMessage.id == res["id"])
+                    .values({k: v for k, v in res.items() if k != "id"})
+                    .execution_options(synchronize_session=False)
+                )
+            await s.commit()
+        if retry:
+            log.info("[outbox] sent %s, postponed/failed %s", len(sent), len(retry))
+        return len(rows)
+
+    async def run(self, bot: Bot) -> None:
+        while True:
+            # сбрасываем до выборки: wake() во время отправки не потеряется
+            self._wakeup.clear()
+            try:
+                if await self.drain_once(bot) >= self.batch:
+                    continue
+            except Exception:
+                log.exception("[outbox] batch failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot: Bot) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(bot))
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+outbox = OutboxDispatcher()
+
+
+async def start_outbox(bot: Bot) -> None:
+    """Регистрируется на startup диспетчера: дошлёт и то, что осталось с прошлого запуска."""
+    outbox.start(bot)
+
+
+async def stop_outbox() -> None:
+    await outbox.stop()
@@ -1,38 +1,193 @@
+import asyncio
+import logging
+import os
 from typing import List, Tuple
+
+from sortedcontainers import SortedList
 from sqlalchemy import select, func
-from ..storage.db import SessionLocal
+
+from ..storage.db import AsyncSessionLocal
 from ..storage.models import User
 
+log = logging.getLogger(__name__)
+
+# периодическая пересборка индекса из БД, сек (RANKING_REFRESH); по умолчанию
+# выключена — индекс ведут инкрементальные upsert'ы после commit
+DEFAULT_REFRESH = 0.0
+
+_task: asyncio.Task | None = None
+
+
+class RankingIndex:
+    """
+    Рейтинг в памяти процесса: отсортированные ключи (-coins, user_id) —
+    тот же порядок, что ORDER BY coins DESC, id ASC.
+    Топ-N и место пользователя — O(log n), изменение монет — O(log n).
+    Строится из БД на старте (rebuild_ranking), дальше обновляется
+    coins.credit/credit_many после commit. Индекс свой у каждого процесса:
+    начисления, сделанные другим воркером или в обход coins, видны здесь
+    после пересборки — на рестарте или раз в RANKING_REFRESH секунд, если
+    она включена.
+    """
+
+    def __init__(self):
+        self._keys = SortedList()
+        # user_id -> (tg_id, username, coins)
+        self._users: dict[int, tuple[int, str | None, int]] = {}
+        self._by_tg: dict[int, int] = {}  # tg_id -> user_id
+        # изменения, пришедшие, пока пересборка читает БД: снимок может быть старше
+        self._during_rebuild: dict[int, tuple[int, str | None, int]] | None = None
+        self.ready = False
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._users.clear()
+        self._by_tg.clear()
+        self.ready = False
+
+    def upsert(self, user_id: int, tg_id: int, username: str | None, coins: int | None):
+        coins = coins or 0
+        old = self._users.get(user_id)
+        if old:
+            self._keys.remove((-old[2], user_id))
+        self._keys.add((-coins, user_id))
+        self._users[user_id] = (tg_id, username, coins)
+        self._by_tg[tg_id] = user_id
+        if self._during_rebuild is not None:
+            self._during_rebuild[user_id] = (tg_id, username, coins)
+
+    def begin_rebuild(self) -> None:
+        self._during_rebuild = {}
+
+    def abort_rebuild(self) -> None:
+        self._during_rebuild = None
+
+    def load(self, rows) -> None:
+        """Заменить содержимое строками (user_id, tg_id, username, coins)."""
+        self.swap(_build_index(rows))
+
+    def swap(self, built) -> None:
+        """
+        Подменить индекс собранным заранее (_build_index) одним присваиванием:
+        читатели не видят ни пустого, ни наполовину заполненного индекса.
+        """
+        touched, self._during_rebuild = self._during_rebuild or {}, None
+        self._keys, self._users, self._by_tg = built
+        for user_id, (tg_id, username, coins) in touched.items():
+            self.upsert(user_id, tg_id, username, coins)
+        self.ready = True
+
+    def top(self, limit: int) -> list[tuple[int, str | None, int]]:
+        return [self._users[uid] for _, uid in self._keys.islice(0, limit)]
+
+    def position(self, tg_id: int) -> tuple[int | None, int]:
+        uid = self._by_tg.get(tg_id)
+        if uid is None:
+            return None, 0
+        coins = self._users[uid][2]
+        # (-coins,) меньше любого (-coins, id) — слева ровно те, у кого монет больше
+        return self._keys.bisect_left((-coins,)) + 1, coins
+
+
+def _build_index(rows):
+    """Структуры RankingIndex из строк БД: SortedList строится одной сортировкой."""
+    users = {uid: (tg_id, username, coins or 0) for uid, tg_id, username, coins in rows}
+    by_tg = {tg_id: uid for uid, (tg_id, _, _) in users.items()}
+    keys = SortedList((-coins, uid) for uid, (_, _, coins) in users.items())
+    return keys, users, by_tg
+
+
+ranking = RankingIndex()
+
+
+def track_user(user: User | None) -> None:
+    """Вызывать после commit, когда у пользователя поменялись coins/username."""
+    if user is not None and ranking.ready:
+        ranking.upsert(user.id, user.tg_id, user.username, user.coins)
+
+
+async def rebuild_ranking() -> int:
+    """Полная пересборка из БД — на старте бота или после ручных правок coins."""
+    ranking.begin_rebuild()
+    try:
+        async with AsyncSessionLocal() as s:
+            rows = (
+                await s.execute(select(User.id, User.tg_id, User.username, User.coins))
+            ).all()
+        # сортировка сотен тысяч ключей — в потоке, event loop не стоит
+        built = await asyncio.to_thread(_build_index, rows)
+    except BaseException:
+        ranking.abort_rebuild()
+        raise
+    ranking.swap(built)
+    log.debug("[rating] ranking index built: %s users", len(ranking))
+    return len(ranking)
+
+
+async def _refresh(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebuild_ranking()
+        except Exception:
+            log.exception("[rating] ranking refresh failed")
+
+
+async def start_ranking_refresh() -> None:
+    """Регистрируется на startup диспетчера, после rebuild_ranking."""
+    global _task
+    interval = float(os.getenv("RANKING_REFRESH", DEFAULT_REFRESH))
+    if interval > 0 and (_task is None or _task.done()):
+        _task = asyncio.create_task(_refresh(interval))
+
+
+async def stop_ranking_refresh() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
 
-def get_leaderboard(limit: int = 10) -> List[Tuple[int, str | None, int]]:
+async def get_leaderboard(limit: int = 10) -> List[Tuple[int, str | None, int]]:
     """
     Возвращает топ пользователей: [(tg_id, username, coins), ...]
     """
-    with SessionLocal() as s:
+    if ranking.ready:
+        return ranking.top(limit)
+    async with AsyncSessionLocal() as s:
         stmt = (
-            select(
-                User.tg_id, User.username, func.coalesce(User.coins, 0).label("coins")
-            )
-            .order_by(func.coalesce(User.coins, 0).desc(), User.id.asc())
+            # без coalesce, иначе ix_users_coins_id не используется (NULL убраны миграцией)
+            select(User.tg_id, User.username, User.coins)
+            .order_by(User.coins.desc(), User.id.asc())
             .limit(limit)
         )
-        return [
-            (tg_id, username, coins) for tg_id, username, coins in s.execute(stmt).all()
-        ]
+        rows = await s.execute(stmt)
+        return [(tg_id, username, coins) for tg_id, username, coins in rows.all()]
 
 
-def get_user_position(user_tg_id: int) -> tuple[int | None, int]:
+async def get_user_position(user_tg_id: int) -> tuple[int | None, int]:
     """
     Возвращает (позиция, coins). Позиция = 1 + сколько людей имеют coins строго больше.
     Если пользователя нет — (None, 0)
     """
-    with SessionLocal() as s:
-        u = s.execute(select(User).where(User.tg_id == user_tg_id)).scalar_one_or_none()
+    if ranking.ready:
+        pos, coins = ranking.position(user_tg_id)
+        if pos is not None:
+            return pos, coins
+    async with AsyncSessionLocal() as s:
+        u = await s.scalar(select(User).where(User.tg_id == user_tg_id))
         if not u:
             return None, 0
+        # пользователь появился в обход индекса — добавим, дальше ответ из памяти
+        track_user(u)
         coins = u.coins or 0
         # сколько пользователей имеют больше монет
-        cnt = s.execute(
-            select(func.count()).where(func.coalesce(User.coins, 0) > coins)
-        ).scalar_one()
+        cnt = await s.scalar(select(func.count()).where(User.coins > coins))
         return cnt + 1, coins
@@ -0,0 +1,215 @@
+# bot/services/reminders.py
+"""
+Напоминания о событиях календаря: за сутки и за час до начала.
+
+На старте будущие события один раз читаются в min-heap по времени
+напоминания, дальше планировщик спит до ближайшего срока. Новые события
+create_event добавляет в кучу сам — таблица повторно не сканируется.
+
+Отправка «не больше одного раза»: перед send_message напоминание
+занимается строкой в sent_reminders (INSERT ... ON CONFLICT DO NOTHING),
+поэтому рестарт или второй воркер его не продублируют.
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Collection
+
+from aiogram import Bot
+from sqlalchemy import select
+
+from ..storage.db import AsyncSessionLocal, dialect_insert
+from ..storage.models import Event, SentReminder, User
+from .broadcast import send_many
+
+log = logging.getLogger(__name__)
+
+# (вид, за сколько до события) — от дальнего к ближнему
+REMINDERS = (("1d", timedelta(days=1)), ("1h", timedelta(hours=1)))
+SEND_BATCH = 100
+# даже без новых событий просыпаемся хотя бы раз в час (перевод часов и т.п.)
+MAX_SLEEP = 3600.0
+# пауза после неудачной пачки (например, «database is locked»)
+RETRY_DELAY = 5.0
+
+
+def _pending_reminders(
+    event_date: datetime, now: datetime, sent: Collection[str] = ()
+) -> list[tuple[datetime, str]]:
+    """
+    Какие напоминания ещё нужны событию. Уже наступившие схлопываются
+    в одно — ближайшее к событию; после отправленного «за час» напоминание
+    «за сутки» уже не шлём.
+    """
+    if event_date <= now:
+        return []
+    offsets = dict(REMINDERS)
+    done = [offsets[k] for k in sent if k in offsets]
+    if done:
+        offsets = {k: v for k, v in offsets.items() if v < min(done)}
+    future, past = [], []
+    for kind, offset in offsets.items():
+        at = event_date - offset
+        (past if at <= now else future).append((at, kind))
+    if past:
+        future.append(max(past))
+    return future
+
+
+class ReminderScheduler:
+    def __init__(self):
+        # (когда напомнить, event_id, вид)
+        self._heap: list[tuple[datetime, int, str]] = []
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def load(self) -> int:
+        """Будущие события и уже отправленные по ним напоминания — два запроса."""
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as s:
+            events = (
+                await s.execute(
+                    select(Event.id, Event.event_date).where(Event.event_date > now)
+                )
+            ).all()
+            sent_rows = await s.execute(
+                select(SentReminder.event_id, SentReminder.kind)
+                .join(Event, Event.id == SentReminder.event_id)
+                .where(Event.event_date > now)
+            )
+        sent: dict[int, set[str]] = {}
+        for event_id, kind in sent_rows:
+            sent.setdefault(event_id, set()).add(kind)
+
+        self._heap = [
+            (at, event_id, kind)
+            for event_id, event_date in events
+            for at, kind in _pending_reminders(
+                event_date, now, sent.get(event_id, set())
+            )
+        ]
+        heapq.heapify(self._heap)
+        self._wakeup.set()
+        return len(self._heap)
+
+    def add_event(self, event_id: int, event_date: datetime) -> None:
+        """Новое событие: O(log n) на напоминание, без перечитывания таблицы."""
+        for at, kind in _pending_reminders(event_date, datetime.utcnow()):
+            heapq.heappush(self._heap, (at, event_id, kind))
+        if self._heap and self._heap[0][1] == event_id:
+            self._wakeup.set()
+
+    def pop_due(
+        self, now: datetime, limit: int = SEND_BATCH
+    ) -> list[tuple[datetime, int, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            due.append(heapq.heappop(self._heap))
+        return due
+
+    async def _claim(self, due: list[tuple[int, str]]) -> list[tuple]:
+        """Занять напоминания и вернуть то, что досталось этому процессу, с адресатами."""
+        async with AsyncSessionLocal() as s:
+            stmt = (
+                dialect_insert(s.bind)(SentReminder)
+                .values([{"event_id": e, "kind": k} for e, k in due])
+                .on_conflict_do_nothing()
+                .returning(SentReminder.event_id, SentReminder.kind)
+            )
+            claimed = (await s.execute(stmt)).all()
+            if not claimed:
+                await s.commit()
+                return []
+            rows = await s.execute(
+                select(
+                    Event.id,
+                    Event.title,
+                    Event.description,
+                    Event.event_date,
+                    User.tg_id,
+                )
+                .join(User, User.id == Event.user_id)
+                .where(Event.id.in_({event_id for event_id, _ in claimed}))
+            )
+            events = {row.id: tuple(row) for row in rows}
+            await s.commit()
+        return [(*events[e], kind) for e, kind in claimed if e in events]
+
+    async def send_due(self, bot: Bot, now: datetime | None = None) -> int:
+        due = self.pop_due(now or datetime.utcnow())
+        if not due:
+            return 0
+        try:
+            batch = await self._claim([(event_id, kind) for _, event_id, kind in due])
+        except Exception:
+            # ничего не занято — возвращаем в кучу, следующая попытка их повторит
+            for entry in due:
+                heapq.heappush(self._heap, entry)
+            raise
+        # напоминание уже занято: при ошибке отправки лучше не дослать, чем задвоить
+        await send_many(
+            bot,
+            [
+                (
+                    tg_id,
+                    f"⏰ Напоминание о событии: {title}\n"
+                    + (f"Описание: {description}\n" if description else "")
+                    + f"Дата и время: {event_date.strftime('%Y-%m-%d %H:%M')}",
+                )
+                for _id, title, description, event_date, tg_id, _kind in batch
+            ],
+        )
+        return len(batch)
+
+    async def run(self, bot: Bot) -> None:
+        while True:
+            try:
+                if await self.send_due(bot):
+                    continue
+            except Exception:
+                log.exception("[reminders] batch failed")
+                # напоминания вернулись в кучу и уже просрочены — не крутимся вхолостую
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            self._wakeup.clear()
+            timeout = MAX_SLEEP
+            if self._heap:
+                wait = (self._heap[0][0] - datetime.utcnow()).total_seconds()
+                timeout = min(max(wait, 0.0), MAX_SLEEP)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot: Bot) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(bot))
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+async def start_reminders(bot: Bot) -> None:
+    """Регистрируется на startup диспетчера."""
+    count = await reminder_scheduler.load()
+    log.info("[reminders] %s reminders scheduled", count)
+    reminder_scheduler.start(bot)
+
+
+async def stop_reminders() -> None:
+    await reminder_scheduler.stop()
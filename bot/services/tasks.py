@@ -1,14 +1,37 @@
-from typing import Optional
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import select, func, and_, or_, tuple_, update, delete, insert
 from sqlalchemy.orm import joinedload
-from ..storage.db import SessionLocal
-from ..storage.models import Task, TaskAssignment, User
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..storage.db import (
+    AsyncSessionLocal,
+    after_commit,
+    commit,
+    session_scope,
+)
+from ..storage.models import (
+    SubmissionFile,
+    Task,
+    TaskAssignment,
+    User,
+    apply_counter_deltas,
+)
+from .catalog_cache import catalog_cache
+from .badges import newly_unlocked_badge
+from .coins import credit, credit_many
+from .levels import level_by_coins
+from .outbox import enqueue, outbox
+from .user_cache import get_cached_user, remember
+from ..utils.cursor import Cursor, decode_cursor, encode_cursor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 
-
 log = logging.getLogger(__name__)
 
+# статусы «в работе» — их пишут разные версии take_task
+ACTIVE_STATUSES = ("active", "in_progress", "taken")
+# назначение ещё не закрыто: повторно взять нельзя, сдать можно
+OPEN_STATUSES = (*ACTIVE_STATUSES, "submitted")
+
 
 def reward_to_difficulty(reward: int) -> str:
     """
@@ -39,7 +62,7 @@ def difficulty_condition(diff: str):
     return None  # all
 
 
-def admin_create_task(
+async def admin_create_task(
     *,
     title: str,
     description: str,
@@ -54,7 +77,7 @@ def admin_create_task(
     if difficulty is None:
         difficulty = reward_to_difficulty(reward)
 
-    with SessionLocal() as s:
+    async with AsyncSessionLocal() as s:
         t = Task(
             title=title,
             description=description,
@@ -65,111 +88,72 @@ def admin_create_task(
             is_published=True,
         )
         s.add(t)
-        s.commit()
-        s.refresh(t)
-        return t.id
-
-
-# def admin_create_task(*, title: str, description: str, reward: int, difficulty: str, deadline_days: int) -> int:
-#     """difficulty: easy|medium|hard; deadline_days >= 0"""
-#     with SessionLocal() as s:
-#         difficulty = reward_to_difficulty(reward)
-#         t = _create_task_obj(
-#             title=title,
-#             description=description,
-#             reward=reward,
-#             difficulty=difficulty,
-#             is_published=True,
-#             deadline_days=deadline_days,
-#         )
-#         s.add(t)
-#         s.commit()
-#         s.refresh(t)
-#         return t.id
-
-
-def admin_delete_task(task_id: int) -> bool:
-    with SessionLocal() as s:
-        t = s.query(Task).filter(Task.id == task_id).first()
+        await s.commit()
+        await s.refresh(t)
+    catalog_cache.invalidate()
+    return t.id
+
+
+async def admin_delete_task(task_id: int) -> bool:
+    async with AsyncSessionLocal() as s:
+        t = await s.get(Task, task_id)
         if not t:
             return False
-        s.delete(t)
-        s.commit()
-        return True
+        await s.delete(t)
+        await s.commit()
+    catalog_cache.invalidate()
+    return True
 
 
-def admin_list_all_tasks():
-    with SessionLocal() as s:
-        return s.query(Task).order_by(Task.id.desc()).all()
+async def admin_list_all_tasks():
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(select(Task).order_by(Task.id.desc()))
+        return list(rows)
 
 
-def admin_toggle_task_publised(task_id: int) -> bool:
+async def admin_toggle_task_publised(task_id: int) -> bool:
     fm = _task_field_map()
     pub_f = fm.get("published")
     if not pub_f:
         return False
-    with SessionLocal() as s:
-        t = s.query(Task).filter(Task.id == task_id).first()
+    async with AsyncSessionLocal() as s:
+        t = await s.get(Task, task_id)
         if not t:
             return False
         setattr(t, pub_f, not bool(getattr(t, pub_f)))
-        s.commit()
-        return True
-
-
-# определение сложности задачи
-def classify_difficulty(reward: int) -> str:
-    if reward <= 5:
-        return "easy"
-    elif reward <= 10:
-        return "medium"
-    else:
-        return "hard"
+        await s.commit()
+    catalog_cache.invalidate()
+    return True
 
 
-def get_active_assignment(user_tg_id: int, task_id: int) -> TaskAssignment | None:
+async def get_active_assignment(
+    user_tg_id: int, task_id: int, session: AsyncSession | None = None
+) -> TaskAssignment | None:
     """
     Возвращает активное/отправленное назначение по заданию для пользователя.
     """
-    with SessionLocal() as s:
+    async with session_scope(session) as s:
         stmt = (
             select(TaskAssignment)
             .join(User, TaskAssignment.user_id == User.id)
             .where(
                 User.tg_id == user_tg_id,
                 TaskAssignment.task_id == task_id,
-                TaskAssignment.status.in_(("active", "submitted")),
+                TaskAssignment.status.in_(OPEN_STATUSES),
             )
+            .order_by(TaskAssignment.id.desc())
+            .limit(1)
         )
-        return s.execute(stmt).scalar_one_or_none()
-
-
-def submit_assignment_text(assignment_id: int, text: str) -> bool:
-    with SessionLocal() as s:
-        a = s.get(TaskAssignment, assignment_id)
-        if not a:
-            return False
-        a.submission_text = text
-        a.submitted_at = datetime.utcnow()
-        a.status = "submitted"
-        s.commit()
-        return True
-
-
-def submit_assignment_file(assignment_id: int, file_id: str) -> bool:
-    with SessionLocal() as s:
-        a = s.get(TaskAssignment, assignment_id)
-        if not a:
-            return False
-        a.submission_file_id = file_id
-        a.submitted_at = datetime.utcnow()
-        a.status = "submitted"
-        s.commit()
-        return True
+        return await s.scalar(stmt)
 
 
 def _task_field_map() -> dict[str, str | None]:
-    title = "title" if hasattr(Task, "title") else None
+    """Вернём ВСЕ ключи, даже если столбца нет (значение = None)."""
+    title = (
+        "title"
+        if hasattr(Task, "title")
+        else ("name" if hasattr(Task, "name") else None)
+    )
     description = "description" if hasattr(Task, "description") else None
     reward = (
         "reward"
@@ -207,29 +191,37 @@ def _create_task_obj(
     *, title: str, description: str, reward: int, difficulty: str, deadline_days: int
 ) -> Task:
     fm = _task_field_map()
-    t = Task()  # ВАЖНО: без kwargs!
-
-    if fm["title"]:
-        setattr(t, fm["title"], title)
-    if fm["description"]:
-        setattr(t, fm["description"], description)
-    if fm["reward"]:
-        setattr(t, fm["reward"], reward)
-    if fm["difficulty"]:
-        setattr(t, fm["difficulty"], difficulty)
-    if fm["published"]:
-        setattr(t, fm["published"], False)
-    if fm["deadline_days"]:
-        setattr(t, fm["deadline_days"], deadline_days)
-    if fm["created_at"]:
-        setattr(t, fm["created_at"], datetime.utcnow())
+    t = Task()  # БЕЗ kwargs
+
+    title_f = fm.get("title")
+    desc_f = fm.get("description")
+    reward_f = fm.get("reward")
+    diff_f = fm.get("difficulty")
+    pub_f = fm.get("published")
+    deadline_f = fm.get("deadline_days")
+    created_at_f = fm.get("created_at")
+
+    if title_f:
+        setattr(t, title_f, title)
+    if desc_f:
+        setattr(t, desc_f, description)
+    if reward_f:
+        setattr(t, reward_f, reward)
+    if diff_f:
+        setattr(t, diff_f, difficulty)
+    if pub_f:
+        setattr(t, pub_f, False)
+    if deadline_f:
+        setattr(t, deadline_f, deadline_days)
+    if created_at_f:
+        setattr(t, created_at_f, datetime.utcnow())
 
     return t
 
 
-def seed_tasks_if_empty() -> None:
-    with SessionLocal() as s:
-        count = s.query(Task).count()
+async def seed_tasks_if_empty() -> None:
+    async with AsyncSessionLocal() as s:
+        count = await s.scalar(select(func.count()).select_from(Task))
         if count > 0:
             return
         samples = [
@@ -257,230 +249,90 @@ def seed_tasks_if_empty() -> None:
         ]
         for d in samples:
             s.add(_create_task_obj(**d))
-        s.commit()
-
-
-def list_submitted_assignments(limit: int = 20) -> list[TaskAssignment]:
-    """Все задания в статусе 'submitted' для админской модерации."""
-    with SessionLocal() as s:
-        stmt = (
-            select(TaskAssignment)
-            .where(TaskAssignment.status == "submitted")
-            .order_by(TaskAssignment.id.desc())
-            .limit(limit)
-        )
-        res = s.execute(stmt)
-        items = [row[0] for row in res.all()]
-        # подгружаем связки task/user, чтобы потом можно было их показать
-        for ta in items:
-            _ = ta.task
-            _ = ta.user
-        return items
-
-
-# калькулятор начисления баллов
-def calc_reward_for_task(task: Task | None) -> int:
-    if task is None:
-        return 0
-    if getattr(task, "reward_coins", None) is not None:
-        return int(task.reward_coins)
-    # цена сложностей
-    diff_reward_map = {"easy": 3, "medium": 7, "hard": 12}
-    return diff_reward_map(getattr(task, "difficulty", ""), 0)
-
-
-def moderate_assignment(assignment_id: int, approved: bool) -> int:
-    """
-    Модерация сдачи задания.
-    :return: сколько coins начислили (0, если отклонено или ошибка)
-    """
-    with SessionLocal() as s:
-        ta = s.get(TaskAssignment, assignment_id)
-        if not ta:
-            log.warning("moderate_assignment: assignment %s not found", assignment_id)
-            return 0
-
-        # чтобы не начислить второй раз
-        if ta.status in ("approved", "done", "rejected"):
-            log.warning(
-                "moderate_assignment: assignment %s already moderated with status=%s",
-                assignment_id,
-                ta.status,
-            )
-            return 0
-
-        user = ta.user
-        if not user:
-            user = s.get(User, ta.user_id) if ta.user_id else None
-        if not user:
-            log.error(
-                "moderate_assignment: user not found for assignment %s (user_id=%s)",
-                assignment_id,
-                ta.user_id,
-            )
-            return 0
-
-        if not approved:
-            ta.status = "rejected"
-            s.commit()
-            log.info(
-                "moderate_assignment: REJECT assignment %s for user %s",
-                assignment_id,
-                user.tg_id,
-            )
-            return 0
-
-        # считаем награду
-        reward = calc_reward_for_task(ta.task)
-
-        before = user.coins or 0
-        after = before + reward
-        user.coins = after
-
-        ta.status = "approved"
-        ta.checked_at = datetime.utcnow() if hasattr(ta, "checked_at") else None
-
-        s.commit()
-
-        log.info(
-            "moderate_assignment: APPROVE assignment %s, user %s coins %s -> %s (reward=%s)",
-            assignment_id,
-            user.tg_id,
-            before,
-            after,
-            reward,
-        )
-        return reward
+        await s.commit()
+    catalog_cache.invalidate()
 
 
-def list_tasks(
-    *,
-    min_reward: int | None = None,
-    max_reward: int | None = None,
+async def list_public_tasks(
     difficulty: str | None = None,
-    only_published: bool = True,
-):
-    fm = _task_field_map()
-    with SessionLocal() as s:
-        q = s.query(Task)
-        pub_f = fm.get("published")
-        rew_f = fm.get("reward")
-        dif_f = fm.get("difficulty")
-        if only_published and pub_f:
-            q = q.filter(getattr(Task, pub_f) == True)  # noqa: E712
-        if difficulty and dif_f:
-            q = q.filter(getattr(Task, dif_f) == difficulty)
-        if rew_f:
-            if min_reward is not None:
-                q = q.filter(getattr(Task, rew_f) >= min_reward)
-            if max_reward is not None:
-                q = q.filter(getattr(Task, rew_f) <= max_reward)
-        return q.order_by(Task.id.desc()).all()
-
-
-def list_public_tasks(difficulty: str | None = None) -> list[Task]:
+    session: AsyncSession | None = None,
+    *,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[Task]:
     """
     Возвращает задачи, которые должны отображаться в каталоге.
     difficulty: "easy" | "medium" | "hard" | "all" | None
+    limit/offset — страница каталога.
     """
 
-    with SessionLocal() as s:
-        q = s.query(Task).filter(Task.is_published == True)
+    async with session_scope(session) as s:
+        stmt = select(Task).where(Task.is_published == True)
 
         # Если передали фильтр по сложности
         if difficulty and difficulty != "all":
-            q = q.filter(Task.difficulty == difficulty)
+            stmt = stmt.where(Task.difficulty == difficulty)
 
-        q = q.filter(Task.status == "active")
+        stmt = stmt.where(Task.status == "active")
         # Для стабильного порядка
-        q = q.order_by(Task.id.asc())
-
-        return q.all()
-
-
-def debug_all_tasks() -> list[Task]:
-    with SessionLocal as s:
-        return s.query(Task).order_by(Task.id.asc()).all()
+        stmt = stmt.order_by(Task.id.asc())
+        if limit is not None:
+            stmt = stmt.limit(limit).offset(offset)
 
+        return list(await s.scalars(stmt))
 
-def get_task(task_id: int):
-    with SessionLocal() as s:
-        return s.query(Task).filter(Task.id == task_id).first()
 
-
-def has_active_assignment(user_tg_id: int, task_id: int) -> bool:
+async def has_active_assignment(
+    user_tg_id: int, task_id: int, session: AsyncSession | None = None
+) -> bool:
     """
     Есть ли у пользователя АКТИВНОЕ/ОТПРАВЛЕННОЕ на проверку задание с этим task_id.
     approved/rejected — НЕ считаем активным.
     """
+    user = await get_cached_user(user_tg_id, session)
+    if not user:
+        log.debug("[has_active_assignment] user %s not found", user_tg_id)
+        return False
 
-    print(f"[DEBUG has_active_assignment] user_tg_id={user_tg_id}, task_id={task_id}")
-
-    with SessionLocal() as s:
-        user = s.query(User).filter(User.tg_id == user_tg_id).first()
-        if not user:
-            print("[DEBUG has_active_assignment] user not found")
-            return False
-
-        q = s.query(TaskAssignment).filter(
+    async with session_scope(session) as s:
+        q = select(TaskAssignment.id).where(
             TaskAssignment.user_id == user.id,
             TaskAssignment.task_id == task_id,
-            TaskAssignment.status.in_(("active", "submitted")),
+            TaskAssignment.status.in_(OPEN_STATUSES),
         )
 
-        exists = s.query(q.exists()).scalar()
-        print("[DEBUG has_active_assignment] exists={exists}")
-        return exists
-
-    # with SessionLocal() as s:
-    #     user = (
-    #         s.query(User)
-    #         .filter(User.tg_id == user_tg_id)
-    #         .one_or_none()
-    #     )
-    #     if not user:
-    #         return False
-
-    #     existing = (
-    #         s.query(TaskAssignment)
-    #         .filter(
-    #             TaskAssignment.user_id == user.id,
-    #             TaskAssignment.task_id == task_id,
-    #             TaskAssignment.status.in_(("active", "submitted")),
-    #         )
-    #         .first()
-    #     )
-    #     return existing is not None
-
-
-def take_task(user_tg_id: int, task_id: int) -> bool:
+        return await s.scalar(select(q.exists()))
+
+
+async def take_task(
+    user_tg_id: int, task_id: int, session: AsyncSession | None = None
+) -> bool:
     """
     Пользователь берёт задание.
     Создаём TaskAssignment в статусе active, если ещё не было активного.
     """
-    with SessionLocal() as s:
+    cached = await get_cached_user(user_tg_id, session)
+    async with session_scope(session) as s:
         # ищем / создаём пользователя
-        user = s.execute(
-            select(User).where(User.tg_id == user_tg_id)
-        ).scalar_one_or_none()
+        user = cached
         if not user:
             user = User(tg_id=user_tg_id)
             s.add(user)
-            s.flush()  # чтобы появился user.id
+            await s.flush()  # чтобы появился user.id
 
-        task = s.get(Task, task_id)
+        task = await s.get(Task, task_id)
         if not task:
             log.warning("take_task: task %s not found", task_id)
             return False
 
         # если есть активное/submitted назначение — не создаём ещё одно
-        exists = s.execute(
-            select(TaskAssignment).where(
+        exists = await s.scalar(
+            select(TaskAssignment.id).where(
                 TaskAssignment.user_id == user.id,
                 TaskAssignment.task_id == task_id,
-                TaskAssignment.status.in_(("active", "submitted")),
+                TaskAssignment.status.in_(OPEN_STATUSES),
             )
-        ).scalar_one_or_none()
+        )
         if exists:
             return False
 
@@ -497,144 +349,68 @@ def take_task(user_tg_id: int, task_id: int) -> bool:
             status="active",
         )
         s.add(ta)
-        s.commit()
+        await commit(s)
+        if not cached:
+            remember(s, user)
         return True
 
 
-def _task_field_map() -> dict[str, str | None]:
-    """Вернём ВСЕ ключи, даже если столбца нет (значение = None)."""
-    title = (
-        "title"
-        if hasattr(Task, "title")
-        else ("name" if hasattr(Task, "name") else None)
-    )
-    description = "description" if hasattr(Task, "description") else None
-    reward = (
-        "reward"
-        if hasattr(Task, "reward")
-        else ("coins" if hasattr(Task, "coins") else None)
-    )
-    difficulty = (
-        "difficulty"
-        if hasattr(Task, "difficulty")
-        else ("level" if hasattr(Task, "level") else None)
-    )
-    published = (
-        "published"
-        if hasattr(Task, "published")
-        else ("is_published" if hasattr(Task, "is_published") else None)
-    )
-    deadline_days = (
-        "deadline_days"
-        if hasattr(Task, "deadline_days")
-        else ("deadline" if hasattr(Task, "deadline") else None)
-    )
-    created_at = "created_at" if hasattr(Task, "created_at") else None
-    return {
-        "title": title,
-        "description": description,
-        "reward": reward,
-        "difficulty": difficulty,
-        "published": published,
-        "deadline_days": deadline_days,
-        "created_at": created_at,
-    }
+async def get_task(task_id: int, session: AsyncSession | None = None) -> Task | None:
+    async with session_scope(session) as s:
+        return await s.get(Task, task_id)
 
 
-def _create_task_obj(
-    *, title: str, description: str, reward: int, difficulty: str, deadline_days: int
-) -> Task:
-    fm = _task_field_map()
-    t = Task()  # БЕЗ kwargs
-
-    title_f = fm.get("title")
-    desc_f = fm.get("description")
-    reward_f = fm.get("reward")
-    diff_f = fm.get("difficulty")
-    pub_f = fm.get("published")
-    deadline_f = fm.get("deadline_days")
-    created_at_f = fm.get("created_at")
-
-    if title_f:
-        setattr(t, title_f, title)
-    if desc_f:
-        setattr(t, desc_f, description)
-    if reward_f:
-        setattr(t, reward_f, reward)
-    if diff_f:
-        setattr(t, diff_f, difficulty)
-    if pub_f:
-        setattr(t, pub_f, False)
-    if deadline_f:
-        setattr(t, deadline_f, deadline_days)
-    if created_at_f:
-        setattr(t, created_at_f, datetime.utcnow())
-
-    return t
-
-
-def list_tasks(
+async def _keyset_page(
+    s: AsyncSession,
+    stmt,
+    col,
+    id_col,
+    cursor: Cursor | None,
+    per_page: int,
     *,
-    min_reward: int | None = None,
-    max_reward: int | None = None,
-    difficulty: str | None = None,
-    only_published: bool = True,
-) -> list[Task]:
-    fm = _task_field_map()
-    with SessionLocal() as s:
-        q = s.query(Task)
-        # опубликовнные
-        if only_published and fm["published"]:
-            q = q.filter(getattr(Task, fm["published"]) == True)  # noqa: E712
-        # сложность
-        if difficulty and fm["difficulty"]:
-            q = q.filter(getattr(Task, fm["difficulty"]) == difficulty)
-        # диапазон награды
-        if fm["reward"]:
-            if min_reward is not None:
-                q = q.filter(getattr(Task, fm["reward"]) >= min_reward)
-            if max_reward is not None:
-                q = q.filter(getattr(Task, fm["reward"]) <= max_reward)
-        return q.order_by(Task.id.desc()).all()
-
-
-def get_task(task_id: int) -> Task | None:
-    with SessionLocal() as s:
-        return s.query(Task).filter(Task.id == task_id).first()
-
-
-def _resolve_user(user_tg_id: int) -> User | None:
-    with SessionLocal() as s:
-        return s.execute(
-            select(User).where(User.tg_id == user_tg_id)
-        ).scalar_one_or_none()
-
-
-def count_assignments_by_status(user_tg_id: int) -> dict[str, int]:
-    """Вернёт агрегаты по группам статусов: active / submitted / done"""
-    with SessionLocal() as s:
-        user = _resolve_user(s, user_tg_id)
-        if not user:
-            return {"active": 0, "submitted": 0, "done": 0}
-        q = (
-            select(TaskAssignment.status, func.count(TaskAssignment.id))
-            .where(TaskAssignment.user_id == user.id)
-            .group_by(TaskAssignment.status)
-        )
-        rows = s.execute(q).all()
-        by_status = {st: cnt for st, cnt in rows}
-        active = by_status.get("in_progress", 0)
-        submitted = by_status.get("submitted", 0)
-        done = by_status.get("approved", 0) + by_status.get("rejected", 0)
-        return {"active": active, "submitted": submitted, "done": done}
-
-
-def list_pending_submissions(page: int = 1, per_page: int = 10):
-    """
-    Возвращает список pending заявок:
-    (assignment_id, task_title, user_tg_id, username, submitted_at)
-    """
-    with SessionLocal() as s:
+    desc: bool,
+) -> tuple[list, str | None]:
+    """
+    Страница «после курсора» по (col, id) без OFFSET: сравнение кортежей
+    идёт по индексу, и страница N стоит столько же, сколько первая.
+    Строки с col IS NULL идут в конце отдельным запросом по id.
+    -> (строки, курсор следующей страницы или None)
+    """
+    limit = per_page + 1
+    at, last_id = cursor if cursor else (None, None)
+    rows: list = []
+    if cursor is None or at is not None:
+        q = stmt.where(col.is_not(None))
+        if cursor:
+            key, bound = tuple_(col, id_col), tuple_(at, last_id)
+            q = q.where(key < bound if desc else key > bound)
+        order = (col.desc(), id_col.desc()) if desc else (col.asc(), id_col.asc())
+        rows = list((await s.execute(q.order_by(*order).limit(limit))).all())
+    if len(rows) < limit:
+        q = stmt.where(col.is_(None))
+        if cursor and at is None:
+            q = q.where(id_col < last_id if desc else id_col > last_id)
+        q = q.order_by(id_col.desc() if desc else id_col.asc())
+        rows += (await s.execute(q.limit(limit - len(rows)))).all()
+
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, col.key), getattr(last, id_col.key))
+
+
+async def list_pending_submissions(
+    cursor: str | None = None,
+    per_page: int = 10,
+    session: AsyncSession | None = None,
+) -> tuple[list, str | None]:
+    """
+    Возвращает страницу pending заявок и курсор следующей:
+    ([(assignment_id, task_title, user_tg_id, username, submitted_at)], cursor)
+    Свежие сверху; курсор — (submitted_at, id) последней строки.
+    """
+    async with session_scope(session) as s:
         stmt = (
             select(
                 TaskAssignment.id,
@@ -646,60 +422,74 @@ def list_pending_submissions(page: int = 1, per_page: int = 10):
             .join(Task, Task.id == TaskAssignment.task_id)
             .join(User, User.id == TaskAssignment.user_id)
             .where(TaskAssignment.status == "submitted")
-            .order_by(TaskAssignment.submitted_at.desc())
-            .limit(per_page)
-            .offset((page - 1) * per_page)
         )
-        return list(s.execute(stmt).all())
+        return await _keyset_page(
+            s,
+            stmt,
+            TaskAssignment.submitted_at,
+            TaskAssignment.id,
+            decode_cursor(cursor),
+            per_page,
+            desc=True,
+        )
 
 
-def get_assignment_full(assignment_id: int):
+async def get_assignment_full(assignment_id: int, session: AsyncSession | None = None):
     """Вернёт assignment + связанные task/user."""
-    with SessionLocal() as s:
-        a = (
-            s.query(TaskAssignment)
-            .options(joinedload(TaskAssignment.task), joinedload(TaskAssignment.user))
-            .get(assignment_id)
+    async with session_scope(session) as s:
+        a = await s.get(
+            TaskAssignment,
+            assignment_id,
+            options=[joinedload(TaskAssignment.task), joinedload(TaskAssignment.user)],
         )
         return a
 
 
-def count_assignments_by_status(user_tg_id: int) -> dict[str, int]:
+async def count_assignments_by_status(
+    user_tg_id: int, session: AsyncSession | None = None
+) -> dict[str, int]:
     """
     Возвращает количество по группам: active/submitted/done
-    active = in_progress; submitted = submitted; done = approved|rejected
+    active = ACTIVE_STATUSES; submitted = submitted; done = approved|rejected
     """
-    with SessionLocal() as s:
-        u = s.execute(select(User).where(User.tg_id == user_tg_id)).scalar_one_or_none()
-        if not u:
-            return {"active": 0, "submitted": 0, "done": 0}
+    u = await get_cached_user(user_tg_id, session)
+    if not u:
+        return {"active": 0, "submitted": 0, "done": 0}
 
+    async with session_scope(session) as s:
         base = (
             select(TaskAssignment.status, func.count())
             .where(TaskAssignment.user_id == u.id)
             .group_by(TaskAssignment.status)
         )
-        rows = s.execute(base).all()
+        rows = (await s.execute(base)).all()
         raw = {st: cnt for st, cnt in rows}
-        active = raw.get("in_progress", 0)
+        active = sum(raw.get(st, 0) for st in ACTIVE_STATUSES)
         submitted = raw.get("submitted", 0)
         done = raw.get("approved", 0) + raw.get("rejected", 0)
         return {"active": active, "submitted": submitted, "done": done}
 
 
-def list_assignments(
-    user_tg_id: int, group: str, page: int = 1, per_page: int = 10, diff: str = "all"
-):
-    """
-    -> [(assignment_id, title, status, reward, due_at, submitted_at)]
-    """
-    with SessionLocal() as s:
-        u = s.execute(select(User).where(User.tg_id == user_tg_id)).scalar_one_or_none()
-        if not u:
-            return []
-
+async def list_assignments(
+    user_tg_id: int,
+    group: str,
+    cursor: str | None = None,
+    per_page: int = 10,
+    diff: str = "all",
+    session: AsyncSession | None = None,
+) -> tuple[list, str | None]:
+    """
+    -> ([(assignment_id, title, status, reward, due_at, submitted_at)], cursor)
+    active — ближайшие дедлайны сверху, курсор (due_at, id);
+    остальные — свежеприсланные сверху, курсор (submitted_at, id).
+    """
+    u = await get_cached_user(user_tg_id, session)
+    if not u:
+        return [], None
+
+    async with session_scope(session) as s:
         if group == "active":
-            cond_group = TaskAssignment.status == "in_progress"
+            cond_group = TaskAssignment.status.in_(ACTIVE_STATUSES)
         elif group == "submitted":
             cond_group = TaskAssignment.status == "submitted"
         else:
@@ -724,54 +514,14 @@ def list_assignments(
         cond_diff = difficulty_condition(diff)
         if cond_diff is not None:
             stmt = stmt.where(cond_diff)
-        # ✅ корректная сортировка без updated_at
-        if group == "active":
-            # ближайшие дедлайны сверху; пустые дедлайны — внизу
-            stmt = stmt.order_by(
-                TaskAssignment.due_at.asc().nullslast(),
-                TaskAssignment.id.desc(),
-            )
-        else:
-            # свежеприсланные сверху; если submitted_at пуст — внизу
-            stmt = stmt.order_by(
-                TaskAssignment.submitted_at.desc().nullslast(),
-                TaskAssignment.id.desc(),
-            )
-
-
-def moderate_assignment(assignment_id: int, approved: bool) -> bool:
-    """
-    Модерация заявки:
-    - approved=True  → статус 'done', начисляем coins
-    - approved=False → статус 'rejected' (без награды)
-    """
-    with SessionLocal() as s:
-        ta: TaskAssignment | None = s.query(TaskAssignment).get(assignment_id)
-        if not ta:
-            return False
 
-        if ta.status != "submitted":
-            # Модерировать есть смысл только "на проверке"
-            return False
-
-        task: Task | None = ta.task
-        user: User | None = ta.user
-
-        if approved:
-            reward = getattr(task, "reward_coins", 0) or 0
-            if user:
-                user.coins = (user.coins or 0) + reward
-            ta.status = "done"
+        if group == "active":
+            col, desc = TaskAssignment.due_at, False
         else:
-            ta.status = "rejected"
-
-        s.commit()
-        return True
-
-
-# ultil for id
-def _get(obj, name, default=None):
-    return getattr(obj, name, default)
+            col, desc = TaskAssignment.submitted_at, True
+        return await _keyset_page(
+            s, stmt, col, TaskAssignment.id, decode_cursor(cursor), per_page, desc=desc
+        )
 
 
 def format_dt(dt: datetime | None) -> str:
@@ -780,20 +530,21 @@ def format_dt(dt: datetime | None) -> str:
     return dt.strftime("%Y-%m-%d %H:%M")
 
 
-def get_assignment_card(assignment_id: int) -> str | None:
+async def get_assignment_card(
+    assignment_id: int, session: AsyncSession | None = None
+) -> str | None:
     """
     Возвращает готовый текст для карточки назначения задания:
     кто, какое задание, дедлайн, статус, что прислал и т.п.
     """
-    with SessionLocal() as s:
-        ta: TaskAssignment | None = (
-            s.query(TaskAssignment)
+    async with session_scope(session) as s:
+        ta: TaskAssignment | None = await s.scalar(
+            select(TaskAssignment)
             .options(
                 joinedload(TaskAssignment.user),
                 joinedload(TaskAssignment.task),
             )
-            .filter(TaskAssignment.id == assignment_id)
-            .one_or_none()
+            .where(TaskAssignment.id == assignment_id)
         )
 
         if not ta:
@@ -861,25 +612,26 @@ def get_assignment_card(assignment_id: int) -> str | None:
 
         return text
 
-def get_user(get_assignment_card):
-    get = get_assignment_card()
-    return get
 
-def list_pending_assignments(limit: int = 20) -> list[dict]:
+async def list_pending_assignments(
+    limit: int = 20, session: AsyncSession | None = None
+) -> list[dict]:
     """
     Вернуть последние N заданий в статусе 'submitted'
     в виде простых dict'ов (чтобы не ловить DetachedInstanceError).
+    task/user приходят тем же запросом через JOIN.
     """
-    with SessionLocal() as s:
+    async with session_scope(session) as s:
         rows = (
-            s.query(TaskAssignment, Task, User)
-            .join(Task, Task.id == TaskAssignment.task_id)
-            .join(User, User.id == TaskAssignment.user_id)
-            .filter(TaskAssignment.status == "submitted")
-            .order_by(TaskAssignment.id.desc())
-            .limit(limit)
-            .all()
-        )
+            await s.execute(
+                select(TaskAssignment, Task, User)
+                .join(Task, Task.id == TaskAssignment.task_id)
+                .join(User, User.id == TaskAssignment.user_id)
+                .where(TaskAssignment.status == "submitted")
+                .order_by(TaskAssignment.id.desc())
+                .limit(limit)
+            )
+        ).all()
 
         items: list[dict] = []
         for assign, task, user in rows:
@@ -904,18 +656,26 @@ def list_pending_assignments(limit: int = 20) -> list[dict]:
         return items
 
 
-def get_assignment_for_moderation(assignment_id: int) -> dict | None:
+async def get_assignment_for_moderation(
+    assignment_id: int, session: AsyncSession | None = None
+) -> dict | None:
     """
     Достать одно конкретное задание для экрана проверки.
     """
-    with SessionLocal() as s:
+    files = (
+        select(func.count(SubmissionFile.id))
+        .where(SubmissionFile.assignment_id == TaskAssignment.id)
+        .scalar_subquery()
+    )
+    async with session_scope(session) as s:
         row = (
-            s.query(TaskAssignment, Task, User)
-            .join(Task, Task.id == TaskAssignment.task_id)
-            .join(User, User.id == TaskAssignment.user_id)
-            .filter(TaskAssignment.id == assignment_id)
-            .one_or_none()
-        )
+            await s.execute(
+                select(TaskAssignment, Task, User, files)
+                .join(Task, Task.id == TaskAssignment.task_id)
+                .join(User, User.id == TaskAssignment.user_id)
+                .where(TaskAssignment.id == assignment_id)
+            )
+        ).one_or_none()
 
         if row is None:
             log.warning(
@@ -923,7 +683,7 @@ def get_assignment_for_moderation(assignment_id: int) -> dict | None:
             )
             return None
 
-        assign, task, user = row
+        assign, task, user, n_files = row
         return {
             "id": assign.id,
             "task_id": assign.task_id,
@@ -936,225 +696,327 @@ def get_assignment_for_moderation(assignment_id: int) -> dict | None:
             "submitted_at": assign.submitted_at,
             "submission_text": assign.submission_text,
             "submission_file_id": assign.submission_file_id,
+            # файлов в сдаче; старые сдачи без submission_files — по file_id
+            "submission_files": n_files or int(bool(assign.submission_file_id)),
             "reward": task.reward_coins or 0,
         }
 
 
-def approve_assignment(assignment_id: int) -> bool:
-    """
-    Одобрить сдачу: поменять статус на 'approved' и начислить монеты.
-    """
-    with SessionLocal() as s:
-        assign: TaskAssignment | None = s.get(TaskAssignment, assignment_id)
-        if not assign:
-            log.warning("[approve_assignment] assignment %s not found", assignment_id)
-            return False
+@dataclass(frozen=True, slots=True)
+class Reviewed:
+    """Одна закрытая сдача — для уведомления автора."""
 
-        if assign.status != "submitted":
-            log.warning(
-                "[approve_assignment] assignment %s has status %s, expected 'submitted'",
-                assignment_id,
-                assign.status,
-            )
-            return False
+    assignment_id: int
+    user_tg_id: int
+    task_title: str
+    reward: int
 
-        user: User | None = s.get(User, assign.user_id)
-        task: Task | None = s.get(Task, assign.task_id)
 
-        reward = (task.reward_coins or 0) if task else 0
+@dataclass(slots=True)
+class BulkReview:
+    items: list[Reviewed]
+    # tg_id -> (coins до, coins после) у тех, кому начислили
+    balances: dict[int, tuple[int, int]]
 
-        if user and reward:
-            user.coins = (user.coins or 0) + reward
-            log.info(
-                "[approve_assignment] user %s got +%s coins (now %s)",
-                user.tg_id,
-                reward,
-                user.coins,
+
+def _review_notices(result: BulkReview, approve: bool) -> list[tuple[int, str]]:
+    """Сообщения авторам: по одному на сдачу плюс level up/бейдж по итогу."""
+    messages = []
+    for it in result.items:
+        if approve:
+            text = (
+                f"✅ Ваше задание <b>{it.task_title}</b> проверено. "
+                f"Начислено <b>+{it.reward}</b> coins!"
+            )
+        else:
+            text = (
+                f"❌ Ваше задание <b>{it.task_title}</b> отклонено.\n"
+                "Попробуйте ещё раз — уточните детали и пришлите новый вариант."
+            )
+        messages.append((it.user_tg_id, text))
+    for tg_id, (before, after) in result.balances.items():
+        lvl_before = level_by_coins(before).level
+        lvl_after = level_by_coins(after).level
+        if lvl_after <= lvl_before:
+            continue
+        messages.append(
+            (tg_id, f"🎉 <b>Level up!</b>\nТеперь у вас <b>Level {lvl_after}</b>.")
+        )
+        badge = newly_unlocked_badge(lvl_before, lvl_after)
+        if badge:
+            messages.append(
+                (tg_id, f"{badge.icon} <b>Badge unlocked:</b> {badge.title}")
             )
+    return messages
 
-        assign.status = "approved"
-        s.commit()
-        return True
+
+async def _finish_review(s: AsyncSession, result: BulkReview, approve: bool) -> None:
+    """Уведомления в outbox той же транзакцией, затем фиксация."""
+    await enqueue(s, _review_notices(result, approve))
+    await commit(s)
+    # рейтинг и кэш пользователей обновит сам coins.credit после commit
+    after_commit(s, outbox.wake)
 
 
-def reject_assignment(assignment_id: int) -> bool:
+async def _close_review(s: AsyncSession, assignment_id: int, status: str):
     """
-    Отклонить сдачу: просто поменять статус на 'rejected'.
+    submitted -> status одним условным UPDATE: из двух одновременных решений
+    (или двойного клика) проходит только первое, второе не найдёт строку.
+    -> (user_id, tg_id, title, reward_coins) или None
     """
-    with SessionLocal() as s:
-        assign: TaskAssignment | None = s.get(TaskAssignment, assignment_id)
-        if not assign:
-            log.warning("[reject_assignment] assignment %s not found", assignment_id)
-            return False
-
-        if assign.status != "submitted":
-            log.warning(
-                "[reject_assignment] assignment %s has status %s, expected 'submitted'",
-                assignment_id,
-                assign.status,
+    row = (
+        await s.execute(
+            update(TaskAssignment)
+            .where(
+                TaskAssignment.id == assignment_id,
+                TaskAssignment.status == "submitted",
             )
+            .values(status=status)
+            .returning(TaskAssignment.user_id, TaskAssignment.task_id)
+        )
+    ).one_or_none()
+    if row is None:
+        log.warning(
+            "[review] assignment %s not found or not 'submitted'", assignment_id
+        )
+        return None
+    # UPDATE мимо ORM — счётчики статистики правим сами
+    deltas = {"assignments:submitted": -1, f"assignments:{status}": 1}
+    await s.run_sync(lambda ss: apply_counter_deltas(ss.connection(), deltas))
+    return (
+        await s.execute(
+            select(TaskAssignment.user_id, User.tg_id, Task.title, Task.reward_coins)
+            .join(Task, Task.id == TaskAssignment.task_id)
+            .join(User, User.id == TaskAssignment.user_id)
+            .where(TaskAssignment.id == assignment_id)
+        )
+    ).one()
+
+
+async def approve_assignment(
+    assignment_id: int, session: AsyncSession | None = None
+) -> bool:
+    """
+    Одобрить сдачу: поменять статус на 'approved', начислить монеты
+    через журнал (services/coins.py) и поставить автору уведомление в outbox.
+    """
+    async with session_scope(session) as s:
+        row = await _close_review(s, assignment_id, "approved")
+        if row is None:
             return False
+        reward = row.reward_coins or 0
+        result = BulkReview(
+            items=[Reviewed(assignment_id, row.tg_id, row.title, reward)],
+            balances={},
+        )
 
-        assign.status = "rejected"
-        s.commit()
+        user = None
+        if reward:
+            user = await credit(
+                s, row.user_id, reward, "task_approved", assignment_id=assignment_id
+            )
+            if user:
+                result.balances[user.tg_id] = (user.coins - reward, user.coins)
+                log.info(
+                    "[approve_assignment] user %s got +%s coins (now %s)",
+                    user.tg_id,
+                    reward,
+                    user.coins,
+                )
+
+        await _finish_review(s, result, True)
         return True
 
 
-def get_assignment_for_admin(assignment_id: int) -> dict | None:
+async def reject_assignment(
+    assignment_id: int, session: AsyncSession | None = None
+) -> bool:
     """
-    Одна конкретная заявка по id.
+    Отклонить сдачу: поменять статус на 'rejected' и уведомить автора.
     """
-    with SessionLocal() as s:
-        row = (
-            s.query(
-                TaskAssignment,
-                Task.title,
-                Task.reward_coins,
-                Task.difficulty,
-                User.username,
-                User.tg_id,
+    async with session_scope(session) as s:
+        row = await _close_review(s, assignment_id, "rejected")
+        if row is None:
+            return False
+        result = BulkReview(
+            items=[Reviewed(assignment_id, row.tg_id, row.title, 0)], balances={}
+        )
+        await _finish_review(s, result, False)
+        return True
+
+
+async def bulk_review(
+    approve: bool,
+    *,
+    assignment_ids: list[int] | None = None,
+    task_id: int | None = None,
+    session: AsyncSession | None = None,
+) -> BulkReview:
+    """
+    Закрыть пачку сдач разом: выбранные id (страница очереди) или все сдачи
+    задания task_id. Один UPDATE статусов, одна вставка в журнал и один
+    UPDATE coins на всех затронутых пользователей. Сдачи, которые уже
+    закрыл кто-то другой, пропускаются.
+    """
+    if assignment_ids is None and task_id is None:
+        raise ValueError("bulk_review: нужны assignment_ids или task_id")
+    status = "approved" if approve else "rejected"
+    if assignment_ids is not None:
+        scope = TaskAssignment.id.in_(assignment_ids)
+    else:
+        scope = TaskAssignment.task_id == task_id
+
+    async with session_scope(session) as s:
+        closed = list(
+            await s.scalars(
+                update(TaskAssignment)
+                .where(scope, TaskAssignment.status == "submitted")
+                .values(status=status)
+                .returning(TaskAssignment.id)
             )
-            .join(Task, TaskAssignment.task_id == Task.id)
-            .join(User, TaskAssignment.user_id == User.id)
-            .filter(TaskAssignment.id == assignment_id)
-            .one_or_none()
         )
+        if not closed:
+            return BulkReview(items=[], balances={})
+        n = len(closed)
+        deltas = {"assignments:submitted": -n, f"assignments:{status}": n}
+        await s.run_sync(lambda ss: apply_counter_deltas(ss.connection(), deltas))
 
-        if row is None:
-            return None
+        rows = (
+            await s.execute(
+                select(
+                    TaskAssignment.id,
+                    TaskAssignment.user_id,
+                    User.tg_id,
+                    Task.title,
+                    Task.reward_coins,
+                )
+                .join(Task, Task.id == TaskAssignment.task_id)
+                .join(User, User.id == TaskAssignment.user_id)
+                .where(TaskAssignment.id.in_(closed))
+                .order_by(TaskAssignment.id)
+            )
+        ).all()
+        items = [
+            Reviewed(r.id, r.tg_id, r.title, (r.reward_coins or 0) if approve else 0)
+            for r in rows
+        ]
 
-        a, title, reward, diff, uname, tg_id = row
+        users: list[User] = []
+        if approve:
+            users = await credit_many(
+                s,
+                [(r.user_id, r.reward_coins or 0, r.id) for r in rows],
+                "task_approved",
+            )
+        gained: dict[int, int] = {}
+        for it in items:
+            gained[it.user_tg_id] = gained.get(it.user_tg_id, 0) + it.reward
+        result = BulkReview(
+            items=items,
+            balances={u.tg_id: (u.coins - gained[u.tg_id], u.coins) for u in users},
+        )
+        await _finish_review(s, result, approve)
 
-        return {
-            "id": a.id,
-            "task_id": a.task_id,
-            "user_id": a.user_id,
-            "user_tg_id": tg_id,
-            "user_username": uname,
-            "task_title": title,
-            "task_reward": reward or 0,
-            "task_difficulty": diff,
-            "status": a.status,
-            "submitted_at": a.submitted_at,
-            "submission_text": a.submission_text,
-            "submission_file_id": a.submission_file_id,
-        }
+    log.info(
+        "[bulk_review] %s: %s assignments, %s users credited", status, n, len(users)
+    )
+    return result
 
 
-def submit_task(
+async def submit_task(
     user_tg_id: int,
     task_id: int,
     text: str | None,
     file_id: str | None,
+    session: AsyncSession | None = None,
+    *,
+    file_ids: list[str] | None = None,
 ) -> bool:
     """
     Сдать задание:
     - Находим юзера по tg_id
     - Берём последнее НЕфинальное назначение по этой задаче
-      (status IN ('active', 'submitted', 'taken'))
+      (status IN OPEN_STATUSES)
     - Обновляем текст/файл, submitted_at, статус -> 'submitted'
+    - Файлы (альбом целиком или одно фото) — в submission_files
+      одним INSERT в той же транзакции
     """
+    files = file_ids or ([file_id] if file_id else [])
+    file_id = file_id or (files[0] if files else None)
     if not text and not file_id:
-        print("[submit_task] Neither text nor file_id provided")
+        log.info("[submit_task] neither text nor file_id provided")
         return False
 
-    with SessionLocal() as session:
-        # 1) юзер по tg_id
-        user = session.scalar(select(User).where(User.tg_id == user_tg_id))
-        if not user:
-            print(f"[submit_task] No user found with tg_id={user_tg_id}")
-            return False
+    # 1) юзер по tg_id
+    user = await get_cached_user(user_tg_id, session)
+    if not user:
+        log.info("[submit_task] no user with tg_id=%s", user_tg_id)
+        return False
 
+    async with session_scope(session) as session:
         # 2) ищем последнее НЕфинальное назначение
-        non_final_statuses = ("active", "submitted", "taken")
-        assignment = session.scalar(
+        assignment = await session.scalar(
             select(TaskAssignment)
             .where(
                 TaskAssignment.user_id == user.id,
                 TaskAssignment.task_id == task_id,
-                TaskAssignment.status.in_(non_final_statuses),
+                TaskAssignment.status.in_(OPEN_STATUSES),
             )
             .order_by(TaskAssignment.id.desc())
         )
 
         if not assignment:
-            print(
-                f"[submit_task] No active assignment for user_id={user.id}, task_id={task_id}"
+            log.info(
+                "[submit_task] no active assignment for user_id=%s, task_id=%s",
+                user.id,
+                task_id,
             )
             return False
 
         if assignment.status in ("approved", "rejected"):
-            print(
-                f"[submit_task] Latest assignment {assignment.id} alredy final"
-                f"({assignment.status}, cannot submit)"
+            log.info(
+                "[submit_task] assignment %s already final (%s)",
+                assignment.id,
+                assignment.status,
             )
             return False
 
-        # 3) Обновляем сдачу
+        # 3) Обновляем сдачу; повторная сдача заменяет прошлые файлы
+        if assignment.status == "submitted":
+            await session.execute(
+                delete(SubmissionFile).where(
+                    SubmissionFile.assignment_id == assignment.id
+                )
+            )
+        if files:
+            await session.execute(
+                insert(SubmissionFile),
+                [
+                    {"assignment_id": assignment.id, "position": i, "file_id": f}
+                    for i, f in enumerate(files)
+                ],
+            )
         assignment.submission_text = text
         assignment.submission_file_id = file_id
         assignment.submitted_at = datetime.utcnow()
         assignment.status = "submitted"
 
         try:
-            session.commit()
-            print(
-                f"[submit_task] OK: assignment_id={assignment.id} marked as submitted"
-            )
+            await commit(session)
+            log.debug("[submit_task] assignment %s submitted", assignment.id)
             return True
-        except Exception as e:
-            session.rollback()
-            print(f"[submit_task] ERROR on commit: {e}")
+        except Exception:
+            await session.rollback()
+            log.exception("[submit_task] commit failed")
             return False
 
 
-# Список «на проверке» для админа
-def list_submitted_assignments(limit: int = 20) -> list[TaskAssignment]:
-    """
-    Все задания, отправленные на проверку (status='submitted'),
-    с заранее подгруженными user и task, чтобы их можно было трогать
-    после закрытия Session.
-    """
-    with SessionLocal() as s:
-        q = (
-            s.query(TaskAssignment)
-            .options(
-                joinedload(TaskAssignment.user),
-                joinedload(TaskAssignment.task),
-            )
-            .filter(TaskAssignment.status == "submitted")
-            .order_by(TaskAssignment.submitted_at.desc().nullslast())
-            .limit(limit)
-        )
-        items = q.all()
-
-        # на всякий случай «потрогаем» отношения, чтобы точно прогрелись
-        for a in items:
-            _ = a.user
-            _ = a.task
-
-        return items
-
-
 # Апрув/реджект модератором; при апруве — начисляем монеты
-def moderate_assignment(assignment_id: int, approve: bool) -> Optional[TaskAssignment]:
-    with SessionLocal() as s:
-        a = s.query(TaskAssignment).filter(TaskAssignment.id == assignment_id).first()
-        if not a or a.status != "submitted":
+async def moderate_assignment(
+    assignment_id: int, approve: bool, session: AsyncSession | None = None
+) -> TaskAssignment | None:
+    async with session_scope(session) as s:
+        decide = approve_assignment if approve else reject_assignment
+        if not await decide(assignment_id, session=s):
             return None
-
-        a.status = "approved" if approve else "rejected"
-        if hasattr(a, "reviewed_at"):
-            a.reviewed_at = datetime.utcnow()
-
-        # начислим юзеру монеты при апруве
-        if approve:
-            u = s.query(User).filter(User.tg_id == a.user_id).first()
-            t = s.query(Task).filter(Task.id == a.task_id).first()
-            if u and t:
-                reward = _get(t, "reward", _get(t, "coins", 0)) or 0
-                u.coins = (u.coins or 0) + int(reward)
-
-        s.commit()
-        s.refresh(a)
-        return a
+        return await s.get(TaskAssignment, assignment_id)
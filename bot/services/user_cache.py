@@ -0,0 +1,152 @@
+# bot/services/user_cache.py
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..storage.db import after_commit, session_scope
+from ..storage.models import User
+
+# сколько живёт запись и сколько пользователей держим в памяти
+USER_CACHE_TTL = 60.0
+USER_CACHE_SIZE = 10_000
+# «такого пользователя нет» — недолго: регистрация на другом воркере
+# станет видна здесь не позже чем через столько секунд
+USER_CACHE_MISS_TTL = 5.0
+# снимки, прочитанные или изменённые в сессии, — в session.info до её commit
+_SESSION_KEY = "user_cache"
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    """Снимок строки users: те же поля, что у модели, но без сессии и ленивых связей."""
+
+    id: int
+    tg_id: int
+    username: str | None
+    role: str | None
+    coins: int
+    is_admin: bool
+    created_at: datetime | None = None
+
+    @classmethod
+    def from_model(cls, u: User) -> "CachedUser":
+        return cls(
+            id=u.id,
+            tg_id=u.tg_id,
+            username=u.username,
+            role=u.role,
+            coins=u.coins or 0,
+            is_admin=bool(u.is_admin),
+            created_at=u.created_at,
+        )
+
+
+class UserCache:
+    """
+    tg_id -> CachedUser с TTL и LRU-вытеснением.
+    Отсутствие пользователя тоже кэшируется (None), но на miss_ttl, чтобы
+    фильтры не ходили в БД за незарегистрированными.
+
+    Кэш свой у каждого процесса и между воркерами не инвалидируется:
+    изменения, сделанные другим воркером, видны здесь через ttl.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = USER_CACHE_SIZE,
+        ttl: float = USER_CACHE_TTL,
+        miss_ttl: float = USER_CACHE_MISS_TTL,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._data: OrderedDict[int, tuple[float, CachedUser | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def lookup(self, tg_id: int) -> tuple[bool, CachedUser | None]:
+        """(найдено, значение); просроченная запись считается промахом."""
+        entry = self._data.get(tg_id)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return False, None
+        self._data.move_to_end(tg_id)
+        self.hits += 1
+        return True, entry[1]
+
+    def set(self, tg_id: int, user: CachedUser | None) -> None:
+        ttl = self.ttl if user is not None else self.miss_ttl
+        self._data[tg_id] = (time.monotonic() + ttl, user)
+        self._data.move_to_end(tg_id)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def put(self, user: User | None) -> None:
+        """Положить свежую версию после commit (роль, админка, coins, username)."""
+        if user is not None:
+            self.set(user.tg_id, CachedUser.from_model(user))
+
+    def invalidate(self, tg_id: int) -> None:
+        self._data.pop(tg_id, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+user_cache = UserCache()
+
+
+def _session_users(session: AsyncSession) -> dict[int, CachedUser | None]:
+    return session.info.setdefault(_SESSION_KEY, {})
+
+
+def remember(session: AsyncSession, u: User) -> None:
+    """
+    Пользователь изменён в session: её следующие чтения видят новую
+    версию, общий кэш — только после commit (rollback её не оставит).
+    """
+    _session_users(session)[u.tg_id] = CachedUser.from_model(u)
+    after_commit(session, lambda: user_cache.put(u))
+
+
+async def get_cached_user(
+    tg_id: int, session: AsyncSession | None = None
+) -> CachedUser | None:
+    """
+    Read-through: из кэша, при промахе — один SELECT. Прочитанное через
+    сессию вызывающего (в ней могут быть незафиксированные изменения)
+    попадает в общий кэш только после её commit, а до того — в саму сессию.
+    """
+    # своя сессия важнее общего кэша: в ней может быть только что
+    # созданный или изменённый пользователь, которого кэш ещё не видел
+    if session is not None and tg_id in _session_users(session):
+        return _session_users(session)[tg_id]
+    found, user = user_cache.lookup(tg_id)
+    if found:
+        return user
+    async with session_scope(session) as s:
+        u = await s.scalar(select(User).where(User.tg_id == tg_id))
+    user = CachedUser.from_model(u) if u else None
+    if session is None:
+        user_cache.set(tg_id, user)
+    else:
+        _session_users(session)[tg_id] = user
+        after_commit(session, lambda: user_cache.set(tg_id, user))
+    return user
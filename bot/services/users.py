@@ -1,15 +1,34 @@
-from typing import Optional
-from sqlalchemy import desc
+from datetime import datetime
+from typing import AsyncIterator, Optional
+from sqlalchemy import desc, func, select
 from ..storage.models import User
-from ..storage.db import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..storage.db import (
+    SessionLocal,
+    AsyncSessionLocal,
+    after_commit,
+    commit,
+    session_scope,
+)
+from .rating import track_user
+from .user_cache import CachedUser, get_cached_user, remember, user_cache
 import logging
 
 log = logging.getLogger(__name__)
 
 
-def get_user(tg_id: int) -> Optional[User]:
-    with SessionLocal() as session:
-        return session.query(User).filter_by(tg_id=tg_id).first()
+def _refresh_caches(s: AsyncSession, u: User, *, ranking: bool = False) -> None:
+    """Свежая версия пользователя в кэш (и в рейтинг) — после фиксации."""
+    remember(s, u)
+    if ranking:
+        after_commit(s, lambda: track_user(u))
+
+
+async def get_user(
+    tg_id: int, session: AsyncSession | None = None
+) -> Optional[CachedUser]:
+    """Снимок пользователя из кэша (user_cache): повторные запросы за апдейт — без БД."""
+    return await get_cached_user(tg_id, session)
 
 
 def get_user_profile(tg_id: int) -> Optional[User]:
@@ -23,33 +42,104 @@ def get_user_badges(tg_id: int) -> Optional[User]:
         return user.badges if user else []
 
 
-def get_user_by_username(username: str, tg_id: int) -> Optional[User]:
+async def get_user_by_username(username: str) -> Optional[User]:
     uname = username.lstrip("@").lower()
-    with SessionLocal() as s:
-        user = s.query(User).filter(tg_id == tg_id).first()
-        return s.query(User).filter(User.username.ilike(uname)).first()
+    async with AsyncSessionLocal() as s:
+        return await s.scalar(select(User).where(User.username.ilike(uname)))
 
 
-def get_all_user_tg_ids() -> list[int]:
-    with SessionLocal() as s:
-        rows = s.query(User.tg_id).all()
-        ids = [r[0] for r in rows if r[0] is not None]
+async def get_all_user_tg_ids() -> list[int]:
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(select(User.tg_id))
+        ids = [tg_id for tg_id in rows if tg_id is not None]
         log.info("[broadcast] loaded %s users", len(ids))
         return ids
 
 
-def get_user_by_tg_id(tg_id: int) -> Optional[User]:
-    with SessionLocal() as s:
-        return s.query(User).filter(User.tg_id == tg_id).first()
+def _recipient_filters(
+    role: str | None = None,
+    is_admin: bool | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    min_coins: int | None = None,
+    max_coins: int | None = None,
+) -> list:
+    conds = [User.tg_id.is_not(None)]
+    if role is not None:
+        conds.append(User.role == role)
+    if is_admin is not None:
+        conds.append(User.is_admin == is_admin)
+    if created_from is not None:
+        conds.append(User.created_at >= created_from)
+    if created_to is not None:
+        conds.append(User.created_at < created_to)
+    if min_coins is not None:
+        conds.append(User.coins >= min_coins)
+    if max_coins is not None:
+        conds.append(User.coins <= max_coins)
+    return conds
+
+
+async def iter_user_tg_id_batches(
+    batch_size: int = 1000, **filters
+) -> AsyncIterator[list[int]]:
+    """
+    tg_id пользователей пачками по batch_size (keyset по users.id).
+    В памяти только текущая пачка; на каждую пачку — короткая сессия,
+    чтобы не держать соединение и транзакцию, пока идёт рассылка.
+    Фильтры — см. _recipient_filters.
+    """
+    conds = _recipient_filters(**filters)
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as s:
+            rows = (
+                await s.execute(
+                    select(User.id, User.tg_id)
+                    .where(User.id > last_id, *conds)
+                    .order_by(User.id)
+                    .limit(batch_size)
+                )
+            ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield [r.tg_id for r in rows]
+
+
+async def iter_user_tg_ids(batch_size: int = 1000, **filters) -> AsyncIterator[int]:
+    async for batch in iter_user_tg_id_batches(batch_size, **filters):
+        for tg_id in batch:
+            yield tg_id
+
+
+async def count_users(**filters) -> int:
+    async with AsyncSessionLocal() as s:
+        return await s.scalar(
+            select(func.count(User.id)).where(*_recipient_filters(**filters))
+        )
 
 
-def get_or_create_user(tg_id: int, username: Optional[str] = None) -> User:
-    with SessionLocal() as s:
-        u = s.query(User).filter(User.tg_id == tg_id).first()
+async def get_user_by_tg_id(tg_id: int) -> Optional[CachedUser]:
+    return await get_cached_user(tg_id)
+
+
+async def get_or_create_user(
+    tg_id: int, username: Optional[str] = None, session: AsyncSession | None = None
+) -> User | CachedUser:
+    _, cached = user_cache.lookup(tg_id)
+    if cached and (
+        not username or (cached.username or "").lower() == username.lstrip("@").lower()
+    ):
+        return cached
+
+    async with session_scope(session) as s:
+        u = await s.scalar(select(User).where(User.tg_id == tg_id))
         if u:
             if username and (u.username or "").lower() != username.lstrip("@").lower():
                 u.username = username.lstrip("@")
-                s.commit()
+                await commit(s)
+            _refresh_caches(s, u, ranking=True)
             return u
         u = User(
             tg_id=tg_id,
@@ -58,55 +148,66 @@ def get_or_create_user(tg_id: int, username: Optional[str] = None) -> User:
             coins=0,
         )
         s.add(u)
-        s.commit()
-        s.refresh(u)
+        await commit(s)
+        await s.refresh(u)
+        _refresh_caches(s, u, ranking=True)
         return u
 
 
-def set_role(tg_id: int, role: str) -> None:
-    with SessionLocal() as session:
-        user = session.query(User).filter_by(tg_id=tg_id).first()
+async def set_role(tg_id: int, role: str) -> None:
+    async with AsyncSessionLocal() as session:
+        user = await session.scalar(select(User).where(User.tg_id == tg_id))
         if user:
             user.role = role
-            session.commit()
+            await session.commit()
+            user_cache.put(user)
 
 
-def set_admin_status(tg_id: int, is_admin: bool):
-    with SessionLocal() as s:
-        user = s.query(User).filter(User.tg_id == tg_id).first()
+async def set_admin_status(
+    tg_id: int, is_admin: bool, session: AsyncSession | None = None
+):
+    async with session_scope(session) as s:
+        user = await s.scalar(select(User).where(User.tg_id == tg_id))
         if user:
             user.is_admin = is_admin
-            s.commit()
+            await commit(s)
+            _refresh_caches(s, user)
         return user
 
 
-def set_user_role(tg_id: int, role: Optional[str]) -> Optional[User]:
+async def set_user_role(
+    tg_id: int, role: Optional[str], session: AsyncSession | None = None
+) -> Optional[User]:
     """role: 'guru' | 'helper' | None (снять роль)"""
     assert role in {"guru", "helper", None}
-    with SessionLocal() as s:
-        u = s.query(User).filter(User.tg_id == tg_id).first()
+    async with session_scope(session) as s:
+        u = await s.scalar(select(User).where(User.tg_id == tg_id))
         if not u:
             return None
         u.role = role
-        s.commit()
-        s.refresh(u)
+        await commit(s)
+        await s.refresh(u)
+        _refresh_caches(s, u)
         return u
 
 
-def get_recent_users(limit: int = 20) -> list[User]:
+async def get_recent_users(limit: int = 20) -> list[User]:
     """
     Вернуть последних N пользователей по дате создания.
     """
-    with SessionLocal() as s:
-        return s.query(User).order_by(desc(User.created_at)).limit(limit).all()
+    async with AsyncSessionLocal() as s:
+        rows = await s.scalars(
+            select(User).order_by(desc(User.created_at)).limit(limit)
+        )
+        return list(rows)
 
 
-def find_user(identifier: str) -> Optional[User]:
+async def find_user(identifier: str) -> Optional[User | CachedUser]:
     """identifier: '@username' или целое tg_id (строкой)"""
     ident = identifier.strip()
     if ident.startswith("@"):
-        return get_user_by_username(ident)
+        return await get_user_by_username(ident)
     if ident.isdigit():
-        return get_user_by_tg_id(int(ident))
+        return await get_user_by_tg_id(int(ident))
     # fallback: пробуем как username без @
-    return get_user_by_username(ident)
+    return await get_user_by_username(ident)
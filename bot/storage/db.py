@@ -1,10 +1,109 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
 
-DB_URL = "sqlite:///bot.db"
+from sqlalchemy import Engine, create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session, SessionTransaction, sessionmaker, DeclarativeBase
 
-engine = create_engine(DB_URL, echo=False)
-SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+from .profiler import install as install_profiler
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB_URL = "sqlite:///bot.db"
+
+# Движки создаются при первой сессии, а не при импорте: импорт моделей/хендлеров
+# (тесты, tools/set_webhook.py) не открывает БД. URL берётся из DB_URL
+# (или DATABASE_URL из README), можно переопределить через configure().
+_db_url: str | None = None
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+
+
+def get_db_url() -> str:
+    return _db_url or os.getenv("DB_URL") or os.getenv("DATABASE_URL") or DEFAULT_DB_URL
+
+
+def _async_url(url: str) -> str:
+    # тот же файл, но через aiosqlite — чтобы запросы не блокировали event loop
+    u = make_url(url)
+    if u.drivername == "sqlite":
+        u = u.set(drivername="sqlite+aiosqlite")
+    return u.render_as_string(hide_password=False)
+
+
+def configure(url: str | None = None) -> None:
+    """Сменить БД (тесты, утилиты). Уже созданные движки забываются."""
+    global _db_url, _engine, _async_engine
+    _db_url = url
+    _engine = _async_engine = None
+    SessionLocal.kw.pop("bind", None)
+    AsyncSessionLocal.kw.pop("bind", None)
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        _engine = create_engine(get_db_url(), echo=False)
+        install_profiler(_engine)
+    return _engine
+
+
+def new_async_engine(url: str | None = None) -> AsyncEngine:
+    """Async-движок со своим пулом; без url — на текущую БД."""
+    url = _async_url(url or get_db_url())
+    is_sqlite = url.startswith("sqlite")
+    engine = create_async_engine(
+        url,
+        echo=False,
+        # ждём освобождения блокировки записи, а не падаем сразу с "database is locked"
+        connect_args={"timeout": 30} if is_sqlite else {},
+    )
+    if is_sqlite:
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+    install_profiler(engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = new_async_engine()
+    return _async_engine
+
+
+def _sqlite_pragmas(dbapi_conn, _record):
+    # WAL: читатели не ждут писателя, параллельные апдейты не выстраиваются в очередь
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.close()
+
+
+class _LazySessionmaker(sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+class _LazyAsyncSessionmaker(async_sessionmaker):
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_async_engine())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(expire_on_commit=False)
+AsyncSessionLocal = _LazyAsyncSessionmaker(expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -17,3 +116,73 @@ def get_session():
         yield session
     finally:
         session.close()
+
+
+def dialect_insert(bind):
+    """insert() с on_conflict_do_* для диалекта движка/соединения (SQLite или Postgres)."""
+    return postgresql.insert if bind.dialect.name == "postgresql" else sqlite.insert
+
+
+async def get_async_session():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# --- Unit of work ----------------------------------------------------------------
+# DbSessionMiddleware открывает одну сессию на апдейт и помечает её UOW_KEY.
+# Сервисы принимают session=None: с сессией апдейта они работают в ней и
+# только flush'ат, без неё — открывают свою короткую сессию, как раньше.
+UOW_KEY = "unit_of_work"
+AFTER_COMMIT_KEY = "after_commit"
+
+
+@asynccontextmanager
+async def session_scope(
+    session: AsyncSession | None = None,
+) -> AsyncIterator[AsyncSession]:
+    if session is not None:
+        yield session
+        return
+    async with AsyncSessionLocal() as s:
+        yield s
+
+
+async def commit(session: AsyncSession) -> None:
+    """В unit of work — flush (commit сделает middleware в конце апдейта), иначе commit."""
+    if session.info.get(UOW_KEY):
+        await session.flush()
+    else:
+        await session.commit()
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """
+    Побочные эффекты, которые можно делать только после фиксации
+    (кэши, рейтинг): в unit of work или в открытой транзакции — откладываем
+    до ближайшего commit (rollback их отбрасывает), иначе сразу.
+    """
+    if session.info.get(UOW_KEY) or session.in_transaction():
+        session.info.setdefault(AFTER_COMMIT_KEY, []).append(callback)
+    else:
+        callback()
+
+
+def run_after_commit(session: AsyncSession | Session) -> None:
+    for callback in session.info.pop(AFTER_COMMIT_KEY, []):
+        try:
+            callback()
+        except Exception:
+            log.exception("[db] after-commit callback failed")
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    # любой commit: конец апдейта, ранний commit перед ответом, короткая сессия
+    run_after_commit(session)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _on_transaction_end(session: Session, transaction: SessionTransaction) -> None:
+    # внешняя транзакция закрылась без commit — откладывать больше нечего
+    if transaction.parent is None:
+        session.info.pop(AFTER_COMMIT_KEY, None)
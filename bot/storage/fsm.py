@@ -0,0 +1,233 @@
+# bot/storage/fsm.py
+"""
+Хранилище FSM, общее для всех процессов бота.
+
+FSM_STORAGE выбирает бэкенд:
+  sql    — таблица fsm_states в основной БД (по умолчанию);
+  redis  — aiogram RedisStorage по REDIS_URL;
+  memory — MemoryStorage, только для локальной отладки.
+
+Состояние живёт FSM_TTL секунд с последней записи (по умолчанию сутки):
+брошенные на полпути сценарии сами исчезают.
+
+SqlStorage копит записи FSM_FLUSH_DELAY секунд (0.05) и пишет пачкой.
+Свои записи процесс видит сразу, а другой воркер — только после flush:
+если апдейты одного пользователя могут попасть на разные воркеры
+(несколько webhook-процессов за балансировщиком), ставьте
+FSM_FLUSH_DELAY=0 — тогда set_state/set_data пишут в БД сразу.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import astuple
+from datetime import datetime, timedelta
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from sqlalchemy import case, delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..config import DEFAULT_REDIS_URL
+from .db import dialect_insert, new_async_engine
+from .models import FsmRecord
+
+log = logging.getLogger(__name__)
+
+DEFAULT_FSM_TTL = 24 * 3600
+# сколько копим записи перед одной пачкой в БД
+FLUSH_DELAY = 0.05
+# пауза перед повтором неудачного flush: удваивается до потолка
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+# как часто чистим протухшие строки (сек)
+PURGE_EVERY = 600
+
+_UNSET = object()
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join("" if v is None else str(v) for v in astuple(key))
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+class SqlStorage(BaseStorage):
+    """
+    FSM в таблице fsm_states.
+
+    Записи не ждут БД: set_state/set_data кладут значение в буфер, и
+    через FLUSH_DELAY все накопленные ключи уходят одним upsert'ом
+    (обычная пара update_data + set_state в хендлере — одна строка).
+    Так хендлер не встаёт в очередь за блокировкой записи, которую
+    держит транзакция апдейта (DbSessionMiddleware). Чтение сначала
+    смотрит в буфер, поэтому процесс всегда видит свои записи; другие
+    процессы — через flush_delay (см. docstring модуля). Неудачный flush
+    возвращает записи в буфер и повторяется с нарастающей паузой.
+    flush_delay=0 — без буфера: запись в БД до возврата из set_*.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncEngine | None = None,
+        ttl: int | None = DEFAULT_FSM_TTL,
+        flush_delay: float = FLUSH_DELAY,
+    ):
+        self._engine = engine
+        self._own_engine = engine is None
+        self.ttl = ttl
+        self.flush_delay = flush_delay
+        # key -> {"state": ..., "data": ...} — только то, что реально менялось
+        self._pending: dict[str, dict[str, Any]] = {}
+        # то, что сейчас пишется в БД: читаем отсюда, пока commit не прошёл
+        self._inflight: dict[str, dict[str, Any]] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._last_purge = 0.0
+
+    @property
+    def engine(self) -> AsyncEngine:
+        if self._engine is None:
+            # свой пул, не общий с сессиями: хендлер держит соединение
+            # DbSessionMiddleware и читает FSM — из одного пула под нагрузкой
+            # все соединения заняты теми, кто ждёт ещё одно
+            self._engine = new_async_engine()
+        return self._engine
+
+    # -- запись --------------------------------------------------------------
+    async def _put(self, key: StorageKey, field: str, value: Any) -> None:
+        self._pending.setdefault(_key(key), {})[field] = value
+        if self.flush_delay:
+            self._schedule_flush()
+            return
+        try:
+            await self.flush()
+        except Exception:
+            # записи вернулись в буфер — дописываем в фоне, хендлеру ошибка
+            self._schedule_flush()
+            raise
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await self._put(key, "state", _state_name(state))
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._put(key, "data", dict(data))
+
+    async def _flush_later(self) -> None:
+        # пока есть что писать: новые записи, пришедшие во время flush,
+        # и возвращённые в буфер после ошибки
+        delay = self.flush_delay
+        while self._pending:
+            await asyncio.sleep(delay)
+            try:
+                await self.flush()
+                delay = self.flush_delay
+            except Exception:
+                delay = min(max(delay * 2, RETRY_DELAY), MAX_RETRY_DELAY)
+                log.exception("[fsm] flush failed, retry in %.1fs", delay)
+
+    def _upsert(self, columns: tuple[str, ...], now: datetime):
+        stmt = dialect_insert(self.engine)(FsmRecord)
+        set_ = {c: stmt.excluded[c] for c in (*columns, "expires_at")}
+        # колонку, которую не пишем, сохраняем — но не из протухшей строки:
+        # иначе set_state после истечения TTL вернул бы старые data
+        expired = FsmRecord.expires_at < now
+        for c in ("state", "data"):
+            if c not in columns:
+                set_[c] = case((expired, None), else_=getattr(FsmRecord, c))
+        return stmt.on_conflict_do_update(index_elements=[FsmRecord.key], set_=set_)
+
+    async def flush(self) -> None:
+        """Записать буфер одной транзакцией: по statement'у на набор колонок."""
+        pending, self._pending = self._pending, {}
+        self._inflight = pending
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.ttl) if self.ttl else None
+
+        groups: dict[tuple[str, ...], list[dict]] = {}
+        for key, fields in pending.items():
+            cols = tuple(sorted(fields))
+            groups.setdefault(cols, []).append(
+                {"key": key, "expires_at": expires, **fields}
+            )
+        try:
+            async with self.engine.begin() as conn:
+                for cols, rows in groups.items():
+                    await conn.execute(self._upsert(cols, now), rows)
+                if self.ttl and now.timestamp() - self._last_purge > PURGE_EVERY:
+                    await conn.execute(
+                        delete(FsmRecord).where(FsmRecord.expires_at < now)
+                    )
+                    self._last_purge = now.timestamp()
+        except BaseException:
+            # не теряем записи (и при отмене тоже): вернём в буфер,
+            # если их не перезаписали новее
+            for key, fields in pending.items():
+                self._pending[key] = {**fields, **self._pending.get(key, {})}
+            raise
+        finally:
+            self._inflight = {}
+
+    # -- чтение --------------------------------------------------------------
+    async def _read(self, key: StorageKey, field: str) -> Any:
+        k = _key(key)
+        for buffer in (self._pending, self._inflight):
+            value = buffer.get(k, {}).get(field, _UNSET)
+            if value is not _UNSET:
+                return value
+        column = getattr(FsmRecord, field)
+        async with self.engine.connect() as conn:
+            return await conn.scalar(
+                select(column).where(
+                    FsmRecord.key == k,
+                    or_(
+                        FsmRecord.expires_at.is_(None),
+                        FsmRecord.expires_at > datetime.utcnow(),
+                    ),
+                )
+            )
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return await self._read(key, "state")
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return dict(await self._read(key, "data") or {})
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            # фоновый flush может ждать повтора: отменяем, записи — в буфере
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._pending:
+            await self.flush()
+        if self._own_engine and self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+
+def build_fsm_storage() -> BaseStorage:
+    kind = os.getenv("FSM_STORAGE", "sql").lower()
+    ttl = int(os.getenv("FSM_TTL", DEFAULT_FSM_TTL)) or None
+    if kind == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(
+            os.getenv("REDIS_URL", DEFAULT_REDIS_URL), state_ttl=ttl, data_ttl=ttl
+        )
+    if kind == "memory":
+        from aiogram.fsm.storage.memory import MemoryStorage
+
+        return MemoryStorage()
+    return SqlStorage(
+        ttl=ttl, flush_delay=float(os.getenv("FSM_FLUSH_DELAY", FLUSH_DELAY))
+    )
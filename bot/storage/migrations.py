@@ -0,0 +1,160 @@
+# bot/storage/migrations.py
+"""
+Версионные миграции схемы вместо create_all при импорте моделей.
+
+Текущая версия лежит в таблице schema_version. Пустая БД создаётся
+целиком по моделям и сразу помечается последней версией; существующая
+БД без schema_version считается версией 1 (схема до миграций) и
+прогоняется по шагам. Новый шаг — функция в MIGRATIONS со следующим номером.
+
+Запуск вручную: python -m bot.storage.migrations
+"""
+
+import logging
+from typing import Callable
+
+from sqlalchemy import Connection, inspect, text
+
+from .db import Base, get_async_engine
+from . import models
+
+log = logging.getLogger(__name__)
+
+
+def _add_broadcast_tables(conn: Connection) -> None:
+    models.BroadcastJob.__table__.create(conn, checkfirst=True)
+    models.BroadcastDelivery.__table__.create(conn, checkfirst=True)
+    cols = {c["name"] for c in inspect(conn).get_columns("broadcast_jobs")}
+    if "filters" not in cols:
+        conn.execute(text("ALTER TABLE broadcast_jobs ADD COLUMN filters JSON"))
+
+
+def _add_hot_path_indexes(conn: Connection) -> None:
+    # NULL в coins ломает индекс для ORDER BY coins — приводим к 0 один раз
+    conn.execute(text("UPDATE users SET coins = 0 WHERE coins IS NULL"))
+    for model in (
+        models.User,
+        models.MentorApplication,
+        models.TaskAssignment,
+        models.Event,
+    ):
+        for index in model.__table__.indexes:
+            index.create(conn, checkfirst=True)
+    conn.execute(text("ANALYZE"))
+
+
+def _add_stats_counters(conn: Connection) -> None:
+    # заполняется rebuild_counters() на старте
+    models.StatCounter.__table__.create(conn, checkfirst=True)
+
+
+def _add_fsm_states(conn: Connection) -> None:
+    models.FsmRecord.__table__.create(conn, checkfirst=True)
+
+
+def _add_sent_reminders(conn: Connection) -> None:
+    models.SentReminder.__table__.create(conn, checkfirst=True)
+
+
+def _add_deadline_notified_at(conn: Connection) -> None:
+    cols = {c["name"] for c in inspect(conn).get_columns("task_assignments")}
+    if "deadline_notified_at" not in cols:
+        conn.execute(
+            text("ALTER TABLE task_assignments ADD COLUMN deadline_notified_at DATETIME")
+        )
+
+
+def _add_coin_ledger(conn: Connection) -> None:
+    models.CoinTransaction.__table__.create(conn, checkfirst=True)
+    # текущие балансы — стартовые записи, чтобы сумма по журналу с ними сошлась
+    conn.execute(
+        text(
+            "INSERT INTO coin_transactions (user_id, amount, reason, created_at) "
+            "SELECT id, coins, 'opening_balance', CURRENT_TIMESTAMP FROM users "
+            "WHERE coins <> 0"
+        )
+    )
+
+
+def _add_outbox(conn: Connection) -> None:
+    models.OutboxMessage.__table__.create(conn, checkfirst=True)
+
+
+def _add_submission_files(conn: Connection) -> None:
+    models.SubmissionFile.__table__.create(conn, checkfirst=True)
+
+
+def _add_broadcast_lease(conn: Connection) -> None:
+    cols = {c["name"] for c in inspect(conn).get_columns("broadcast_jobs")}
+    if "owner" not in cols:
+        conn.execute(text("ALTER TABLE broadcast_jobs ADD COLUMN owner VARCHAR"))
+    if "lease_expires_at" not in cols:
+        conn.execute(
+            text("ALTER TABLE broadcast_jobs ADD COLUMN lease_expires_at DATETIME")
+        )
+
+
+# (версия, описание, шаг) — строго по возрастанию версии
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (2, "broadcast jobs and deliveries", _add_broadcast_tables),
+    (3, "indexes for hot query paths", _add_hot_path_indexes),
+    (4, "stats counters", _add_stats_counters),
+    (5, "fsm states", _add_fsm_states),
+    (6, "sent event reminders", _add_sent_reminders),
+    (7, "deadline warning marker", _add_deadline_notified_at),
+    (8, "coin ledger", _add_coin_ledger),
+    (9, "notification outbox", _add_outbox),
+    (10, "submission files for albums", _add_submission_files),
+    (11, "broadcast job leases", _add_broadcast_lease),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+def get_version(conn: Connection) -> int | None:
+    if not inspect(conn).has_table("schema_version"):
+        return None
+    return conn.execute(text("SELECT version FROM schema_version")).scalar()
+
+
+def _set_version(conn: Connection, version: int) -> None:
+    conn.execute(text("DELETE FROM schema_version"))
+    conn.execute(
+        text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": version}
+    )
+
+
+def upgrade(conn: Connection, target: int = LATEST) -> int:
+    """Доводит схему до target, возвращает итоговую версию."""
+    conn.execute(
+        text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    )
+    current = get_version(conn)
+    if current is None:
+        if not inspect(conn).has_table("users"):
+            # чистая БД — создаём всё по моделям, шаги не нужны
+            Base.metadata.create_all(conn)
+            _set_version(conn, LATEST)
+            log.info("[migrations] created schema v%s", LATEST)
+            return LATEST
+        current = 1
+
+    for version, title, step in MIGRATIONS:
+        if current < version <= target:
+            log.info("[migrations] v%s: %s", version, title)
+            step(conn)
+            _set_version(conn, version)
+            current = version
+    return current
+
+
+async def migrate() -> int:
+    """Вызывается на старте бота/вебхука до обработки апдейтов."""
+    async with get_async_engine().begin() as conn:
+        return await conn.run_sync(upgrade)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    logging.basicConfig(level=logging.INFO)
+    print("schema version:", asyncio.run(migrate()))
@@ -9,9 +9,13 @@ from sqlalchemy import (
     ForeignKey,
     Enum,
     Boolean,
+    UniqueConstraint,
+    JSON,
+    Index,
 )
-from sqlalchemy.orm import relationship
-from .db import Base, engine
+from sqlalchemy import event, inspect, update
+from sqlalchemy.orm import Session, relationship
+from .db import Base
 import enum
 
 
@@ -29,6 +33,11 @@ class User(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # рейтинг: ORDER BY coins DESC, id и COUNT(*) WHERE coins > x
+        Index("ix_users_coins_id", coins.desc(), id),
+    )
+
 
 # --- Mentors ------------------------------------------------------------------
 
@@ -58,6 +67,11 @@ class MentorApplication(Base):
     user = relationship("User", foreign_keys=[user_id])
     mentor = relationship("User", foreign_keys=[mentor_id])
 
+    __table_args__ = (
+        # входящие заявки ментора / проверка дубля pending-заявки
+        Index("ix_mentor_applications_mentor_status", mentor_id, status),
+    )
+
 
 # --- Tasks -------------------------------------------------------------------
 class Task(Base):
@@ -86,7 +100,9 @@ class TaskAssignment(Base):
     submitted_at = Column(DateTime, nullable=True)
     status = Column(
         String, default="in_progress"
-    )  # "in_progress" | "submitted" | "approved" | "rejected"
+    )  # "in_progress" | "submitted" | "approved" | "rejected" | "expired"
+    # когда отправили предупреждение о близком дедлайне (services/deadlines.py)
+    deadline_notified_at = Column(DateTime, nullable=True)
 
     submission_text = Column(Text, nullable=True)  # ссылка/описание
     submission_file_id = Column(String, nullable=True)  # file_id фото/видео/док
@@ -94,6 +110,59 @@ class TaskAssignment(Base):
     task = relationship("Task")
     user = relationship("User")
 
+    __table_args__ = (
+        # «мои задания» по группе статусов, активные — по дедлайну
+        Index("ix_task_assignments_user_status_due", user_id, status, due_at),
+        # очередь модерации: status = 'submitted' ORDER BY submitted_at DESC
+        Index("ix_task_assignments_status_submitted", status, submitted_at),
+        # просроченные: status = 'in_progress' AND due_at < now
+        Index("ix_task_assignments_status_due", status, due_at),
+        Index("ix_task_assignments_task_id", task_id),
+    )
+
+
+class SubmissionFile(Base):
+    """
+    Файлы сдачи по порядку. Альбом — несколько строк одной транзакцией,
+    одиночное фото — одна; первый файл дублируется в submission_file_id.
+    """
+
+    __tablename__ = "submission_files"
+
+    id = Column(Integer, primary_key=True)
+    assignment_id = Column(Integer, ForeignKey("task_assignments.id"), nullable=False)
+    position = Column(Integer, nullable=False)
+    file_id = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_submission_files_assignment_position", assignment_id, position),
+    )
+
+
+# -- Coin ledger ----------------------------------------------------------------
+class CoinTransaction(Base):
+    """
+    Каждое изменение coins — строка здесь, users.coins — готовая сумма по ней
+    (пишутся в одной транзакции, см. services/coins.py). Баланс читается из
+    users.coins, пересборка — rebuild_balances().
+    """
+
+    __tablename__ = "coin_transactions"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    # "task_approved" | "opening_balance" | ...
+    reason = Column(String, nullable=False)
+    assignment_id = Column(Integer, ForeignKey("task_assignments.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # одна награда на назначение — повторный апрув упрётся в ключ
+        UniqueConstraint("assignment_id", "reason", name="uq_coin_tx_assignment"),
+        Index("ix_coin_transactions_user_id", user_id, id),
+    )
+
 
 # -- Calendar -------------------------------------------------------------------
 class Event(Base):
@@ -108,9 +177,187 @@ class Event(Base):
 
     user = relationship("User", back_populates="events")
 
+    __table_args__ = (
+        # ближайшие события всех / конкретного пользователя
+        Index("ix_events_event_date", event_date),
+        Index("ix_events_user_date", user_id, event_date),
+    )
+
 
 User.events = relationship("Event", back_populates="user", lazy="dynamic")
 
 
-# Создаём таблицы ПОСЛЕ объявления всех моделей
-Base.metadata.create_all(bind=engine)
+class SentReminder(Base):
+    """Отправленное напоминание: (событие, за сколько) — не больше одного раза."""
+
+    __tablename__ = "sent_reminders"
+
+    event_id = Column(
+        Integer, ForeignKey("events.id", ondelete="CASCADE"), primary_key=True
+    )
+    kind = Column(String, primary_key=True)  # "1d" | "1h"
+    sent_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+# -- Broadcasts ------------------------------------------------------------------
+class BroadcastJob(Base):
+    __tablename__ = "broadcast_jobs"
+
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    status = Column(
+        String, default="pending", nullable=False
+    )  # "pending" | "running" | "done"
+    created_by = Column(Integer, nullable=True)  # tg_id админа
+    # фильтры аудитории для iter_user_tg_id_batches: role, is_admin, coins...
+    filters = Column(JSON, nullable=True)
+    # куда писать прогресс (сообщение в чате админа)
+    progress_chat_id = Column(Integer, nullable=True)
+    progress_message_id = Column(Integer, nullable=True)
+    total = Column(Integer, default=0, nullable=False)
+    sent = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    # какой воркер ведёт рассылку и до какого момента (продлевается, пока идёт)
+    owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class BroadcastDelivery(Base):
+    """Статус доставки рассылки конкретному получателю — по нему продолжаем после рестарта."""
+
+    __tablename__ = "broadcast_deliveries"
+    __table_args__ = (UniqueConstraint("job_id", "tg_id"),)
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("broadcast_jobs.id"), nullable=False)
+    tg_id = Column(Integer, nullable=False)
+    # "sending" — занят до отправки (после сбоя так и остаётся: повторно не шлём)
+    status = Column(String, nullable=False)  # "sending" | "sent" | "failed"
+    attempts = Column(Integer, default=1, nullable=False)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# -- Stats counters --------------------------------------------------------------
+class StatCounter(Base):
+    """
+    Готовые счётчики для экрана статистики: users, admins, tasks,
+    tasks_published, assignments:<status>. Меняются в той же транзакции,
+    что и сами строки (см. _count_changes), пересобираются на старте.
+    """
+
+    __tablename__ = "stats_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, default=0, nullable=False)
+
+
+# -- Outbox ----------------------------------------------------------------------
+class OutboxMessage(Base):
+    """
+    Сообщение пользователю, записанное в той же транзакции, что и изменение,
+    о котором оно сообщает. Отправляет services/outbox.py; доставленные
+    строки удаляются, неотправляемые остаются со status="failed".
+    """
+
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    chat_id = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending | failed
+    attempts = Column(Integer, default=0, nullable=False)
+    # раньше не брать: бэкофф после ошибки или аренда на время отправки
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_outbox_status_available", status, available_at),)
+
+
+# -- FSM -------------------------------------------------------------------------
+class FsmRecord(Base):
+    """Состояние и данные FSM одного ключа aiogram (см. storage/fsm.py)."""
+
+    __tablename__ = "fsm_states"
+
+    key = Column(String, primary_key=True)
+    state = Column(String, nullable=True)
+    data = Column(JSON, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+
+
+# старое значение нужно даже если атрибут успел протухнуть после commit —
+# active_history заставляет ORM дочитать его перед присваиванием
+def _load_old_value(target, value, oldvalue, initiator):
+    pass
+
+
+for _attr in (User.is_admin, Task.is_published, TaskAssignment.status):
+    event.listen(_attr, "set", _load_old_value, active_history=True)
+
+
+def _status_change(obj, attr: str):
+    hist = inspect(obj).attrs[attr].history
+    if not hist.has_changes():
+        return None
+    old = hist.deleted[0] if hist.deleted else None
+    new = hist.added[0] if hist.added else None
+    return old, new
+
+
+@event.listens_for(Session, "after_flush")
+def _count_changes(session, _flush_context):
+    deltas: dict[str, int] = {}
+
+    def bump(name: str, d: int):
+        deltas[name] = deltas.get(name, 0) + d
+
+    for objs, sign in ((session.new, 1), (session.deleted, -1)):
+        for obj in objs:
+            if isinstance(obj, User):
+                bump("users", sign)
+                if obj.is_admin:
+                    bump("admins", sign)
+            elif isinstance(obj, Task):
+                bump("tasks", sign)
+                if obj.is_published:
+                    bump("tasks_published", sign)
+            elif isinstance(obj, TaskAssignment):
+                bump(f"assignments:{obj.status}", sign)
+
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            ch = _status_change(obj, "is_admin")
+            if ch and bool(ch[0]) != bool(ch[1]):
+                bump("admins", 1 if ch[1] else -1)
+        elif isinstance(obj, Task):
+            ch = _status_change(obj, "is_published")
+            if ch and bool(ch[0]) != bool(ch[1]):
+                bump("tasks_published", 1 if ch[1] else -1)
+        elif isinstance(obj, TaskAssignment):
+            ch = _status_change(obj, "status")
+            if ch and ch[0] != ch[1]:
+                bump(f"assignments:{ch[0]}", -1)
+                bump(f"assignments:{ch[1]}", 1)
+
+    deltas = {k: v for k, v in deltas.items() if v}
+    if deltas:
+        apply_counter_deltas(session.connection(), deltas)
+
+
+def apply_counter_deltas(conn, deltas: dict[str, int]) -> None:
+    """
+    UPDATE без вставки: пока счётчики не собраны (rebuild_counters),
+    строк нет и обновлять нечего. Новый статус без строки тоже пропускается —
+    его подберёт следующая пересборка.
+    Массовые UPDATE в обход ORM должны звать эту функцию сами.
+    """
+    for name, d in deltas.items():
+        conn.execute(
+            update(StatCounter)
+            .where(StatCounter.name == name)
+            .values(value=StatCounter.value + d)
+        )
@@ -0,0 +1,120 @@
+# bot/storage/profiler.py
+"""
+Счётчик SQL на апдейт/хендлер и детектор N+1.
+
+install(engine) вешает before/after_cursor_execute на движок (db.py делает
+это для всех своих движков). Пока внутри profile(...) — запросы текущей
+корутины попадают в её QueryStats через contextvars: число, суммарное время
+и «отпечатки» — SQL без литералов и с IN (?, ?, ...) → IN (?), так что
+одинаковые запросы в цикле складываются в один отпечаток. Вне profile()
+слушатель сразу выходит.
+
+На выходе из profile(): больше budget запросов — warning с самыми частыми
+отпечатками; один отпечаток N_PLUS_ONE раз и больше — warning про N+1.
+strict=True вместо warning бросает QueryBudgetExceeded — для тестов:
+
+    with profile("take_task", budget=4, strict=True) as stats:
+        await take_task(...)
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+# одинаковый запрос столько раз за хендлер — почти наверняка цикл
+N_PLUS_ONE = 5
+
+_current: ContextVar["QueryStats | None"] = ContextVar("sql_profile", default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    s = _LITERALS.sub("?", statement)
+    s = _IN_LIST.sub("(?)", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass(slots=True)
+class QueryStats:
+    label: str
+    count: int = 0
+    seconds: float = 0.0
+    fingerprints: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int = 2) -> list[tuple[str, int]]:
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+    def describe(self, limit: int = 3) -> str:
+        top = "; ".join(
+            f"{n}x {fp[:120]}" for fp, n in self.fingerprints.most_common(limit)
+        )
+        return f"{self.count} queries, {self.seconds * 1000:.1f} ms: {top}"
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._profile_t0 = time.perf_counter()
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = getattr(context, "_profile_t0", None)
+    if started is not None:
+        stats.seconds += time.perf_counter() - started
+    stats.count += 1
+    stats.fingerprints[fingerprint(statement)] += 1
+
+
+def install(engine) -> None:
+    """Подключить счётчик к движку (sync или async); повторный вызов — no-op."""
+    target = getattr(engine, "sync_engine", engine)
+    if not event.contains(target, "before_cursor_execute", _before):
+        event.listen(target, "before_cursor_execute", _before)
+        event.listen(target, "after_cursor_execute", _after)
+
+
+def current() -> QueryStats | None:
+    return _current.get()
+
+
+@contextmanager
+def profile(
+    label: str, budget: int | None = None, *, strict: bool = False
+) -> Iterator[QueryStats]:
+    stats = QueryStats(label)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+    if budget is not None and stats.count > budget:
+        msg = f"[sql] {label}: over budget {budget}: {stats.describe()}"
+        if strict:
+            raise QueryBudgetExceeded(msg)
+        log.warning(msg)
+    suspects = stats.repeated(N_PLUS_ONE)
+    if suspects:
+        fp, n = suspects[0]
+        msg = f"[sql] {label}: possible N+1, {n}x {fp[:200]}"
+        if strict:
+            raise QueryBudgetExceeded(msg)
+        log.warning(msg)
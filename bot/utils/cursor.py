@@ -0,0 +1,42 @@
+"""
+Курсоры keyset-пагинации для callback_data.
+
+Курсор — ключ последней показанной строки: (момент, id). В callback_data
+он уходит коротким base36: «<микросекунды>.<id>», вместо пустого момента — «~».
+Например «lr2yh0c9xs.2n9c» — 15 символов, callback укладывается в 64 байта.
+Строка без точки (в т.ч. старые номера страниц) означает «с начала».
+"""
+
+from datetime import datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+Cursor = tuple[datetime | None, int]
+
+
+def _b36(n: int) -> str:
+    out = ""
+    while True:
+        n, r = divmod(n, 36)
+        out = _DIGITS[r] + out
+        if not n:
+            return out
+
+
+def encode_cursor(at: datetime | None, row_id: int) -> str:
+    stamp = "~" if at is None else _b36((at - _EPOCH) // _US)
+    return f"{stamp}.{_b36(row_id)}"
+
+
+def decode_cursor(raw: str | None) -> Cursor | None:
+    """None — первая страница; испорченный курсор тоже ведёт в начало."""
+    if not raw or "." not in raw:
+        return None
+    stamp, _, row_id = raw.partition(".")
+    try:
+        at = None if stamp == "~" else _EPOCH + int(stamp, 36) * _US
+        return at, int(row_id, 36)
+    except (ValueError, OverflowError):
+        return None
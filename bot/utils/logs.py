@@ -0,0 +1,182 @@
+"""
+Логирование, которое не пишет в stderr из event loop.
+
+setup_logging() ставит на root один QueueHandler: log.* в хендлере только
+собирает текст сообщения и кладёт запись в очередь, а JSON-форматирование
+и запись в поток делает QueueListener в своём потоке.
+
+Env:
+  LOG_LEVEL          — уровень root (INFO);
+  LOG_LEVELS         — по логгерам, поверх DEFAULT_LEVELS:
+                       "sqlalchemy.engine=INFO,aiogram.event=DEBUG";
+  LOG_FORMAT         — json (по умолчанию) | text;
+  LOG_SAMPLE         — сколько записей одного шаблона пропускать за окно
+                       (20, 0 — без ограничения); ERROR и выше — всегда;
+  LOG_SAMPLE_WINDOW  — окно, сек (60);
+  LOG_SAMPLE_LOGGERS — чьи записи ограничивать, префиксы через запятую
+                       (SAMPLE_LOGGERS; * — все).
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+DEFAULT_LEVELS = {
+    # по строке на апдейт — при нагрузке это и есть основной поток логов
+    "aiogram.event": logging.WARNING,
+    "aiosqlite": logging.WARNING,
+    "sqlalchemy.engine": logging.WARNING,
+}
+SAMPLE_LIMIT = 20
+SAMPLE_WINDOW = 60.0
+# шумные источники: по записи на получателя рассылки / на апдейт
+SAMPLE_LOGGERS = ("bot.services.broadcast", "aiogram")
+# защита от шаблонов-f-строк: каждый уникален, таблица росла бы без конца
+MAX_TEMPLATES = 10_000
+
+# атрибуты самой LogRecord — всё остальное пришло через extra=
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Не больше limit записей одного шаблона (логгер + msg до подстановки
+    аргументов) за window секунд. Первая запись после окна несёт
+    suppressed=N — сколько похожих отброшено. ERROR и выше не режутся,
+    логгеры вне prefixes (None — все) тоже.
+    """
+
+    def __init__(
+        self,
+        limit: int = SAMPLE_LIMIT,
+        window: float = SAMPLE_WINDOW,
+        prefixes: tuple[str, ...] | None = SAMPLE_LOGGERS,
+    ):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.prefixes = prefixes
+        # (логгер, шаблон) -> [начало окна, пропущено, отброшено]
+        self._seen: dict[tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        if self.prefixes is not None and not any(
+            record.name == p or record.name.startswith(p + ".") for p in self.prefixes
+        ):
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                if len(self._seen) >= MAX_TEMPLATES:
+                    self._seen.clear()
+                self._seen[key] = [now, 1, 0]
+                if entry and entry[2]:
+                    record.suppressed = entry[2]
+                return True
+            if entry[1] < self.limit:
+                entry[1] += 1
+                return True
+            entry[2] += 1
+            return False
+
+
+class _LoopQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # текст собираем здесь: аргументами могут быть ORM-объекты, трогать
+        # их из потока listener'а нельзя. Остальное форматирование — там.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def parse_levels(spec: str) -> dict[str, int]:
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.partition("=")
+        if sep and name.strip():
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def setup_logging(stream=None) -> QueueListener:
+    """Один раз на процесс; повторный вызов возвращает работающий listener."""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    out = logging.StreamHandler(stream or sys.stderr)
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        out.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+        )
+    else:
+        out.setFormatter(JsonFormatter())
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _LoopQueueHandler(q)
+    limit = int(os.getenv("LOG_SAMPLE", SAMPLE_LIMIT))
+    if limit:
+        spec = os.getenv("LOG_SAMPLE_LOGGERS")
+        if spec is None:
+            prefixes = SAMPLE_LOGGERS
+        elif spec.strip() == "*":
+            prefixes = None
+        else:
+            prefixes = tuple(p.strip() for p in spec.split(",") if p.strip())
+        window = float(os.getenv("LOG_SAMPLE_WINDOW", SAMPLE_WINDOW))
+        handler.addFilter(RateLimitFilter(limit, window, prefixes))
+
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    levels = {**DEFAULT_LEVELS, **parse_levels(os.getenv("LOG_LEVELS", ""))}
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(q, out, respect_handler_level=True)
+    _listener.start()
+    # дописать очередь при выходе
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
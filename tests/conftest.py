@@ -1,8 +1,37 @@
 from types import SimpleNamespace
 import pytest
+import pytest_asyncio
 from unittest.mock import AsyncMock
 
 
+@pytest.fixture(scope="session", autouse=True)
+def _schema(tmp_path_factory):
+    # часть тестов ходит в «настоящую» БД — временный файл со схемой из миграций
+    from bot.storage import db
+    from bot.storage.migrations import upgrade
+
+    db.configure(f"sqlite:///{tmp_path_factory.mktemp('db') / 'bot.db'}")
+    with db.get_engine().begin() as conn:
+        upgrade(conn)
+    yield
+    db.configure(None)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    # кэши глобальные — тесты не должны видеть чужие записи
+    from bot.services.catalog_cache import catalog_cache
+    from bot.services.rating import ranking
+    from bot.services.user_cache import user_cache
+
+    user_cache.clear()
+    catalog_cache.invalidate()
+    yield
+    user_cache.clear()
+    catalog_cache.invalidate()
+    ranking.clear()
+
+
 class FakeUser(SimpleNamespace):
     pass
 
@@ -44,3 +73,38 @@ def state():
         update_data=AsyncMock(),
         get_data=AsyncMock(return_value={}),
     )
+
+
+@pytest_asyncio.fixture
+async def async_db():
+    """
+    Чистая in-memory SQLite на тест: возвращает async_sessionmaker,
+    который тест подставляет вместо AsyncSessionLocal в нужном модуле.
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    from bot.storage.db import Base
+    import bot.storage.models  # noqa: F401 — регистрируем модели в Base.metadata
+
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+def query_budget(async_db):
+    """
+    with query_budget(n): ... — больше n запросов к async_db или
+    повторяющийся в цикле запрос (N+1) роняют тест.
+    """
+    from bot.storage.profiler import install, profile
+
+    install(async_db.kw["bind"])
+    return lambda n, label="test": profile(label, n, strict=True)
@@ -12,7 +12,7 @@ async def test_broadcast_send_ok(mocker):
     cb.from_user = SimpleNamespace(id=111, username="tester")
 
     # сообщение, к которому "прикреплён" callback
-    cb.message = SimpleNamespace()
+    cb.message = SimpleNamespace(chat=SimpleNamespace(id=222), message_id=333)
     cb.message.edit_text = AsyncMock()
     cb.message.answer = AsyncMock()
 
@@ -23,11 +23,12 @@ async def test_broadcast_send_ok(mocker):
     # cb.answer()
     cb.answer = AsyncMock()
 
-    # патчим выборку пользователей (в модуле хендлера!)
-    mocker.patch(
-        "bot.handlers.admin.broadcast.get_all_user_tg_ids",
-        return_value=[1, 2, 3],
+    # рассылка уходит в фон — хендлер только создаёт задачу (патчим в модуле хендлера!)
+    create = mocker.patch(
+        "bot.handlers.admin.broadcast.create_broadcast",
+        return_value=7,
     )
+    start = mocker.patch("bot.handlers.admin.broadcast.start_broadcast")
 
     # state
     state = SimpleNamespace()
@@ -37,5 +38,13 @@ async def test_broadcast_send_ok(mocker):
     # ВАЖНО: вызываем с cb, а не msg
     await broadcast_send(cb, state, cb.bot)
 
-    assert cb.bot.send_message.await_count == 3
+    create.assert_awaited_once_with(
+        "Привет всем!",
+        created_by=111,
+        progress_chat_id=222,
+        progress_message_id=333,
+    )
+    start.assert_called_once_with(cb.bot, 7)
+    # сам хендлер ничего не рассылает
+    cb.bot.send_message.assert_not_awaited()
     state.clear.assert_awaited_once()
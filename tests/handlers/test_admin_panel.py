@@ -15,3 +15,25 @@ async def test_admin_entry_shows_panel(msg, mocker):
     args, kwargs = msg.answer.call_args
     assert "Админ-панель" in args[0]
     assert kwargs["reply_markup"] == "KB"
+
+
+@pytest.mark.asyncio
+async def test_bulk_review_decides_shown_page(cb, state, mocker):
+    from bot.handlers.admin import panel
+    from bot.services.tasks import BulkReview, Reviewed
+
+    cb.data = "admin:bulk:approve"
+    state.get_data.return_value = {"bulk_page": [1, 2, 3]}
+    result = BulkReview(
+        items=[Reviewed(1, 101, "Пост", 5), Reviewed(2, 101, "Митап", 20)],
+        balances={101: (0, 25)},
+    )
+    bulk = mocker.patch.object(panel, "bulk_review", return_value=result)
+    show = mocker.patch.object(panel, "_show_pending")
+
+    await panel.admin_bulk_review(cb, state)
+
+    # решаем ровно показанную страницу; третью уже закрыл кто-то другой
+    bulk.assert_awaited_once_with(True, assignment_ids=[1, 2, 3], session=None)
+    assert "2 из 3" in cb.answer.call_args.args[0]
+    show.assert_awaited_once()
@@ -0,0 +1,23 @@
+import pytest
+
+from bot.app_factory import build_dispatcher
+from bot.middlewares.db import CommitBeforeSendMiddleware
+from bot.routers import root_router
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    monkeypatch.setenv("FSM_STORAGE", "memory")
+    bot, dp = build_dispatcher("42:TEST")
+    yield bot, dp
+    # root_router — модульный синглтон, отцепляем для следующих сборок
+    dp.sub_routers.remove(root_router)
+    root_router._parent_router = None
+
+
+def test_factory_includes_every_router(dispatcher):
+    bot, dp = dispatcher
+    names = {r.name for r in dp.chain_tail}
+    assert {r.name for r in root_router.sub_routers} <= names
+    assert {"admin_tasks", "mentorship"} <= names
+    assert any(isinstance(m, CommitBeforeSendMiddleware) for m in bot.session.middleware)
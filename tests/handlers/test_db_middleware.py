@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import func, select
+
+from bot.middlewares.db import DbSessionMiddleware
+from bot.services.user_cache import user_cache
+from bot.services.users import get_or_create_user, set_admin_status
+from bot.storage.models import User
+
+
+@pytest.mark.asyncio
+async def test_one_transaction_and_cache_after_commit(async_db, mocker):
+    mocker.patch("bot.middlewares.db.AsyncSessionLocal", async_db)
+    seen = {}
+
+    async def handler(event, data):
+        s = data["session"]
+        await get_or_create_user(555, "neo", session=s)
+        await set_admin_status(555, True, session=s)
+        # изменения уже во flush, но кэш трогаем только после commit
+        seen["cached_before_commit"] = user_cache.lookup(555)[0]
+        return "ok"
+
+    assert await DbSessionMiddleware()(handler, object(), {}) == "ok"
+
+    assert seen["cached_before_commit"] is False
+    found, cached = user_cache.lookup(555)
+    assert found and cached.is_admin
+    async with async_db() as s:
+        assert (await s.scalar(select(User).where(User.tg_id == 555))).is_admin
+
+
+@pytest.mark.asyncio
+async def test_rollback_on_error(async_db, mocker):
+    mocker.patch("bot.middlewares.db.AsyncSessionLocal", async_db)
+
+    async def handler(event, data):
+        await get_or_create_user(777, session=data["session"])
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await DbSessionMiddleware()(handler, object(), {})
+
+    async with async_db() as s:
+        assert await s.scalar(select(func.count(User.id))) == 0
+    assert user_cache.lookup(777) == (False, None)
+
+
+@pytest.mark.asyncio
+async def test_commit_before_bot_api_call(async_db, mocker):
+    from bot.middlewares.db import CommitBeforeSendMiddleware
+
+    mocker.patch("bot.middlewares.db.AsyncSessionLocal", async_db)
+    seen = {}
+
+    async def make_request(bot, method):
+        seen["in_transaction"] = session.in_transaction()
+        seen["cached"] = user_cache.lookup(42)[0]
+        return True
+
+    async def handler(event, data):
+        nonlocal session
+        session = data["session"]
+        await get_or_create_user(42, session=session)
+        await set_admin_status(42, True, session=session)
+        await CommitBeforeSendMiddleware()(make_request, None, "answerCallbackQuery")
+        raise RuntimeError("after reply")
+
+    session = None
+    with pytest.raises(RuntimeError):
+        await DbSessionMiddleware()(handler, object(), {})
+
+    # ответ ушёл после commit: кэш уже обновлён, а rollback ошибки
+    # после ответа записанное не откатывает
+    assert seen == {"in_transaction": False, "cached": True}
+    async with async_db() as s:
+        assert (await s.scalar(select(User).where(User.tg_id == 42))).is_admin
+
+
+@pytest.mark.asyncio
+async def test_commit_before_send_ignores_other_tasks(async_db, mocker):
+    import asyncio
+
+    from bot.middlewares.db import CommitBeforeSendMiddleware
+
+    mocker.patch("bot.middlewares.db.AsyncSessionLocal", async_db)
+    make_request = mocker.AsyncMock(return_value=True)
+
+    async def handler(event, data):
+        await get_or_create_user(43, session=data["session"])
+        # фоновая задача наследует контекст, но сессию апдейта не коммитит
+        await asyncio.create_task(
+            CommitBeforeSendMiddleware()(make_request, None, "sendMessage")
+        )
+        assert data["session"].in_transaction()
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await DbSessionMiddleware()(handler, object(), {})
+
+    make_request.assert_awaited_once()
+    async with async_db() as s:
+        assert await s.scalar(select(func.count(User.id))) == 0
@@ -0,0 +1,38 @@
+import pytest
+
+from bot.storage.models import User
+
+
+@pytest.mark.asyncio
+async def test_profile_callback_renders_card(cb, async_db, mocker):
+    from bot.handlers.profile import open_profile_cb
+
+    mocker.patch("bot.services.rating.AsyncSessionLocal", async_db)
+    async with async_db() as s:
+        s.add_all(
+            [
+                User(tg_id=111, username="tester", role="user", coins=30),
+                User(tg_id=222, username="leader", role="user", coins=90),
+            ]
+        )
+        await s.commit()
+
+    cb.data = "menu:open:profile"
+    async with async_db() as s:
+        await open_profile_cb(cb, session=s)
+
+    text = cb.message.edit_text.call_args.args[0]
+    assert "@tester" in text
+    assert "<b>30</b>" in text
+    assert "2 место" in text
+    cb.answer.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_profile_command_for_unknown_user(msg, async_db):
+    from bot.handlers.profile import open_profile
+
+    async with async_db() as s:
+        await open_profile(msg, session=s)
+
+    assert "/start" in msg.answer.call_args.args[0]
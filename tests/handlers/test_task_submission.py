@@ -35,4 +35,60 @@ async def test_submit_start_ok_sets_state(cb, state, mocker):
 
     state.update_data.assert_awaited()  # сохраняем assignment/task_id
     state.set_state.assert_awaited_once_with(TaskSubmit.waiting_proof)
-    cb.message.edit_text.assert_awaited()  # просим прислать текст/ссылку
\ No newline at end of file
+    cb.message.edit_text.assert_awaited()  # просим прислать текст/ссылку
+
+
+@pytest.mark.asyncio
+async def test_album_reaches_handler_once():
+    import asyncio
+    from types import SimpleNamespace
+
+    from bot.middlewares.album import AlbumMiddleware
+
+    mw = AlbumMiddleware(latency=0.05)
+    handler = AsyncMock(return_value="done")
+    chat = SimpleNamespace(id=222)
+    parts = [
+        SimpleNamespace(message_id=mid, media_group_id="g1", chat=chat)
+        for mid in (12, 10, 11)
+    ]
+    single = SimpleNamespace(message_id=13, media_group_id=None, chat=chat)
+
+    results = await asyncio.gather(
+        *(mw(handler, m, {}) for m in parts), mw(handler, single, {})
+    )
+
+    assert results == ["done", None, None, "done"]
+    assert handler.await_count == 2
+    # одиночное сообщение не ждёт альбом и обрабатывается первым
+    assert "album" not in handler.await_args_list[0].args[1]
+    album = handler.await_args_list[1].args[1]["album"]
+    assert [m.message_id for m in album] == [10, 11, 12]
+
+
+@pytest.mark.asyncio
+async def test_submit_album_one_write_one_reply(msg, state, mocker):
+    from types import SimpleNamespace
+
+    from bot.handlers.task import submission
+
+    submit = mocker.patch.object(submission, "submit_task", return_value=True)
+    mocker.patch.object(submission, "has_active_assignment", return_value=True)
+    state.get_data.return_value = {"task_id": 5}
+
+    def photo(mid, caption=None):
+        sizes = [
+            SimpleNamespace(file_id=f"s{mid}", file_size=10),
+            SimpleNamespace(file_id=f"L{mid}", file_size=99),
+        ]
+        return SimpleNamespace(message_id=mid, photo=sizes, caption=caption)
+
+    album = [photo(1, caption="пост и сторис"), photo(2), photo(3)]
+    await submission.submit_photo(msg, state, album=album)
+
+    submit.assert_awaited_once()
+    kwargs = submit.await_args.kwargs
+    assert kwargs["file_ids"] == ["L1", "L2", "L3"]
+    assert kwargs["text"] == "пост и сторис"
+    msg.answer.assert_awaited_once()
+    assert "3" in msg.answer.await_args.args[0]
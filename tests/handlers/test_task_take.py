@@ -52,4 +52,32 @@ async def test_take_task_when_has_active_assignment(cb, mocker):
     await take_task_cb(cb)
 
     take.assert_not_called()
-    cb.answer.assert_awaited()  # alert “у тебя уже есть активное”
\ No newline at end of file
+    cb.answer.assert_awaited()  # alert “у тебя уже есть активное”
+
+
+@pytest.mark.asyncio
+async def test_take_task_query_budget(cb, async_db, query_budget, mocker):
+    from bot.handlers.task.catalog import take_task_cb
+    from bot.storage.db import UOW_KEY
+    from bot.storage.models import Task, User
+
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    async with async_db() as s:
+        s.add_all(
+            [
+                User(id=1, tg_id=111),
+                Task(id=2, title="T", difficulty="easy", reward_coins=3, deadline_days=2),
+            ]
+        )
+        await s.commit()
+
+    cb.data = "tasks:take:2"
+    async with async_db() as session:
+        session.info[UOW_KEY] = True  # как в DbSessionMiddleware
+        # пользователь (кэш холодный), наличие назначения в хендлере и в
+        # take_task, задание, INSERT, счётчик, задание для карточки
+        with query_budget(7) as sql:
+            await take_task_cb(cb, session=session)
+        await session.commit()
+    assert sql.count > 0
+    cb.answer.assert_awaited_with("Задание добавлено в твои активные ✅")
@@ -0,0 +1,78 @@
+from datetime import datetime
+
+import pytest
+
+from bot.services import admin_stats as svc
+from bot.storage.models import Task, TaskAssignment, User
+
+
+@pytest.fixture
+def db(async_db, mocker):
+    mocker.patch("bot.services.admin_stats.AsyncSessionLocal", async_db)
+    return async_db
+
+
+async def seed(db):
+    async with db() as s:
+        u1, u2 = User(tg_id=1, is_admin=True), User(tg_id=2)
+        t1 = Task(title="a", difficulty="easy", reward_coins=1)
+        t2 = Task(title="b", difficulty="easy", reward_coins=1, is_published=False)
+        s.add_all([u1, u2, t1, t2])
+        await s.flush()
+        due = datetime.utcnow()
+        s.add_all(
+            [
+                TaskAssignment(
+                    task_id=t1.id, user_id=u1.id, due_at=due, status="active"
+                ),
+                TaskAssignment(
+                    task_id=t1.id, user_id=u2.id, due_at=due, status="submitted"
+                ),
+                TaskAssignment(
+                    task_id=t2.id, user_id=u2.id, due_at=due, status="approved"
+                ),
+            ]
+        )
+        await s.commit()
+
+
+@pytest.mark.asyncio
+async def test_stats_from_aggregate(db):
+    await seed(db)
+    data = await svc.collect_admin_stats()  # счётчиков ещё нет — пересборка
+    assert data == {
+        "total_users": 2,
+        "admins_count": 1,
+        "tasks_total": 2,
+        "tasks_published": 1,
+        "assignments_total": 3,
+        "assignments_active": 1,
+        "assignments_submitted": 1,
+        "assignments_approved": 1,
+        "assignments_rejected": 0,
+        "assignments_expired": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_orm_changes(db):
+    await seed(db)
+    await svc.rebuild_counters()
+
+    async with db() as s:
+        a = await s.get(TaskAssignment, 2)
+        a.status = "rejected"
+        u = await s.get(User, 2)
+        u.is_admin = True
+        s.add(User(tg_id=3))
+        await s.commit()
+
+    data = await svc.collect_admin_stats()
+    assert data["total_users"] == 3
+    assert data["admins_count"] == 2
+    assert data["assignments_submitted"] == 0
+    assert data["assignments_rejected"] == 1
+    # инкрементальные счётчики совпадают с полным пересчётом
+    async with db() as s:
+        fresh = await svc.aggregate_counters(s)
+    assert fresh["users"] == 3 and fresh["admins"] == 2
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event, select
+
+from bot.services import tasks as svc
+from bot.storage.models import (
+    CoinTransaction,
+    OutboxMessage,
+    Task,
+    TaskAssignment,
+    User,
+)
+
+
+@pytest.fixture
+def db(async_db, mocker):
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    return async_db
+
+
+async def seed(db):
+    """Два задания, три автора; у первого автора две сдачи по разным заданиям."""
+    async with db() as s:
+        s.add_all(
+            [
+                User(id=1, tg_id=101, coins=0),
+                User(id=2, tg_id=102, coins=0),
+                User(id=3, tg_id=103, coins=95),
+                Task(id=1, title="Пост", difficulty="easy", reward_coins=5),
+                Task(id=2, title="Митап", difficulty="hard", reward_coins=20),
+            ]
+        )
+        now = datetime.utcnow()
+        for aid, task_id, user_id, status in [
+            (1, 1, 1, "submitted"),
+            (2, 2, 1, "submitted"),
+            (3, 1, 2, "submitted"),
+            (4, 1, 3, "submitted"),
+            (5, 2, 2, "approved"),  # уже проверена — не трогаем
+        ]:
+            s.add(
+                TaskAssignment(
+                    id=aid, task_id=task_id, user_id=user_id, due_at=now, status=status
+                )
+            )
+        await s.commit()
+
+
+@pytest.mark.asyncio
+async def test_page_approved_in_constant_queries(db, async_db):
+    await seed(db)
+    queries = []
+    event.listen(
+        async_db.kw["bind"].sync_engine,
+        "before_cursor_execute",
+        lambda *a: queries.append(a[2]),
+    )
+
+    result = await svc.bulk_review(True, assignment_ids=[1, 2, 3, 4, 5])
+
+    # статусы, 2 счётчика, данные для уведомлений, журнал, coins, outbox
+    assert len(queries) == 7
+    assert [it.assignment_id for it in result.items] == [1, 2, 3, 4]
+    assert result.balances == {101: (0, 25), 102: (0, 5), 103: (95, 100)}
+    async with db() as s:
+        coins = dict((await s.execute(select(User.tg_id, User.coins))).all())
+        ledger = (await s.execute(select(CoinTransaction.assignment_id))).scalars()
+        statuses = dict(
+            (await s.execute(select(TaskAssignment.id, TaskAssignment.status))).all()
+        )
+    assert coins == {101: 25, 102: 5, 103: 100}
+    assert sorted(ledger) == [1, 2, 3, 4]
+    assert set(statuses.values()) == {"approved"}
+    # 4 уведомления + level up у 101 (0 -> 25) и у 103 (95 -> 100) с бейджами
+    async with db() as s:
+        outbox = (await s.execute(select(OutboxMessage.chat_id))).scalars().all()
+    assert sorted(outbox) == [101, 101, 101, 101, 102, 103, 103, 103]
+
+    # повторный клик по той же странице ничего не начисляет
+    again = await svc.bulk_review(True, assignment_ids=[1, 2, 3, 4])
+    assert again.items == [] and again.balances == {}
+
+
+@pytest.mark.asyncio
+async def test_reject_all_for_task(db):
+    await seed(db)
+    result = await svc.bulk_review(False, task_id=1)
+
+    assert {it.user_tg_id for it in result.items} == {101, 102, 103}
+    assert {it.reward for it in result.items} == {0}
+    assert result.balances == {}
+    async with db() as s:
+        statuses = dict(
+            (await s.execute(select(TaskAssignment.id, TaskAssignment.status))).all()
+        )
+        assert await s.scalar(select(CoinTransaction.id)) is None
+    assert statuses == {
+        1: "rejected",
+        2: "submitted",
+        3: "rejected",
+        4: "rejected",
+        5: "approved",
+    }
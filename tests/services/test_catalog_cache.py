@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from bot.services.catalog_cache import CatalogCache, CatalogPage
+
+
+def page(text):
+    return CatalogPage(text=text, markup=None)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_build_once():
+    cache = CatalogCache()
+    calls = 0
+
+    async def build():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return page("p1")
+
+    results = await asyncio.gather(*(cache.get("all", 1, build) for _ in range(50)))
+    assert {r.text for r in results} == {"p1"}
+    assert calls == 1
+    await cache.get("all", 1, build)
+    assert calls == 1 and cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_pages_and_inflight_builds():
+    cache = CatalogCache()
+    release = asyncio.Event()
+
+    async def slow_build():
+        await release.wait()
+        return page("old")
+
+    inflight = asyncio.create_task(cache.get("easy", 1, slow_build))
+    await asyncio.sleep(0)
+    cache.invalidate()  # админ поменял задания, пока страница собиралась
+    release.set()
+    assert (await inflight).text == "old"
+
+    async def fresh_build():
+        return page("new")
+
+    assert (await cache.get("easy", 1, fresh_build)).text == "new"
+
+
+@pytest.mark.asyncio
+async def test_admin_toggle_invalidates_catalog(mocker):
+    from bot.services import tasks as svc
+    from bot.services.catalog_cache import catalog_cache
+
+    async def build():
+        return page("cached")
+
+    await catalog_cache.get("all", 1, build)
+    assert catalog_cache.stats()["size"] == 1
+
+    task_id = await svc.admin_create_task(
+        title="T", description="d", reward=3, deadline_days=1
+    )
+    assert catalog_cache.stats()["size"] == 0
+
+    await catalog_cache.get("all", 1, build)
+    assert await svc.admin_toggle_task_publised(task_id)
+    assert catalog_cache.stats()["size"] == 0
+
+    await catalog_cache.get("all", 1, build)
+    assert await svc.admin_delete_task(task_id)
+    assert catalog_cache.stats()["size"] == 0
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import select
+
+from bot.services import admin_stats, deadlines
+from bot.storage.models import StatCounter, Task, TaskAssignment, User
+
+
+@pytest.fixture
+def db(async_db, mocker):
+    mocker.patch("bot.services.deadlines.AsyncSessionLocal", async_db)
+    mocker.patch("bot.services.admin_stats.AsyncSessionLocal", async_db)
+    return async_db
+
+
+async def seed(db, now):
+    async with db() as s:
+        u = User(tg_id=111, coins=0)
+        t = Task(title="T", difficulty="easy", reward_coins=5)
+        s.add_all([u, t])
+        await s.flush()
+        s.add_all(
+            [
+                TaskAssignment(
+                    task_id=t.id,
+                    user_id=u.id,
+                    due_at=now - timedelta(hours=h),
+                    status=st,
+                )
+                for h, st in ((1, "active"), (2, "in_progress"), (3, "submitted"))
+            ]
+            + [
+                TaskAssignment(
+                    task_id=t.id,
+                    user_id=u.id,
+                    due_at=now + timedelta(hours=1),
+                    status="active",
+                ),
+                TaskAssignment(
+                    task_id=t.id,
+                    user_id=u.id,
+                    due_at=now + timedelta(days=2),
+                    status="active",
+                ),
+            ]
+        )
+        await s.commit()
+
+
+@pytest.mark.asyncio
+async def test_expire_overdue_in_batches_keeps_counters(db):
+    now = datetime.utcnow()
+    await seed(db, now)
+    await admin_stats.rebuild_counters()
+
+    assert await deadlines.expire_overdue(now, batch_size=1) == 2
+
+    async with db() as s:
+        statuses = list(
+            await s.scalars(select(TaskAssignment.status).order_by(TaskAssignment.id))
+        )
+        counters = dict(
+            (await s.execute(select(StatCounter.name, StatCounter.value))).all()
+        )
+        fresh = await admin_stats.aggregate_counters(s)
+    # на проверке и будущие дедлайны не трогаем
+    assert statuses == ["expired", "expired", "submitted", "active", "active"]
+    for name, value in fresh.items():
+        assert counters.get(name, 0) == value
+
+
+@pytest.mark.asyncio
+async def test_warn_upcoming_once(db, monkeypatch):
+    monkeypatch.setenv("DEADLINE_WARN_HOURS", "3")
+    now = datetime.utcnow()
+    await seed(db, now)
+    bot = SimpleNamespace(send_message=AsyncMock())
+
+    assert await deadlines.warn_upcoming(bot, now) == 1
+    assert bot.send_message.await_args.args[0] == 111
+    # повторный проход не шлёт второй раз
+    assert await deadlines.warn_upcoming(bot, now) == 0
+    assert bot.send_message.await_count == 1
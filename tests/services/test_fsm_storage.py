@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from sqlalchemy import event, update
+
+from bot.storage.fsm import SqlStorage
+from bot.storage.models import FsmRecord
+
+KEY = StorageKey(bot_id=1, chat_id=111, user_id=111)
+
+
+class Form(StatesGroup):
+    waiting = State()
+
+
+@pytest.mark.asyncio
+async def test_writes_batched_and_shared_between_workers(async_db):
+    engine = async_db.kw["bind"]
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda *a: statements.append(a[2]) if "fsm_states" in a[2] else None,
+    )
+    worker_a = SqlStorage(engine=engine, flush_delay=60)
+    worker_b = SqlStorage(engine=engine)
+
+    await worker_a.update_data(KEY, {"task_id": 7})
+    await worker_a.set_state(KEY, Form.waiting)
+    # свои записи видны сразу, до записи в БД
+    assert await worker_a.get_state(KEY) == Form.waiting.state
+    assert await worker_b.get_state(KEY) is None
+
+    statements.clear()
+    await worker_a.flush()
+    assert len([s for s in statements if s.startswith("INSERT")]) == 1
+    assert await worker_b.get_state(KEY) == Form.waiting.state
+    assert await worker_b.get_data(KEY) == {"task_id": 7}
+
+    # частичная запись не затирает вторую колонку
+    await worker_b.set_state(KEY, None)
+    await worker_b.close()
+    assert await worker_a.get_state(KEY) is None
+    assert await worker_a.get_data(KEY) == {"task_id": 7}
+    worker_a._flush_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_idle_state_expires(async_db):
+    engine = async_db.kw["bind"]
+    storage = SqlStorage(engine=engine, ttl=60)
+    await storage.set_state(KEY, "Form:waiting")
+    await storage.close()
+
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(FsmRecord).values(
+                expires_at=datetime.utcnow() - timedelta(seconds=1)
+            )
+        )
+    assert await SqlStorage(engine=engine).get_state(KEY) is None
+
+
+@pytest.mark.asyncio
+async def test_default_engine_has_own_pool(tmp_path, mocker):
+    from bot.storage import db
+
+    mocker.patch("bot.storage.db._db_url", f"sqlite:///{tmp_path / 'fsm.db'}")
+    mocker.patch("bot.storage.db._async_engine", None)
+    storage = SqlStorage()
+    # хендлер держит соединение сессии апдейта и читает FSM: общий пул
+    # под нагрузкой исчерпывается теми, кто ждёт второе соединение
+    shared = db.get_async_engine()
+    assert storage.engine is not shared
+    await shared.dispose()
+    await storage.close()
+    assert storage._engine is None
+
+
+@pytest.mark.asyncio
+async def test_state_write_does_not_revive_expired_data(async_db):
+    engine = async_db.kw["bind"]
+    storage = SqlStorage(engine=engine, ttl=60, flush_delay=0)
+    await storage.set_data(KEY, {"task_id": 7})
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(FsmRecord).values(
+                expires_at=datetime.utcnow() - timedelta(seconds=1)
+            )
+        )
+
+    await storage.set_state(KEY, Form.waiting)
+    other = SqlStorage(engine=engine)
+    assert await other.get_state(KEY) == Form.waiting.state
+    assert await other.get_data(KEY) == {}
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_retried(async_db, mocker):
+    import asyncio
+
+    mocker.patch("bot.storage.fsm.RETRY_DELAY", 0.01)
+    storage = SqlStorage(engine=async_db.kw["bind"], flush_delay=0.01)
+    errors = iter([RuntimeError("database is locked")])
+
+    def flaky(cols, now):
+        for err in errors:
+            raise err
+        return SqlStorage._upsert(storage, cols, now)
+
+    upsert = mocker.patch.object(storage, "_upsert", side_effect=flaky)
+
+    await storage.set_state(KEY, Form.waiting)
+    # без нового set_* — повтор запланирован самим flush
+    await asyncio.wait_for(storage._flush_task, 1)
+
+    assert upsert.call_count == 2 and not storage._pending
+    other = SqlStorage(engine=async_db.kw["bind"])
+    assert await other.get_state(KEY) == Form.waiting.state
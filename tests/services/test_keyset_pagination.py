@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from bot.services import tasks as svc
+from bot.storage.models import Task, TaskAssignment, User
+from bot.utils.cursor import decode_cursor, encode_cursor
+
+
+def test_cursor_roundtrip_fits_callback_data():
+    at = datetime(2099, 12, 31, 23, 59, 59, 999999)
+    raw = encode_cursor(at, 2**31 - 1)
+    assert decode_cursor(raw) == (at, 2**31 - 1)
+    assert decode_cursor(encode_cursor(None, 5)) == (None, 5)
+    # старые номера страниц и мусор — первая страница
+    assert decode_cursor("3") is None and decode_cursor("zz.!") is None
+    longest = f"profile:history:list:submitted:{raw}:medium"
+    assert len(longest.encode()) <= 64
+
+
+@pytest.mark.asyncio
+async def test_pages_cover_everything_once(async_db, mocker):
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    base = datetime(2024, 5, 1, 12, 0)
+    async with async_db() as s:
+        u = User(tg_id=111, coins=0)
+        t = Task(title="T", difficulty="easy", reward_coins=3)
+        s.add_all([u, t])
+        await s.flush()
+        for i in range(23):
+            s.add(
+                TaskAssignment(
+                    task_id=t.id,
+                    user_id=u.id,
+                    due_at=base + timedelta(days=i % 4),  # одинаковые due_at
+                    # одинаковые моменты и пара пустых — проверяем tie-break и NULL
+                    submitted_at=(
+                        None if i in (3, 17) else base + timedelta(hours=i // 3)
+                    ),
+                    status="submitted",
+                )
+            )
+        await s.commit()
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = await svc.list_pending_submissions(cursor, per_page=5)
+        seen += [r.id for r in rows]
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 5
+    assert len(seen) == len(set(seen)) == 23
+    # свежие сверху, при равенстве — больший id, пустые submitted_at в конце
+    assert seen[-2:] == [18, 4]
+    assert seen[0] == 23
+
+    # «активные» листаются по (due_at, id) по возрастанию
+    async with async_db() as s:
+        await s.execute(TaskAssignment.__table__.update().values(status="active"))
+        await s.commit()
+    seen, cursor = [], None
+    while True:
+        rows, cursor = await svc.list_assignments(111, "active", cursor, per_page=4)
+        seen += [(r.due_at, r.id) for r in rows]
+        if cursor is None:
+            break
+    assert seen == sorted(seen) and len(seen) == 23
@@ -0,0 +1,64 @@
+import io
+import json
+import logging
+
+from bot.utils import logs
+from bot.utils.logs import JsonFormatter, RateLimitFilter, parse_levels
+
+
+def _record(name="bot.services.broadcast", level=logging.WARNING, msg="x %s", *args):
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+
+def test_rate_limit_counts_suppressed(mocker):
+    clock = mocker.patch("bot.utils.logs.time.monotonic", return_value=100.0)
+    f = RateLimitFilter(limit=2, window=60)
+    tpl = "[broadcast] failed to send to %s: %s"
+
+    passed = [f.filter(_record(msg=tpl)) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # ERROR не режется, чужой логгер — тоже
+    assert f.filter(_record(msg=tpl, level=logging.ERROR))
+    assert f.filter(_record(name="bot.handlers.tasks", msg=tpl))
+
+    clock.return_value = 161.0
+    rec = _record(msg=tpl)
+    assert f.filter(rec) and rec.suppressed == 3
+
+
+def test_json_formatter_keeps_extra():
+    rec = _record("bot.main", logging.INFO, "user %s", 42)
+    rec.chat_id = 7
+    data = json.loads(JsonFormatter().format(rec))
+    assert (data["level"], data["logger"], data["msg"]) == (
+        "INFO",
+        "bot.main",
+        "user 42",
+    )
+    assert data["chat_id"] == 7
+
+
+def test_parse_levels():
+    assert parse_levels("sqlalchemy.engine=info, aiogram.event=DEBUG,bad") == {
+        "sqlalchemy.engine": logging.INFO,
+        "aiogram.event": logging.DEBUG,
+    }
+
+
+def test_setup_logging_writes_json_via_queue(monkeypatch):
+    monkeypatch.setenv("LOG_LEVELS", "bot.test=DEBUG")
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    out = io.StringIO()
+    try:
+        logs.stop_logging()
+        logs.setup_logging(out)
+        logging.getLogger("bot.test").debug("hello %s", "world")
+        logs.stop_logging()  # дописывает очередь
+    finally:
+        root.handlers[:], _ = saved
+        root.setLevel(saved[1])
+        logging.getLogger("bot.test").setLevel(logging.NOTSET)
+
+    [line] = out.getvalue().splitlines()
+    assert json.loads(line)["msg"] == "hello world"
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot.middlewares.metrics import MetricsMiddleware
+from bot.services.metrics import Metrics
+
+
+def test_quantiles_from_buckets():
+    reg = Metrics()
+    st = reg.stats("message", "r:h")
+    for seconds in [0.003] * 90 + [0.2] * 10:
+        reg.observe(st, seconds)
+
+    assert st.count == 100 and st.buckets[0] == 90
+    assert st.quantile(0.5) < 0.005
+    # 95-й перцентиль — в корзине (0.1, 0.25]
+    assert 0.1 < st.quantile(0.95) <= 0.25
+
+
+def test_prometheus_text_is_cumulative():
+    reg = Metrics()
+    st = reg.stats("callback_query", 'tasks:take "x"')
+    reg.observe(st, 0.02)
+    reg.observe(st, 20.0, error=True)
+
+    text = reg.render_prometheus()
+    labels = 'event="callback_query",handler="tasks:take \\"x\\""'
+    assert f'bot_handler_duration_seconds_bucket{{{labels},le="0.025"}} 1' in text
+    assert f'bot_handler_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"bot_handler_duration_seconds_count{{{labels}}} 2" in text
+    assert f"bot_handler_errors_total{{{labels}}} 1" in text
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_handler_and_counts_errors():
+    reg = Metrics()
+    mw = MetricsMiddleware(reg)
+
+    async def take_task_cb(event, data):
+        assert reg.stats("callback_query", "tasks_catalog:take_task_cb").in_flight == 1
+        raise RuntimeError("boom")
+
+    data = {
+        "event_router": SimpleNamespace(name="tasks_catalog"),
+        "handler": SimpleNamespace(callback=take_task_cb),
+        "event_update": SimpleNamespace(event_type="callback_query"),
+    }
+    with pytest.raises(RuntimeError):
+        await mw(take_task_cb, SimpleNamespace(), data)
+
+    [row] = reg.top()
+    assert row["handler"] == "tasks_catalog:take_task_cb"
+    assert (row["count"], row["errors"], row["in_flight"]) == (1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_requires_token(mocker):
+    from aiohttp import web
+    from aiohttp.test_utils import make_mocked_request
+
+    import webapp
+
+    mocker.patch.object(webapp, "METRICS_TOKEN", "s3cret")
+    for headers in ({}, {"Authorization": "Bearer wrong"}):
+        with pytest.raises(web.HTTPForbidden):
+            await webapp.metrics_view(make_mocked_request("GET", "/metrics", headers=headers))
+
+    ok = make_mocked_request("GET", "/metrics", headers={"Authorization": "Bearer s3cret"})
+    resp = await webapp.metrics_view(ok)
+    assert resp.status == 200 and b"bot_handler_duration_seconds" in resp.body
@@ -0,0 +1,33 @@
+from sqlalchemy import create_engine, inspect, text
+
+from bot.storage import migrations
+from bot.storage.db import Base
+
+
+def test_fresh_db_created_at_latest_version():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        assert migrations.upgrade(conn) == migrations.LATEST
+        assert migrations.get_version(conn) == migrations.LATEST
+        assert inspect(conn).has_table("broadcast_deliveries")
+
+
+def test_legacy_db_upgraded_step_by_step():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # схема «до миграций»: старые таблицы без индексов и без рассылок
+        legacy = [
+            t for t in Base.metadata.sorted_tables if not t.name.startswith("broadcast")
+        ]
+        Base.metadata.create_all(conn, tables=legacy)
+        for table in legacy:
+            for index in table.indexes:
+                index.drop(conn)
+        conn.execute(text("INSERT INTO users (tg_id, coins) VALUES (1, NULL)"))
+
+        assert migrations.upgrade(conn) == migrations.LATEST
+        indexes = {i["name"] for i in inspect(conn).get_indexes("task_assignments")}
+        assert "ix_task_assignments_status_submitted" in indexes
+        assert conn.execute(text("SELECT coins FROM users")).scalar() == 0
+        # повторный запуск ничего не делает
+        assert migrations.upgrade(conn) == migrations.LATEST
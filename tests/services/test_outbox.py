@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from sqlalchemy import select
+
+from bot.services import outbox as svc
+from bot.storage.models import OutboxMessage
+
+
+@pytest.fixture
+def db(async_db, mocker):
+    mocker.patch("bot.services.outbox.AsyncSessionLocal", async_db)
+    return async_db
+
+
+async def rows(db):
+    async with db() as s:
+        res = await s.execute(select(OutboxMessage).order_by(OutboxMessage.id))
+        return {m.chat_id: m for m in res.scalars()}
+
+
+@pytest.mark.asyncio
+async def test_enqueue_is_part_of_callers_transaction(db):
+    async with db() as s:
+        await svc.enqueue(s, [(1, "a")])
+        await s.rollback()
+        await svc.enqueue(s, [(2, "b")])
+        await s.commit()
+    assert list(await rows(db)) == [2]
+
+
+@pytest.mark.asyncio
+async def test_drain_sends_and_schedules_retries(db):
+    async with db() as s:
+        await svc.enqueue(s, [(1, "ok"), (2, "flood"), (3, "blocked"), (4, "net")])
+        await s.commit()
+
+    async def send_message(chat_id, text):
+        if chat_id == 2:
+            raise TelegramRetryAfter(method=None, message="flood", retry_after=7)
+        if chat_id == 3:
+            raise TelegramForbiddenError(method=None, message="blocked")
+        if chat_id == 4:
+            raise ConnectionError("reset")
+
+    dispatcher = svc.OutboxDispatcher()
+    now = datetime.utcnow()
+    assert await dispatcher.drain_once(SimpleNamespace(send_message=send_message)) == 4
+
+    left = await rows(db)
+    assert 1 not in left  # доставленное удалено
+    assert left[2].status == "pending" and left[2].attempts == 0
+    assert left[2].available_at >= now + timedelta(seconds=7)
+    assert left[3].status == "failed"
+    assert left[4].status == "pending" and left[4].attempts == 1
+    assert left[4].last_error == "reset"
+
+    # отложенные ещё не созрели — повторно не берутся
+    assert await dispatcher.drain_once(SimpleNamespace(send_message=send_message)) == 0
+
+
+@pytest.mark.asyncio
+async def test_claimed_rows_are_leased(db):
+    async with db() as s:
+        await svc.enqueue(s, [(1, "hi")])
+        await s.commit()
+    now = datetime.utcnow()
+
+    # воркер занял строку и упал, не успев отправить
+    assert len(await svc.OutboxDispatcher()._claim(now)) == 1
+    assert await svc.OutboxDispatcher()._claim(now) == []
+
+    # после аренды строку подберёт кто угодно
+    sent = []
+
+    async def send_message(chat_id, text):
+        sent.append((chat_id, text))
+
+    bot = SimpleNamespace(send_message=send_message)
+    later = now + svc.LEASE + timedelta(seconds=1)
+    assert await svc.OutboxDispatcher().drain_once(bot, now=later) == 1
+    assert sent == [(1, "hi")] and await rows(db) == {}
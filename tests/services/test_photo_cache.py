@@ -0,0 +1,109 @@
+import pytest
+
+from bot.services import cache_photo as cp
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def set(self, key, value, ex=None):
+        self.ops.append(("set", key, value, ex))
+
+    def mget(self, keys):
+        self.ops.append(("mget", keys))
+
+    def delete(self, *keys):
+        self.ops.append(("delete", keys))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        out = []
+        for op, *args in self.ops:
+            if op == "set":
+                key, value, ex = args
+                self.redis.data[key] = value
+                self.redis.ttl[key] = ex
+                out.append(True)
+            elif op == "mget":
+                out.append([self.redis.data.get(k) for k in args[0]])
+            else:
+                out.append(
+                    sum(self.redis.data.pop(k, None) is not None for k in args[0])
+                )
+        return out
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data, self.ttl = {}, {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def mget(self, keys):
+        self.round_trips += 1
+        return [self.data.get(k) for k in keys]
+
+
+class DownRedis:
+    calls = 0
+
+    def pipeline(self, transaction=True):
+        DownRedis.calls += 1
+        raise ConnectionError("refused")
+
+    async def mget(self, keys):
+        DownRedis.calls += 1
+        raise ConnectionError("refused")
+
+
+@pytest.mark.asyncio
+async def test_multi_key_ops_are_single_round_trips():
+    redis = FakeRedis()
+    cache = cp.PhotoCache(redis=redis, ttl=600)
+
+    keys = await cache.put_many(["a", "b", "c"])
+    assert redis.round_trips == 1
+    assert set(redis.ttl.values()) == {600}
+
+    assert await cache.get_many(keys) == ["a", "b", "c"]
+    assert await cache.pop_many(keys[:2]) == ["a", "b"]
+    assert redis.round_trips == 3
+    assert list(redis.data) == [keys[2]]
+    assert len(cache.local) == 0
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_local_lru_when_redis_is_down(mocker):
+    now = mocker.patch("bot.services.cache_photo.time.monotonic", return_value=100.0)
+    DownRedis.calls = 0
+    cache = cp.PhotoCache(redis=DownRedis(), ttl=10)
+
+    key = await cache.put("file-1")
+    assert await cache.get(key) == "file-1"
+    # после ошибки Redis не дёргаем до REDIS_RETRY
+    assert DownRedis.calls == 1
+
+    now.return_value = 100.0 + cp.REDIS_RETRY + 1
+    assert await cache.get(key) is None  # TTL истёк и в LRU
+    assert DownRedis.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_without_redis_package():
+    cache = cp.PhotoCache(redis=None, maxsize=2)
+    k1, k2 = await cache.put_many(["a", "b"])
+    await cache.get(k1)  # k1 свежее k2
+    k3 = await cache.put("c")
+    assert await cache.get_many([k1, k2, k3]) == ["a", None, "c"]
+    assert await cache.pop(k1) == "a"
+    assert await cache.get(k1) is None
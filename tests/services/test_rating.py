@@ -0,0 +1,101 @@
+import pytest
+
+from bot.services import rating as svc
+from bot.storage.models import User
+
+
+@pytest.fixture
+def index():
+    idx = svc.RankingIndex()
+    for user_id, coins in [(1, 10), (2, 30), (3, 10), (4, 0)]:
+        idx.upsert(user_id, 100 + user_id, f"u{user_id}", coins)
+    return idx
+
+
+def test_top_orders_by_coins_then_id(index):
+    assert [tg for tg, _, _ in index.top(3)] == [102, 101, 103]
+
+
+def test_position_counts_strictly_greater(index):
+    # у 101 и 103 поровну монет — место одинаковое, как в COUNT(coins > x) + 1
+    assert index.position(101) == (2, 10)
+    assert index.position(103) == (2, 10)
+    assert index.position(104) == (4, 0)
+    assert index.position(999) == (None, 0)
+
+
+def test_upsert_moves_user(index):
+    index.upsert(4, 104, "u4", 50)
+    assert index.position(104) == (1, 50)
+    assert index.position(102) == (2, 30)
+    assert len(index) == 4
+
+
+@pytest.mark.asyncio
+async def test_rebuild_and_track(async_db, mocker):
+    mocker.patch("bot.services.rating.AsyncSessionLocal", async_db)
+    mocker.patch.object(svc, "ranking", svc.RankingIndex())
+    async with async_db() as s:
+        s.add_all([User(tg_id=1, coins=5), User(tg_id=2, coins=7)])
+        await s.commit()
+
+    assert await svc.rebuild_ranking() == 2
+    assert await svc.get_leaderboard(1) == [(2, None, 7)]
+
+    async with async_db() as s:
+        u = await s.get(User, 1)
+        u.coins = 20
+        await s.commit()
+    svc.track_user(u)
+    assert await svc.get_user_position(1) == (1, 20)
+
+
+@pytest.mark.asyncio
+async def test_credit_updates_ranking_only_after_commit(async_db, mocker):
+    from bot.services.coins import credit
+
+    mocker.patch("bot.services.rating.AsyncSessionLocal", async_db)
+    mocker.patch.object(svc, "ranking", svc.RankingIndex())
+    async with async_db() as s:
+        s.add_all([User(id=1, tg_id=1, coins=5), User(id=2, tg_id=2, coins=7)])
+        await s.commit()
+    await svc.rebuild_ranking()
+
+    async with async_db() as s:
+        await credit(s, 1, 10, "manual")
+        assert svc.ranking.position(1) == (2, 5)
+        await s.rollback()
+    assert svc.ranking.position(1) == (2, 5)
+
+    async with async_db() as s:
+        await credit(s, 1, 10, "manual")
+        await s.commit()
+    assert svc.ranking.position(1) == (1, 15)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_keeps_updates_made_while_reading(async_db, mocker):
+    mocker.patch("bot.services.rating.AsyncSessionLocal", async_db)
+    mocker.patch.object(svc, "ranking", svc.RankingIndex())
+    async with async_db() as s:
+        s.add_all([User(id=1, tg_id=1, coins=5), User(id=2, tg_id=2, coins=7)])
+        await s.commit()
+    await svc.rebuild_ranking()
+
+    # начисление зафиксировано, пока пересборка читала старый снимок
+    svc.ranking.begin_rebuild()
+    svc.track_user(User(id=1, tg_id=1, coins=50))
+    svc.ranking.load([(1, 1, None, 5), (2, 2, None, 7)])
+    assert svc.ranking.position(1) == (1, 50)
+
+
+@pytest.mark.asyncio
+async def test_periodic_rebuild_is_opt_in(monkeypatch):
+    monkeypatch.delenv("RANKING_REFRESH", raising=False)
+    await svc.start_ranking_refresh()
+    assert svc._task is None
+
+    monkeypatch.setenv("RANKING_REFRESH", "30")
+    await svc.start_ranking_refresh()
+    assert svc._task is not None
+    await svc.stop_ranking_refresh()
@@ -0,0 +1,80 @@
+import heapq
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from bot.services import reminders as rm
+from bot.storage.models import Event, User
+
+
+def test_missed_reminders_collapse_to_closest():
+    now = datetime(2024, 1, 1, 12, 0)
+    # до события 30 минут: «за сутки» и «за час» уже прошли — шлём одно, «1h»
+    assert rm._pending_reminders(now + timedelta(minutes=30), now) == [
+        (now - timedelta(minutes=30), "1h")
+    ]
+    # до события 2 дня: оба напоминания впереди
+    kinds = [k for _, k in rm._pending_reminders(now + timedelta(days=2), now)]
+    assert sorted(kinds) == ["1d", "1h"]
+    # «за час» уже отправлено — «за сутки» больше не нужно
+    assert rm._pending_reminders(now + timedelta(minutes=30), now, {"1h"}) == []
+
+
+@pytest.mark.asyncio
+async def test_send_once_across_restarts(async_db, mocker):
+    mocker.patch("bot.services.reminders.AsyncSessionLocal", async_db)
+    now = datetime.utcnow()
+    async with async_db() as s:
+        u = User(tg_id=111, coins=0)
+        s.add(u)
+        await s.flush()
+        s.add_all(
+            [
+                Event(
+                    title="soon", event_date=now + timedelta(minutes=30), user_id=u.id
+                ),
+                Event(title="later", event_date=now + timedelta(days=3), user_id=u.id),
+                Event(title="past", event_date=now - timedelta(days=1), user_id=u.id),
+            ]
+        )
+        await s.commit()
+
+    bot = SimpleNamespace(send_message=AsyncMock())
+    scheduler = rm.ReminderScheduler()
+    # «soon» — одно напоминание, «later» — два, «past» — ничего
+    assert await scheduler.load() == 3
+    assert await scheduler.send_due(bot) == 1
+    assert "soon" in bot.send_message.call_args.args[1]
+
+    # новое событие попадает в кучу без перечитывания таблицы
+    scheduler.add_event(99, now + timedelta(days=5))
+    assert len(scheduler) == 4
+
+    # после рестарта «soon» уже отправлено
+    restarted = rm.ReminderScheduler()
+    assert await restarted.load() == 2
+    # даже если два процесса держат одно напоминание, уйдёт оно один раз
+    heapq.heappush(scheduler._heap, (now, 1, "1h"))
+    assert await scheduler.send_due(bot) == 0
+    assert bot.send_message.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_claim_requeues_reminders(mocker):
+    now = datetime.utcnow()
+    scheduler = rm.ReminderScheduler()
+    due = [(now - timedelta(minutes=1), 1, "1h"), (now, 2, "1d")]
+    for entry in due:
+        heapq.heappush(scheduler._heap, entry)
+    mocker.patch.object(
+        scheduler, "_claim", AsyncMock(side_effect=RuntimeError("database is locked"))
+    )
+    bot = SimpleNamespace(send_message=AsyncMock())
+
+    with pytest.raises(RuntimeError):
+        await scheduler.send_due(bot, now)
+
+    assert sorted(scheduler._heap) == due
+    bot.send_message.assert_not_awaited()
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from bot.storage import profiler
+from bot.storage.models import User
+
+
+def test_fingerprint_folds_literals_and_in_lists():
+    a = profiler.fingerprint("SELECT * FROM users WHERE id IN (?, ?, ?) AND tg_id = 5")
+    b = profiler.fingerprint("SELECT *  FROM users\nWHERE id IN (?, ?) AND tg_id = 77")
+    assert a == b == "SELECT * FROM users WHERE id IN (?) AND tg_id = ?"
+
+
+@pytest.mark.asyncio
+async def test_counts_only_current_task(async_db):
+    profiler.install(async_db.kw["bind"])
+
+    async def work(n):
+        with profiler.profile(f"w{n}") as stats:
+            for _ in range(n):
+                async with async_db() as s:
+                    await s.scalar(select(User.id).limit(1))
+                await asyncio.sleep(0)
+        return stats
+
+    a, b = await asyncio.gather(work(1), work(3))
+    assert (a.count, b.count) == (1, 3)
+    assert b.repeated() == [(next(iter(b.fingerprints)), 3)]
+    assert profiler.current() is None
+
+
+@pytest.mark.asyncio
+async def test_budget_and_n_plus_one(async_db, query_budget, caplog):
+    async with async_db() as s:
+        s.add_all([User(id=i, tg_id=100 + i) for i in range(1, 7)])
+        await s.commit()
+
+    async def per_user_lookup():
+        async with async_db() as s:
+            for i in range(1, 7):
+                await s.get(User, i)
+
+    with pytest.raises(profiler.QueryBudgetExceeded, match="possible N\\+1"):
+        with query_budget(10):
+            await per_user_lookup()
+    with pytest.raises(profiler.QueryBudgetExceeded, match="over budget 2"):
+        with query_budget(2):
+            await per_user_lookup()
+
+    # без strict — только warning
+    with profiler.profile("lookup", budget=2):
+        await per_user_lookup()
+    assert "over budget" in caplog.text and "N+1" in caplog.text
@@ -1,93 +1,114 @@
-import re
-from tkinter import N, NO
-from unittest import mock
-from aiogram import F
+import asyncio
+from datetime import datetime
+
 import pytest
-from types import SimpleNamespace
-from bot.services import tasks as svc
+import pytest_asyncio
+from sqlalchemy import func, select, update
 
-def test_approve_adds_coins(mocker):
-
-
-    assignment = SimpleNamespace(id=10, 
-                                 task_id=2, 
-                                 user_id=1, 
-                                 status="submitted")
-    task = SimpleNamespace(id=2, 
-                           reward_coins=7)
-    user = SimpleNamespace(id=1, 
-                           tg_id=777,
-                           coins=0)
-
-    class FakeSession:
-        def __init__(self):
-            self.commit_called = False
-
-        def get(self, model, pk):
-            if pk == 10:
-                return assignment
-            if pk == 1:
-                return user
-            if pk == 2:
-                return task
-            return None        
-
-        def commit(self):
-            self.commit_called = True
-
-        def __enter__(self):
-            return self
-        
-        def __exit__(self, exc_type, exc, tb):
-            return False
-        
-    fake_session = FakeSession()
-
-    mocker.patch("bot.services.tasks.SessionLocal", return_value=fake_session)
-
-    # mocker.patch.object(
-    #     svc, "bot.services.tasks.get_assignment_by_id", return_value=assignment, create=True
-    # )
-    # mocker.patch.object(svc, "bot.services.tasks.get_task_by_id", return_value=task, create=True)
-    # mocker.patch.object(svc, "bot.services.tasks.get_user_by_id", return_value=user, create=True)
-
-    # # мок “сохранения”
-    # mocker.patch("bot.services.tasks._commit", create=True)
-    # # mocker.patch.object(svc, "_commit", create=True)
-
-    ok = svc.approve_assignment(assignment_id=10)
+from bot.services import coins
+from bot.services import tasks as svc
+from bot.services.rating import ranking, rebuild_ranking
+from bot.storage.models import CoinTransaction, Task, TaskAssignment, User
+
+
+@pytest.fixture
+def db(async_db, mocker):
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    mocker.patch("bot.services.rating.AsyncSessionLocal", async_db)
+    return async_db
+
+
+async def seed(db, status="submitted"):
+    async with db() as s:
+        s.add_all(
+            [
+                User(id=1, tg_id=777, coins=0),
+                Task(id=2, title="T", difficulty="medium", reward_coins=7),
+                TaskAssignment(
+                    id=10,
+                    task_id=2,
+                    user_id=1,
+                    due_at=datetime.utcnow(),
+                    status=status,
+                ),
+            ]
+        )
+        await s.commit()
+
+
+async def state(db):
+    async with db() as s:
+        status = await s.scalar(select(TaskAssignment.status))
+        balance = await s.scalar(select(User.coins))
+        ledger = (await s.execute(select(CoinTransaction.amount))).scalars().all()
+    return status, balance, ledger
+
+
+@pytest.mark.asyncio
+async def test_approve_adds_coins(db):
+    await seed(db)
+    await rebuild_ranking()
+
+    ok = await svc.approve_assignment(assignment_id=10)
     assert ok is True
-    assert assignment.status == "approved"
-    assert user.coins == 7
-    assert fake_session.commit_called is True
-
-def test_approve_returns_false_if_not_found(mocker):
-
-    class FakeSession:
-        def get(self, model, pk):
-            return None  # ничего не нашли
-        def commit(self):
-            raise AssertionError("commit should not be called")
-        def __enter__(self): return self
-        def __exit__(self, exc_type, exc, tb): return False
-
-    mocker.patch("bot.services.tasks.SessionLocal", return_value=FakeSession())
-
-    assert svc.approve_assignment(999) is False
-
-
-def test_approve_returns_false_if_wrong_status(mocker):
-
-    assignment = SimpleNamespace(id=10, task_id=2, user_id=1, status="approved")
-
-    class FakeSession:
-        def get(self, model, pk):
-            return assignment if pk == 10 else None
-        def commit(self):
-            raise AssertionError("commit should not be called")
-        def __enter__(self): return self
-        def __exit__(self, exc_type, exc, tb): return False
-
-    mocker.patch("bot.services.tasks.SessionLocal", return_value=FakeSession())
-
-    assert svc.approve_assignment(10) is False
+    assert await state(db) == ("approved", 7, [7])
+    assert ranking.position(777) == (1, 7)
+
+
+@pytest.mark.asyncio
+async def test_approve_returns_false_if_not_found(db):
+    assert await svc.approve_assignment(999) is False
+
+
+@pytest.mark.asyncio
+async def test_approve_returns_false_if_wrong_status(db):
+    await seed(db, status="approved")
+    assert await svc.approve_assignment(10) is False
+    assert await state(db) == ("approved", 0, [])
+
+
+@pytest_asyncio.fixture
+async def file_db(tmp_path, mocker):
+    # у in-memory базы одно соединение на всех — гонку там не воспроизвести
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from bot.storage.db import Base
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'race.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    mocker.patch("bot.storage.db.AsyncSessionLocal", maker)
+    yield maker
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_decisions_credit_once(file_db):
+    db = file_db
+    await seed(db)
+    results = await asyncio.gather(
+        *(svc.approve_assignment(10) for _ in range(5)),
+        svc.reject_assignment(10),
+    )
+    assert results.count(True) == 1
+    status, balance, ledger = await state(db)
+    assert balance == sum(ledger) == (7 if status == "approved" else 0)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_balances_from_ledger(db):
+    await seed(db)
+    assert await svc.approve_assignment(10)
+    async with db() as s:
+        # ручная правка мимо журнала
+        await s.execute(update(User).values(coins=1000))
+        await s.commit()
+
+    assert await coins.rebuild_balances() == 1
+    async with db() as s:
+        assert await s.scalar(select(User.coins)) == 7
+        assert await s.scalar(select(func.count()).select_from(CoinTransaction)) == 1
+    assert ranking.position(777) == (1, 7)
+    # всё сходится — пересчёт ничего не трогает
+    assert await coins.rebuild_balances() == 0
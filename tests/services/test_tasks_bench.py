@@ -0,0 +1,192 @@
+"""
+Запросы и время публичных функций services/tasks.py на засеянной БД.
+
+Число запросов проверяется всегда; время — только с pytest-benchmark:
+    pytest tests/services/test_tasks_bench.py --benchmark-only
+"""
+
+import asyncio
+import importlib.util
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from bot.services import tasks as svc
+from bot.services.user_cache import user_cache
+from bot.storage.models import Task, TaskAssignment, User
+
+USERS, TASKS, PER_USER = 20, 30, 10
+TG_ID = 1000  # первый засеянный пользователь
+# потолок среднего времени вызова на in-memory SQLite, сек
+LATENCY_BUDGET = 0.05
+
+needs_benchmark = pytest.mark.skipif(
+    importlib.util.find_spec("pytest_benchmark") is None,
+    reason="pytest-benchmark не установлен",
+)
+
+
+class Seeded:
+    """Засеянная БД со своим циклом событий — benchmark вызывает синхронно."""
+
+    def __init__(self, loop, maker, engine):
+        self.loop = loop
+        self.maker = maker
+        self.queries: list[str] = []
+        event.listen(
+            engine.sync_engine,
+            "before_cursor_execute",
+            lambda *a: self.queries.append(a[2]),
+        )
+
+    def run(self, make_coro):
+        return self.loop.run_until_complete(make_coro())
+
+    def count(self, make_coro) -> int:
+        self.queries.clear()
+        self.run(make_coro)
+        return len(self.queries)
+
+
+async def _seed(maker):
+    base = datetime(2024, 5, 1, 12, 0)
+    statuses = ("active", "submitted", "approved", "rejected")
+    async with maker() as s:
+        users = [User(tg_id=TG_ID + i, username=f"u{i}", coins=0) for i in range(USERS)]
+        tasks = [
+            Task(title=f"T{i}", difficulty="easy", reward_coins=3 + i % 10)
+            for i in range(TASKS)
+        ]
+        s.add_all(users + tasks)
+        await s.flush()
+        for ui, u in enumerate(users):
+            for k in range(PER_USER):
+                s.add(
+                    TaskAssignment(
+                        task_id=tasks[(ui + k) % TASKS].id,
+                        user_id=u.id,
+                        due_at=base + timedelta(days=k),
+                        submitted_at=base + timedelta(hours=ui * PER_USER + k),
+                        status=statuses[k % len(statuses)],
+                    )
+                )
+        await s.commit()
+
+
+@pytest.fixture
+def seeded(mocker):
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import StaticPool
+
+    from bot.storage.db import Base
+
+    loop = asyncio.new_event_loop()
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    loop.run_until_complete(setup())
+    maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    loop.run_until_complete(_seed(maker))
+    mocker.patch("bot.storage.db.AsyncSessionLocal", maker)
+    mocker.patch.object(svc, "AsyncSessionLocal", maker)
+    yield Seeded(loop, maker, engine)
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+async def _first(status: str) -> int:
+    rows, _ = await svc.list_assignments(TG_ID, status)
+    return rows[0].id
+
+
+# (имя, фабрика корутины, запросов при тёплом кэше пользователей)
+READS = [
+    ("list_public_tasks", lambda: svc.list_public_tasks("easy", limit=10), 1),
+    ("admin_list_all_tasks", svc.admin_list_all_tasks, 1),
+    ("get_task", lambda: svc.get_task(1), 1),
+    ("has_active_assignment", lambda: svc.has_active_assignment(TG_ID, 1), 1),
+    ("get_active_assignment", lambda: svc.get_active_assignment(TG_ID, 1), 1),
+    ("count_assignments_by_status", lambda: svc.count_assignments_by_status(TG_ID), 1),
+    ("list_assignments", lambda: svc.list_assignments(TG_ID, "done", per_page=3), 1),
+    ("list_pending_submissions", lambda: svc.list_pending_submissions(per_page=10), 1),
+    ("list_pending_assignments", lambda: svc.list_pending_assignments(50), 1),
+    ("get_assignment_full", lambda: svc.get_assignment_full(2), 1),
+    ("get_assignment_card", lambda: svc.get_assignment_card(2), 1),
+    ("get_assignment_for_moderation", lambda: svc.get_assignment_for_moderation(2), 1),
+]
+
+
+@pytest.mark.parametrize("name,make,expected", READS, ids=[r[0] for r in READS])
+def test_read_query_count(seeded, name, make, expected):
+    seeded.run(make)  # прогрев кэша пользователей
+    assert seeded.count(make) == expected, seeded.queries
+
+
+def test_list_pending_assignments_no_n_plus_one(seeded):
+    assert seeded.count(lambda: svc.list_pending_assignments(5)) == 1
+    items = seeded.run(lambda: svc.list_pending_assignments(50))
+    assert len(items) == USERS * PER_USER // 4
+    assert seeded.count(lambda: svc.list_pending_assignments(50)) == 1
+
+
+def test_moderate_assignment_query_count(seeded):
+    aid = seeded.run(lambda: _first("submitted"))
+    before = seeded.run(lambda: svc.get_assignment_full(aid))
+
+    # условный UPDATE ... RETURNING, два UPDATE stats_counters, автор и задание,
+    # INSERT в журнал, UPDATE users ... RETURNING, INSERT в outbox,
+    # SELECT назначения для ответа
+    assert seeded.count(lambda: svc.moderate_assignment(aid, approve=True)) == 8
+    after = seeded.run(lambda: svc.get_assignment_full(aid))
+    assert after.status == "approved"
+    assert after.user.coins == before.user.coins + before.task.reward_coins
+    # в кэше — баланс после commit, без лишнего SELECT
+    found, cached = user_cache.lookup(TG_ID)
+    assert found and cached.coins == after.user.coins
+
+    # повторная модерация — один UPDATE, который не находит строку
+    assert seeded.count(lambda: svc.moderate_assignment(aid, approve=False)) == 1
+
+
+@needs_benchmark
+@pytest.mark.parametrize("name,make,expected", READS, ids=[r[0] for r in READS])
+def test_read_latency(seeded, benchmark, name, make, expected):
+    seeded.run(make)
+    benchmark.pedantic(seeded.run, args=(make,), rounds=50, warmup_rounds=2)
+    assert benchmark.stats.stats.mean < LATENCY_BUDGET
+
+
+@needs_benchmark
+def test_moderate_latency(seeded, benchmark):
+    first = seeded.run(lambda: _first("submitted"))
+    template = seeded.run(lambda: svc.get_assignment_full(first))
+
+    # каждый раунд модерирует новое назначение: начисление по одному
+    # назначению возможно один раз (uq_coin_tx_assignment)
+    async def fresh() -> int:
+        async with seeded.maker() as s:
+            a = TaskAssignment(
+                task_id=template.task_id,
+                user_id=template.user_id,
+                due_at=template.due_at,
+                submitted_at=template.submitted_at,
+                status="submitted",
+            )
+            s.add(a)
+            await s.commit()
+            return a.id
+
+    def setup():
+        aid = seeded.run(fresh)
+        return (lambda: svc.moderate_assignment(aid, approve=True),), {}
+
+    benchmark.pedantic(seeded.run, setup=setup, rounds=30)
+    assert benchmark.stats.stats.mean < LATENCY_BUDGET
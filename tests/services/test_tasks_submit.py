@@ -1,9 +1,94 @@
 import pytest
 
-def test_submit_task_no_active_assignment(mocker):
+
+@pytest.mark.asyncio
+async def test_submit_task_no_active_assignment(async_db, mocker):
+    from datetime import datetime
+
     from bot.services import tasks as svc
+    from bot.storage.models import Task, TaskAssignment, User
 
-    mocker.patch.object(svc, "get_active_assignment", return_value=None)
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    async with async_db() as s:
+        s.add_all(
+            [
+                User(id=1, tg_id=111),
+                Task(id=1, title="T", difficulty="easy", reward_coins=1),
+                # только закрытое назначение — сдавать нечего
+                TaskAssignment(
+                    id=7, task_id=1, user_id=1, due_at=datetime.utcnow(), status="approved"
+                ),
+            ]
+        )
+        await s.commit()
 
-    ok = svc.submit_task(user_tg_id=111, task_id=1, text="hi", file_id=None)
+    ok = await svc.submit_task(user_tg_id=111, task_id=1, text="hi", file_id=None)
     assert ok is False
+    async with async_db() as s:
+        ta = await s.get(TaskAssignment, 7)
+        assert (ta.status, ta.submission_text, ta.submitted_at) == ("approved", None, None)
+
+
+@pytest.mark.asyncio
+async def test_submit_album_files_in_one_transaction(async_db, mocker):
+    from datetime import datetime
+
+    from sqlalchemy import select
+
+    from bot.services import tasks as svc
+    from bot.storage.models import SubmissionFile, Task, TaskAssignment, User
+
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    async with async_db() as s:
+        s.add_all(
+            [
+                User(id=1, tg_id=111),
+                Task(id=1, title="T", difficulty="easy", reward_coins=1),
+                TaskAssignment(
+                    id=7, task_id=1, user_id=1, due_at=datetime.utcnow(), status="active"
+                ),
+            ]
+        )
+        await s.commit()
+
+    async def files():
+        async with async_db() as s:
+            rows = await s.execute(
+                select(SubmissionFile.file_id).order_by(SubmissionFile.position)
+            )
+            return rows.scalars().all()
+
+    assert await svc.submit_task(111, 1, None, None, file_ids=["a", "b", "c"])
+    assert await files() == ["a", "b", "c"]
+    card = await svc.get_assignment_for_moderation(7)
+    assert card["submission_file_id"] == "a" and card["submission_files"] == 3
+
+    # пересдача заменяет альбом, а не дописывает
+    assert await svc.submit_task(111, 1, None, "z")
+    assert await files() == ["z"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", ["in_progress", "taken", "submitted"])
+async def test_take_task_refuses_while_assignment_open(async_db, mocker, status):
+    from datetime import datetime
+
+    from bot.services import tasks as svc
+    from bot.storage.models import Task, TaskAssignment, User
+
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    async with async_db() as s:
+        s.add_all(
+            [
+                User(id=1, tg_id=111),
+                Task(id=1, title="T", difficulty="easy", reward_coins=1),
+                TaskAssignment(
+                    id=7, task_id=1, user_id=1, due_at=datetime.utcnow(), status=status
+                ),
+            ]
+        )
+        await s.commit()
+
+    assert await svc.has_active_assignment(111, 1)
+    assert (await svc.get_active_assignment(111, 1)).id == 7
+    assert await svc.take_task(111, 1) is False
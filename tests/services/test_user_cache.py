@@ -0,0 +1,121 @@
+import pytest
+from types import SimpleNamespace
+
+from bot.services import user_cache as uc
+from bot.storage.models import User
+
+
+def snap(tg_id):
+    return uc.CachedUser(
+        id=tg_id, tg_id=tg_id, username=None, role=None, coins=0, is_admin=False
+    )
+
+
+def test_lru_evicts_least_recent():
+    cache = uc.UserCache(maxsize=2, ttl=60)
+    cache.set(1, snap(1))
+    cache.set(2, snap(2))
+    cache.lookup(1)  # 1 теперь свежее 2
+    cache.set(3, snap(3))
+    assert cache.lookup(2) == (False, None)
+    assert cache.lookup(1)[0] and cache.lookup(3)[0]
+
+
+def test_ttl_expires(mocker):
+    now = mocker.patch("bot.services.user_cache.time.monotonic", return_value=100.0)
+    cache = uc.UserCache(ttl=10)
+    cache.set(1, snap(1))
+    assert cache.lookup(1)[0]
+    now.return_value = 111.0
+    assert cache.lookup(1) == (False, None)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_read_through_and_invalidation(async_db, mocker):
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    mocker.patch("bot.services.users.AsyncSessionLocal", async_db)
+    from bot.services.users import get_user, set_admin_status
+
+    async with async_db() as s:
+        s.add(User(tg_id=5, username="five"))
+        await s.commit()
+
+    assert (await get_user(5)).username == "five"
+    assert (await get_user(5)).is_admin is False
+    assert uc.user_cache.stats()["misses"] == 1
+    assert uc.user_cache.stats()["hits"] == 1
+
+    await set_admin_status(5, True)
+    assert (await get_user(5)).is_admin is True
+
+
+@pytest.mark.asyncio
+async def test_is_admin_filter_hits_cache(mocker):
+    from bot.filters.roles import IsAdmin
+
+    mocker.patch(
+        "bot.filters.roles.get_settings",
+        return_value=SimpleNamespace(admin_ids=[1]),
+    )
+    uc.user_cache.set(7, uc.CachedUser(7, 7, None, None, 0, True))
+    db = mocker.patch("bot.storage.db.AsyncSessionLocal")
+
+    f = IsAdmin()
+    assert await f(SimpleNamespace(from_user=SimpleNamespace(id=1))) is True
+    assert await f(SimpleNamespace(from_user=SimpleNamespace(id=7))) is True
+    db.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_session_reads_reach_cache_only_after_commit(async_db, mocker):
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    from bot.services.users import set_admin_status
+    from bot.storage.db import UOW_KEY
+
+    async with async_db() as s:
+        s.add(User(tg_id=5))
+        await s.commit()
+
+    async with async_db() as s:
+        s.info[UOW_KEY] = True
+        await set_admin_status(5, True, session=s)
+        # своя сессия видит изменение, общий кэш — нет
+        assert (await uc.get_cached_user(5, s)).is_admin is True
+        assert uc.user_cache.lookup(5) == (False, None)
+        await s.rollback()
+    assert uc.user_cache.lookup(5) == (False, None)
+    assert (await uc.get_cached_user(5)).is_admin is False
+
+
+@pytest.mark.asyncio
+async def test_missing_user_cached_briefly(async_db, mocker):
+    now = mocker.patch("bot.services.user_cache.time.monotonic", return_value=100.0)
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+
+    assert await uc.get_cached_user(9) is None
+    assert uc.user_cache.lookup(9) == (True, None)
+    # зарегистрировался на другом воркере
+    async with async_db() as s:
+        s.add(User(tg_id=9))
+        await s.commit()
+    now.return_value = 100.0 + uc.USER_CACHE_MISS_TTL + 1
+    assert (await uc.get_cached_user(9)).tg_id == 9
+
+
+@pytest.mark.asyncio
+async def test_session_sees_user_created_after_cached_miss(async_db, mocker):
+    mocker.patch("bot.storage.db.AsyncSessionLocal", async_db)
+    from bot.services.users import get_or_create_user
+    from bot.storage.db import UOW_KEY
+
+    assert await uc.get_cached_user(9) is None
+    assert uc.user_cache.lookup(9) == (True, None)
+
+    async with async_db() as s:
+        s.info[UOW_KEY] = True
+        await get_or_create_user(9, "nine", session=s)
+        # промах в общем кэше ещё жив, но своя сессия видит нового пользователя
+        assert (await uc.get_cached_user(9, s)).username == "nine"
+        await s.commit()
+    assert uc.user_cache.lookup(9)[1].username == "nine"
@@ -0,0 +1,227 @@
+"""
+Бенчмарк горячих запросов до и после миграции с индексами.
+
+Создаёт временную SQLite-базу со схемой «как до миграций» (без индексов),
+наполняет её синтетикой (по умолчанию 1M заданий), печатает EXPLAIN QUERY PLAN
+и медиану времени каждого запроса, затем прогоняет bot.storage.migrations.upgrade
+и повторяет замеры.
+
+    python -m tools.bench_indexes
+    python -m tools.bench_indexes --assignments 200000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from bot.storage.db import Base
+from bot.storage import migrations, models  # noqa: F401
+
+STATUSES = ("in_progress", "submitted", "approved", "rejected")
+STATUS_WEIGHTS = (0.1, 0.05, 0.6, 0.25)
+
+# (название, SQL, параметры) — те же условия и сортировки, что в сервисах
+QUERIES = [
+    (
+        "list_pending_submissions",
+        """SELECT ta.id, t.title, u.tg_id, u.username, ta.submitted_at
+           FROM task_assignments ta
+           JOIN tasks t ON t.id = ta.task_id
+           JOIN users u ON u.id = ta.user_id
+           WHERE ta.status = 'submitted'
+           ORDER BY ta.submitted_at DESC LIMIT 10 OFFSET 0""",
+        {},
+    ),
+    (
+        "list_assignments(active)",
+        """SELECT ta.id, t.title, ta.status, t.reward_coins, ta.due_at, ta.submitted_at
+           FROM task_assignments ta JOIN tasks t ON t.id = ta.task_id
+           WHERE ta.user_id = :uid AND ta.status = 'in_progress'
+           ORDER BY ta.due_at IS NULL, ta.due_at ASC, ta.id DESC LIMIT 10""",
+        {"uid": 42},
+    ),
+    (
+        "list_assignments(done)",
+        """SELECT ta.id, t.title, ta.status, t.reward_coins, ta.due_at, ta.submitted_at
+           FROM task_assignments ta JOIN tasks t ON t.id = ta.task_id
+           WHERE ta.user_id = :uid AND ta.status IN ('approved', 'rejected')
+           ORDER BY ta.submitted_at IS NULL, ta.submitted_at DESC, ta.id DESC LIMIT 10""",
+        {"uid": 42},
+    ),
+    (
+        "overdue assignments",
+        """SELECT count(*) FROM task_assignments
+           WHERE status = 'in_progress' AND due_at < :now""",
+        {"now": datetime.utcnow()},
+    ),
+    (
+        "get_leaderboard",
+        """SELECT tg_id, username, coins FROM users
+           ORDER BY coins DESC, id ASC LIMIT 10""",
+        {},
+    ),
+    (
+        "get_user_position",
+        "SELECT count(*) FROM users WHERE coins > :coins",
+        {"coins": 900},
+    ),
+    (
+        "list_upcoming_events",
+        """SELECT * FROM events WHERE event_date >= :now
+           ORDER BY event_date ASC LIMIT 10""",
+        {"now": datetime.utcnow()},
+    ),
+    (
+        "get_incoming_for_mentor",
+        """SELECT * FROM mentor_applications
+           WHERE mentor_id = :mid AND status = 'pending'""",
+        {"mid": 7},
+    ),
+]
+
+
+def seed(path: str, n_users: int, n_assignments: int, n_events: int) -> None:
+    rnd = random.Random(1)
+    now = datetime.utcnow()
+    con = sqlite3.connect(path)
+    con.executemany(
+        "INSERT INTO users (id, tg_id, username, coins, is_admin, created_at)"
+        " VALUES (?, ?, ?, ?, 0, ?)",
+        (
+            (i, 10_000 + i, f"user{i}", rnd.randint(0, 1000), now)
+            for i in range(1, n_users + 1)
+        ),
+    )
+    con.executemany(
+        "INSERT INTO tasks (id, title, difficulty, reward_coins, status, is_published)"
+        " VALUES (?, ?, ?, ?, 'active', 1)",
+        (
+            (i, f"task {i}", rnd.choice(("easy", "medium", "hard")), rnd.randint(1, 20))
+            for i in range(1, 201)
+        ),
+    )
+
+    def assignments():
+        for i in range(1, n_assignments + 1):
+            status = rnd.choices(STATUSES, STATUS_WEIGHTS)[0]
+            taken = now - timedelta(minutes=rnd.randint(0, 60 * 24 * 365))
+            submitted = (
+                taken + timedelta(hours=rnd.randint(1, 48))
+                if status != "in_progress"
+                else None
+            )
+            yield (
+                i,
+                rnd.randint(1, 200),
+                rnd.randint(1, n_users),
+                taken,
+                taken + timedelta(days=3),
+                submitted,
+                status,
+            )
+
+    con.executemany(
+        "INSERT INTO task_assignments"
+        " (id, task_id, user_id, taken_at, due_at, submitted_at, status)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        assignments(),
+    )
+    con.executemany(
+        "INSERT INTO events (title, event_date, created_at, user_id) VALUES (?, ?, ?, ?)",
+        (
+            (
+                f"event {i}",
+                now + timedelta(hours=rnd.randint(-24 * 365, 24 * 365)),
+                now,
+                rnd.randint(1, n_users),
+            )
+            for i in range(n_events)
+        ),
+    )
+    con.executemany(
+        "INSERT INTO mentor_applications (user_id, mentor_id, topic, created_at, status)"
+        " VALUES (?, ?, 'CAREER', ?, ?)",
+        (
+            (
+                rnd.randint(1, n_users),
+                rnd.randint(1, 50),
+                now,
+                rnd.choice(("pending", "accepted", "rejected")),
+            )
+            for _ in range(n_events)
+        ),
+    )
+    con.commit()
+    con.close()
+
+
+def measure(engine, repeat: int) -> dict[str, tuple[str, float]]:
+    result = {}
+    with engine.connect() as conn:
+        for name, sql, params in QUERIES:
+            plan = "; ".join(
+                row[-1]
+                for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params)
+            )
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                conn.execute(text(sql), params).fetchall()
+                timings.append(time.perf_counter() - t0)
+            result[name] = (plan, statistics.median(timings) * 1000)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--assignments", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{path}")
+    try:
+        # схема «как до миграций»: таблицы есть, индексов нет
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.drop(conn)
+
+        t0 = time.perf_counter()
+        seed(path, args.users, args.assignments, args.events)
+        print(
+            f"seeded {args.assignments} assignments in {time.perf_counter() - t0:.1f}s"
+        )
+
+        before = measure(engine, args.repeat)
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            migrations.upgrade(conn)
+        print(f"migrations applied in {time.perf_counter() - t0:.1f}s\n")
+        after = measure(engine, args.repeat)
+
+        for name, _sql, _params in QUERIES:
+            (plan_b, ms_b), (plan_a, ms_a) = before[name], after[name]
+            print(
+                f"{name}: {ms_b:.2f} ms -> {ms_a:.2f} ms (x{ms_b / max(ms_a, 1e-6):.0f})"
+            )
+            print(f"  before: {plan_b}")
+            print(f"  after:  {plan_a}")
+    finally:
+        engine.dispose()
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
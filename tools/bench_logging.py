@@ -0,0 +1,162 @@
+"""
+Логирование под нагрузкой: прямой StreamHandler против очереди из utils.logs.
+
+N одновременных «апдейтов»: каждый пишет то, что пишет бот — строку
+aiogram.event на апдейт, info из хендлера и warning про неотправленное
+сообщение рассылки (--fail — доля апдейтов с ошибкой). Варианты:
+  direct  — logging.basicConfig (как было): форматирование и write() прямо
+            в event loop, aiogram.event на INFO;
+  queue   — setup_logging() с LOG_SAMPLE=0: в loop только getMessage и
+            put в очередь, JSON и запись — в потоке listener'а;
+  sampled — то же с ограничением повторов (LOG_SAMPLE, по умолчанию 20/60 с
+            для рассылки и aiogram; хендлер пишет всё).
+Вывод — во временный файл; --sink-delay добавляет задержку на каждую запись
+(медленный pipe docker/journald, забитый терминал). Кроме времени печатает
+задержку event loop и сколько строк реально записано.
+
+    python -m tools.bench_logging
+    python -m tools.bench_logging --updates 50000 --sink-delay 0.2 --fail 0.3
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from bot.utils import logs
+
+event_log = logging.getLogger("aiogram.event")
+handler_log = logging.getLogger("bot.handlers.bench")
+broadcast_log = logging.getLogger("bot.services.broadcast")
+
+
+class SlowFile:
+    """Файл, каждая запись в который стоит delay секунд."""
+
+    def __init__(self, path: str, delay: float):
+        self._f = open(path, "w", encoding="utf-8")
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, s: str) -> int:
+        if self.delay:
+            time.sleep(self.delay)
+        self.lines += s.count("\n")
+        return self._f.write(s)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+async def loop_lag(stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - t0 - 0.001)
+
+
+async def update(i: int, fail: float) -> None:
+    t0 = time.perf_counter()
+    handler_log.info("[take_task] user %s took task %s", i % 500, i % 40)
+    await asyncio.sleep(0)
+    if random.random() < fail:
+        broadcast_log.warning(
+            "[broadcast] failed to send to %s: %s",
+            i,
+            "Forbidden: bot was blocked by the user",
+        )
+    event_log.info(
+        "Update id=%s is handled. Duration %d ms by bot id=%d",
+        i,
+        (time.perf_counter() - t0) * 1000,
+        1,
+    )
+
+
+def configure(variant: str, sink: SlowFile) -> None:
+    logs.stop_logging()
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    for name in logs.DEFAULT_LEVELS:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+    if variant == "direct":
+        logging.basicConfig(level=logging.INFO, stream=sink, force=True)
+        return
+    # aiogram.event — на INFO во всех вариантах, чтобы сравнивать одно и то же
+    os.environ["LOG_LEVELS"] = "aiogram.event=INFO"
+    if variant == "queue":
+        os.environ["LOG_SAMPLE"] = "0"
+    else:
+        os.environ.pop("LOG_SAMPLE", None)
+    logs.setup_logging(sink)
+
+
+async def measure(updates: int, concurrency: int, fail: float):
+    sem = asyncio.Semaphore(concurrency)
+    stop, lag = asyncio.Event(), []
+
+    async def one(i: int) -> None:
+        async with sem:
+            await update(i, fail)
+
+    ticker = asyncio.create_task(loop_lag(stop, lag))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(updates)))
+    wall = time.perf_counter() - t0
+    stop.set()
+    await ticker
+    return wall, lag
+
+
+async def run(args) -> None:
+    print(
+        f"{args.updates} updates, concurrency {args.concurrency}, "
+        f"fail {args.fail:.0%}, sink delay {args.sink_delay} ms\n"
+        f"{'variant':<9}{'wall s':>8}{'upd/s':>9}{'lag p50 ms':>12}"
+        f"{'lag max ms':>12}{'drain s':>9}{'lines':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant in ("direct", "queue", "sampled"):
+            sink = SlowFile(os.path.join(tmp, f"{variant}.log"), args.sink_delay / 1000)
+            configure(variant, sink)
+            random.seed(0)
+            wall, lag = await measure(args.updates, args.concurrency, args.fail)
+            # сколько listener дописывал хвост после последнего апдейта
+            t0 = time.perf_counter()
+            logs.stop_logging()
+            drain = time.perf_counter() - t0
+            lag_ms = [x * 1000 for x in lag] or [0.0]
+            print(
+                f"{variant:<9}{wall:>8.2f}{args.updates / wall:>9.0f}"
+                f"{statistics.median(lag_ms):>12.2f}{max(lag_ms):>12.2f}"
+                f"{drain:>9.2f}{sink.lines:>9}"
+            )
+            sink.close()
+    logging.getLogger().handlers.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument(
+        "--fail", type=float, default=0.2, help="доля апдейтов с ошибкой рассылки"
+    )
+    parser.add_argument(
+        "--sink-delay", type=float, default=0.0, help="мс на каждую запись в вывод"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Кэш фото-доказательств: блокирующий redis.Redis против redis.asyncio.
+
+N одновременных «загрузок»: каждая кладёт --photos file_id'ов, читает их
+и удаляет — как handle_photo/check_photo. Три варианта:
+  blocking — синхронный клиент прямо из корутин (как было): по команде
+             на фото, event loop стоит на каждом round-trip;
+  async    — тот же набор команд через redis.asyncio с общим пулом;
+  pipeline — PhotoCache: put_many / get_many / pop_many, по round-trip'у
+             на шаг независимо от числа фото.
+Кроме времени печатает задержку event loop: тикер спит 1 мс и меряет,
+насколько опоздал — столько же ждали бы все остальные апдейты.
+Нужен работающий Redis (REDIS_URL, по умолчанию localhost:6379/0).
+
+    python -m tools.bench_photo_cache
+    python -m tools.bench_photo_cache --uploads 5000 --concurrency 200 --photos 3
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import uuid
+
+from bot.config import DEFAULT_REDIS_URL
+
+
+async def loop_lag(stop: asyncio.Event, samples: list[float]) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - t0 - 0.001)
+
+
+def blocking_upload(client, photos: int):
+    async def upload(i: int) -> None:
+        keys = [f"bench:{uuid.uuid4().hex}" for _ in range(photos)]
+        for key in keys:
+            client.set(key, f"file-{i}", ex=60)
+        for key in keys:
+            client.get(key)
+        for key in keys:
+            client.delete(key)
+
+    return upload
+
+
+def async_upload(client, photos: int):
+    async def upload(i: int) -> None:
+        keys = [f"bench:{uuid.uuid4().hex}" for _ in range(photos)]
+        for key in keys:
+            await client.set(key, f"file-{i}", ex=60)
+        for key in keys:
+            await client.get(key)
+        for key in keys:
+            await client.delete(key)
+
+    return upload
+
+
+def pipeline_upload(cache, photos: int):
+    async def upload(i: int) -> None:
+        keys = await cache.put_many([f"file-{i}"] * photos)
+        await cache.get_many(keys)
+        await cache.pop_many(keys)
+
+    return upload
+
+
+async def measure(upload, uploads: int, concurrency: int) -> tuple[float, list[float]]:
+    sem = asyncio.Semaphore(concurrency)
+    stop, lag = asyncio.Event(), []
+
+    async def one(i: int) -> None:
+        async with sem:
+            await upload(i)
+
+    ticker = asyncio.create_task(loop_lag(stop, lag))
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(uploads)))
+    wall = time.perf_counter() - t0
+    stop.set()
+    await ticker
+    return wall, lag
+
+
+async def run(args) -> None:
+    import redis
+    import redis.asyncio
+
+    from bot.services.cache_photo import PhotoCache
+
+    url = os.getenv("REDIS_URL", DEFAULT_REDIS_URL)
+    sync_client = redis.Redis.from_url(url, decode_responses=True)
+    async_client = redis.asyncio.Redis.from_url(
+        url, decode_responses=True, max_connections=args.concurrency
+    )
+    sync_client.ping()
+
+    variants = {
+        "blocking": blocking_upload(sync_client, args.photos),
+        "async": async_upload(async_client, args.photos),
+        "pipeline": pipeline_upload(
+            PhotoCache(redis=async_client, ttl=60), args.photos
+        ),
+    }
+    print(
+        f"{args.uploads} uploads x {args.photos} photos, concurrency {args.concurrency}\n"
+        f"{'variant':<10}{'wall s':>9}{'uploads/s':>11}{'lag p50 ms':>12}{'lag max ms':>12}"
+    )
+    for name, upload in variants.items():
+        wall, lag = await measure(upload, args.uploads, args.concurrency)
+        lag_ms = [x * 1000 for x in lag] or [0.0]
+        print(
+            f"{name:<10}{wall:>9.2f}{args.uploads / wall:>11.0f}"
+            f"{statistics.median(lag_ms):>12.2f}{max(lag_ms):>12.2f}"
+        )
+
+    sync_client.close()
+    await async_client.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--photos", type=int, default=1, help="фото в одной сдаче")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
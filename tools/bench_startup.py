@@ -0,0 +1,78 @@
+"""
+Время холодного старта: сколько стоит `python -c "import bot.routers"`.
+
+Каждый прогон — отдельный процесс с DB_URL на временный файл, так что видно
+и время, и то, что импорт не трогает БД (файл не должен появиться).
+С --importtime печатает самые тяжёлые модули по `python -X importtime`.
+
+    python -m tools.bench_startup
+    python -m tools.bench_startup --runs 20 --importtime
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+IMPORT = "import bot.routers"
+
+
+def run_once(env: dict) -> float:
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", IMPORT], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - t0
+
+
+def top_imports(env: dict, limit: int) -> list[tuple[int, str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / "bench.db"
+        env = {**os.environ, "DB_URL": f"sqlite:///{db_file}"}
+        # фильтры читают настройки при импорте — токен нужен, но не проверяется
+        env.setdefault("BOT_TOKEN", "123456:bench")
+
+        run_once(env)  # прогрев файлового кэша и .pyc
+        times = [run_once(env) for _ in range(args.runs)]
+        print(
+            f"{IMPORT!r}: median {statistics.median(times) * 1000:.0f} ms, "
+            f"min {min(times) * 1000:.0f} ms over {args.runs} runs"
+        )
+        print("DB touched on import:", "yes" if db_file.exists() else "no")
+
+        if args.importtime:
+            print("\ncumulative us  module")
+            for cumulative, name in top_imports(env, args.top):
+                print(f"{cumulative:>13}  {name}")
+
+
+if __name__ == "__main__":
+    main()
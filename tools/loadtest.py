@@ -0,0 +1,326 @@
+"""
+Нагрузочный прогон root_router: синтетические Update'ы через dp.feed_update.
+
+Bot и Dispatcher собирает bot.app_factory.build_dispatcher — те же
+middleware, FSM-хранилище и роутеры, что у бота, — поверх временной
+SQLite-базы, а сетевую сессию Bot заменяет заглушкой — Telegram не нужен. Каждый виртуальный пользователь проходит
+сценарий /start → меню → каталог → карточка → «взять» → «сдать» текстом или
+фото; затем админ листает очередь и одобряет сдачи. Шаги идут фазами: все
+пользователи делают шаг N одновременно (не больше --concurrency апдейтов
+в полёте), поэтому у каждого хендлера своя пропускная способность.
+
+    python -m tools.loadtest
+    python -m tools.loadtest --users 1000 --concurrency 100 --api-latency 30
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from itertools import count
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update
+from sqlalchemy import insert
+
+ADMIN_TG_ID = 1
+USER_TG_BASE = 100_000
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "bot"}
+_update_ids = count(1)
+_message_ids = count(1)
+
+
+class StubSession(BaseSession):
+    """Сессия Bot без сети: считает вызовы API и отвечает правдоподобно."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter[str] = Counter()
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if method.__returning__ is bool:
+            return True
+        chat_id = getattr(method, "chat_id", None) or ADMIN_TG_ID
+        return Message(
+            message_id=next(_message_ids),
+            date=datetime.now(),
+            chat=Chat(id=chat_id, type="private"),
+            text=getattr(method, "text", None),
+        )
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError("loadtest не скачивает файлы")
+        yield b""  # pragma: no cover
+
+    async def close(self) -> None:
+        pass
+
+
+def _user(tg_id: int) -> dict:
+    return {"id": tg_id, "is_bot": False, "first_name": "u", "username": f"u{tg_id}"}
+
+
+def _message(tg_id: int, sender: dict | None = None, **content) -> dict:
+    return {
+        "message_id": next(_message_ids),
+        "date": int(time.time()),
+        "chat": {"id": tg_id, "type": "private"},
+        "from": sender or _user(tg_id),
+        **content,
+    }
+
+
+def message_update(tg_id: int, text: str) -> dict:
+    entities = (
+        [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if text.startswith("/")
+        else None
+    )
+    return {
+        "update_id": next(_update_ids),
+        "message": _message(tg_id, text=text, entities=entities),
+    }
+
+
+def photo_update(tg_id: int) -> dict:
+    size = {"file_id": f"photo-{tg_id}", "file_unique_id": f"u{tg_id}"}
+    return {
+        "update_id": next(_update_ids),
+        "message": _message(
+            tg_id,
+            photo=[
+                {**size, "width": 90, "height": 90, "file_size": 1_000},
+                {**size, "width": 800, "height": 800, "file_size": 50_000},
+            ],
+        ),
+    }
+
+
+def callback_update(tg_id: int, data: str) -> dict:
+    return {
+        "update_id": next(_update_ids),
+        "callback_query": {
+            "id": str(next(_update_ids)),
+            "from": _user(tg_id),
+            "chat_instance": str(tg_id),
+            "data": data,
+            # сообщение бота в личке пользователя: от чата зависит ключ FSM
+            "message": _message(tg_id, sender=BOT_USER, text="…"),
+        },
+    }
+
+
+def user_steps(i: int, n_tasks: int) -> list[tuple[str, dict]]:
+    tg_id = USER_TG_BASE + i
+    task_id = i % n_tasks + 1
+    proof = (
+        ("submit_photo", photo_update(tg_id))
+        if i % 2
+        else ("submit_text", message_update(tg_id, f"https://example.com/proof/{i}"))
+    )
+    return [
+        ("start", message_update(tg_id, "/start")),
+        ("menu", callback_update(tg_id, "menu:open:main")),
+        ("catalog", callback_update(tg_id, "menu:open:tasks")),
+        ("catalog_filter", callback_update(tg_id, "tasks:filter:easy")),
+        ("catalog_page", callback_update(tg_id, "tasks:page:all:2")),
+        ("task_view", callback_update(tg_id, f"tasks:view:{task_id}")),
+        ("take", callback_update(tg_id, f"tasks:take:{task_id}")),
+        ("submit_start", callback_update(tg_id, f"tasks:submit:{task_id}")),
+        proof,
+    ]
+
+
+def seed(n_users: int, n_tasks: int) -> None:
+    from bot.storage.db import get_engine
+    from bot.storage.migrations import upgrade
+    from bot.storage.models import Task, User
+
+    with get_engine().begin() as conn:
+        upgrade(conn)
+        conn.execute(
+            insert(User),
+            [{"tg_id": ADMIN_TG_ID, "username": "admin", "coins": 0, "is_admin": True}]
+            + [
+                {
+                    "tg_id": USER_TG_BASE + i,
+                    "username": f"u{i}",
+                    "coins": 0,
+                    "is_admin": False,
+                }
+                for i in range(n_users)
+            ],
+        )
+        conn.execute(
+            insert(Task),
+            [
+                {
+                    "title": f"task {i}",
+                    "description": "load",
+                    "difficulty": ("easy", "medium", "hard")[i % 3],
+                    "reward_coins": 3 + i % 12,
+                    "deadline_days": 3,
+                }
+                for i in range(n_tasks)
+            ],
+        )
+
+
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+        self.walls: dict[str, float] = {}
+        self.errors: Counter[str] = Counter()
+        self.first_error: dict[str, str] = {}
+
+    async def phase(
+        self, name: str, dp: Dispatcher, bot: Bot, updates: list[dict], limit: int
+    ) -> None:
+        sem = asyncio.Semaphore(limit)
+        samples = self.samples.setdefault(name, [])
+
+        async def one(raw: dict):
+            update = Update.model_validate(raw, context={"bot": bot})
+            async with sem:
+                t0 = time.perf_counter()
+                try:
+                    await dp.feed_update(bot, update)
+                except Exception as e:
+                    self.errors[name] += 1
+                    self.first_error.setdefault(name, repr(e))
+                samples.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(u) for u in updates))
+        self.walls[name] = self.walls.get(name, 0.0) + time.perf_counter() - t0
+
+    def report(self) -> str:
+        head = f"{'handler':<16}{'n':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'upd/s':>9}{'err':>6}"
+        lines = [head, "-" * len(head)]
+        total_n, total_wall = 0, 0.0
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = sorted(s * 1000 for s in samples)
+            q = (
+                statistics.quantiles(ms, n=100, method="inclusive")
+                if len(ms) > 1
+                else ms * 99
+            )
+            wall = self.walls[name]
+            total_n += len(ms)
+            total_wall += wall
+            lines.append(
+                f"{name:<16}{len(ms):>7}{q[49]:>9.1f}{q[94]:>9.1f}{q[98]:>9.1f}"
+                f"{ms[-1]:>9.1f}{len(ms) / wall:>9.0f}{self.errors[name]:>6}"
+            )
+        lines.append("-" * len(head))
+        lines.append(
+            f"{'total':<16}{total_n:>7}{'':>36}{total_n / total_wall:>9.0f}"
+            f"{sum(self.errors.values()):>6}"
+        )
+        for name, err in self.first_error.items():
+            lines.append(f"! {name}: {err}")
+        return "\n".join(lines)
+
+
+async def run(args) -> str:
+    from bot.app_factory import build_dispatcher
+    from bot.services.tasks import list_pending_submissions
+
+    session = StubSession(latency=args.api_latency / 1000)
+    # startup-хуки не запускаем: схему и данные готовит seed()
+    bot, dp = build_dispatcher("42:LOADTEST", session=session)
+
+    rec = Recorder()
+    scenarios = [user_steps(i, args.tasks) for i in range(args.users)]
+    for step in range(len(scenarios[0])):
+        by_name: dict[str, list[dict]] = {}
+        for steps in scenarios:
+            name, raw = steps[step]
+            by_name.setdefault(name, []).append(raw)
+        for name, updates in by_name.items():
+            await rec.phase(name, dp, bot, updates, args.concurrency)
+
+    await rec.phase(
+        "admin_pending",
+        dp,
+        bot,
+        [callback_update(ADMIN_TG_ID, "admin:pending:1") for _ in range(args.reviews)],
+        args.concurrency,
+    )
+    pending, cursor = [], None
+    while len(pending) < args.reviews:
+        rows, cursor = await list_pending_submissions(cursor, per_page=100)
+        pending += [row[0] for row in rows]
+        if cursor is None:
+            break
+    await rec.phase(
+        "admin_approve",
+        dp,
+        bot,
+        [
+            callback_update(ADMIN_TG_ID, f"admin:approve:{aid}")
+            for aid in pending[: args.reviews]
+        ],
+        args.concurrency,
+    )
+
+    await dp.storage.close()
+    if args.metrics:
+        from bot.services.metrics import metrics
+
+        print(metrics.render_prometheus(), file=sys.stderr)
+    calls = ", ".join(f"{k}={v}" for k, v in session.calls.most_common())
+    return rec.report() + f"\nBot API calls: {calls}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--reviews", type=int, default=100)
+    parser.add_argument(
+        "--api-latency", type=float, default=0.0, help="задержка ответа Bot API, мс"
+    )
+    parser.add_argument("--fsm", choices=("sql", "memory"), default="sql")
+    parser.add_argument(
+        "--metrics", action="store_true", help="вывести /metrics в stderr"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # до первого get_settings(): офлайн-токен и админ для IsAdmin
+    os.environ.setdefault("BOT_TOKEN", "42:LOADTEST")
+    os.environ["ADMIN_IDS"] = str(ADMIN_TG_ID)
+    os.environ["FSM_STORAGE"] = args.fsm
+
+    from bot.storage import db
+
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db.configure(f"sqlite:///{path}")
+    try:
+        seed(args.users, args.tasks)
+        print(asyncio.run(run(args)))
+    finally:
+        db.configure(None)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,60 @@
+import hmac
 import os
-import asyncio
-from flask import Flask, request, abort
-from aiogram.types import Update
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 from bot.config import get_settings
 from bot.app_factory import build_dispatcher
-
-settings = get_settings()
-bot, dp = build_dispatcher(settings.bot_token)
+from bot.services.metrics import metrics
+from bot.utils.logs import setup_logging
 
 # Защитим URL секретом, чтобы никто посторонний не дергал
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "supersecret")
+WEBHOOK_PATH = f"/webhook/{WEBHOOK_SECRET}"
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+# без токена /metrics не регистрируется; scrape — с Authorization: Bearer <токен>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+async def metrics_view(request: web.Request) -> web.Response:
+    """Метрики хендлеров в Prometheus text format."""
+    got = request.headers.get("Authorization", "").encode()
+    if not METRICS_TOKEN or not hmac.compare_digest(
+        got, f"Bearer {METRICS_TOKEN}".encode()
+    ):
+        raise web.HTTPForbidden()
+    return web.Response(
+        body=metrics.render_prometheus().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+def create_app() -> web.Application:
+    """
+    aiohttp-приложение для вебхука.
+    Один event loop и одна aiohttp-сессия бота на весь процесс:
+    Telegram сразу получает 200 OK, а апдейт обрабатывается фоновой задачей,
+    поэтому несколько апдейтов крутятся параллельно.
+    """
+    setup_logging()
+    settings = get_settings()
+    bot, dp = build_dispatcher(settings.bot_token)
 
-app = Flask(__name__)
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+    ).register(app, path=WEBHOOK_PATH)
+    if METRICS_TOKEN:
+        app.router.add_get(METRICS_PATH, metrics_view)
+    # startup/shutdown диспетчера + закрытие сессии бота при остановке
+    setup_application(app, dp, bot=bot)
+    return app
 
 
-@app.post(f"/webhook/{WEBHOOK_SECRET}")
-def telegram_webhook():
-    if not request.data:
-        abort(400)
-    try:
-        update = Update.model_validate_json(request.data)
-    except Exception:
-        abort(400)
-    # Внутри WSGI-процесса запускаем разовый event-loop на обработку апдейта
-    asyncio.run(dp.feed_update(bot, update))
-    return "ok"
+if __name__ == "__main__":
+    web.run_app(
+        create_app(),
+        host=os.getenv("WEBAPP_HOST", "0.0.0.0"),
+        port=int(os.getenv("WEBAPP_PORT", "8080")),
+    )